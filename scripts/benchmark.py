@@ -0,0 +1,552 @@
+"""
+Benchmark suite for the saleos model kernels and pipeline stages.
+
+Every saleos.capacity and saleos.cost function, and the in-memory part of
+each pipeline stage, is timed on synthetic inputs of increasing size. The
+inputs are generated offline from inputs.parameters with a fixed seed and
+handed over in chunks, so even the largest size runs in bounded memory.
+Functions which only accept scalars are timed row by row on at most
+SCALAR_ROWS rows.
+
+The report is written as JSON, with the rows per second of every benchmark
+and size, so that throughput and scaling can be compared between releases.
+
+Usage: python benchmark.py [size ...]
+
+"""
+import configparser
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import saleos.capacity as cy
+import saleos.cost as ct
+
+from inputs import lut, parameters
+from emissions import (IMPACT_CATEGORIES, calc_launch_emissions,
+                       read_rocket_factors)
+from per_user_results import (calc_decile_capacity, calc_decile_cost,
+                              calc_decile_emission, deciles)
+from preprocess import (multiorbit_sat_capacity_batch,
+                        multiorbit_sat_costs_batch)
+from run import (calc_capacity_results, calc_cost_results,
+                 calc_mission_capacity, calc_mission_cost)
+from summary import subscriber_rows
+
+CONFIG = configparser.ConfigParser()
+CONFIG.read(os.path.join(os.path.dirname(__file__), 'script_config.ini'))
+BASE_PATH = CONFIG['file_locations']['base_path']
+RESULTS = os.path.join(BASE_PATH, '..', 'results')
+
+SIZES = [10 ** 3, 10 ** 5, 10 ** 7]
+CHUNK_SIZE = 10 ** 6
+SCALAR_ROWS = 10 ** 4
+REPEATS = 3
+SEED = 42
+
+# Discount rates and assessment periods of the cost sweep benchmark.
+SWEEP_DISCOUNT_RATES = [3, 5, 7, 10, 12]
+SWEEP_ASSESSMENT_PERIODS = [5, 10, 15]
+
+
+def capacity_inputs(size, rng):
+    """
+    Synthetic UQ capacity inputs, cycling through the constellations.
+
+    """
+    keys = list(parameters)
+    df = pd.concat([multiorbit_sat_capacity_batch(np.arange(part),
+                    parameters[key], rng) for key, part in
+                    zip(keys, split_rows(size, len(keys)))],
+                   ignore_index = True)
+
+    return df
+
+
+def cost_inputs(size, rng):
+    """
+    Synthetic UQ cost inputs, cycling through the constellations.
+
+    """
+    keys = list(parameters)
+    df = pd.concat([multiorbit_sat_costs_batch(np.arange(part),
+                    parameters[key], rng) for key, part in
+                    zip(keys, split_rows(size, len(keys)))],
+                   ignore_index = True)
+
+    return df
+
+
+def capacity_inputs_only(size, rng):
+    """
+    Synthetic UQ capacity inputs as the only argument of a benchmark.
+
+    """
+    return (capacity_inputs(size, rng),)
+
+
+def cost_inputs_only(size, rng):
+    """
+    Synthetic UQ cost inputs as the only argument of a benchmark.
+
+    """
+    return (cost_inputs(size, rng),)
+
+
+def launch_inputs(size, rng):
+    """
+    Synthetic launch rows with a rocket, impact category and number of
+    launches.
+
+    """
+    df = pd.DataFrame({
+        'rocket': rng.choice(read_rocket_factors().rockets, size),
+        'impact_category': rng.choice(IMPACT_CATEGORIES, size),
+        'no_of_launches': rng.integers(1, 100, size),
+    })
+
+    return df
+
+
+def decile_inputs(size, rng):
+    """
+    Synthetic capacity results and decile statistics giving size rows once
+    every result is paired with every decile.
+
+    """
+    rows = max(size // len(deciles), 1)
+
+    df = pd.DataFrame({
+        'constellation': rng.choice(['Starlink', 'OneWeb', 'Kuiper', 'GEO'],
+                                    rows),
+        'capacity_per_single_satellite_mbps': rng.uniform(1e3, 2e4, rows),
+    })
+
+    return df, decile_statistics()
+
+
+def decile_cost_inputs(size, rng):
+    """
+    Synthetic cost results and decile statistics giving size rows once
+    every result is paired with every decile.
+
+    """
+    rows = max(size // len(deciles), 1)
+
+    df = pd.DataFrame({
+        'constellation': rng.choice(['Starlink', 'OneWeb', 'Kuiper', 'GEO'],
+                                    rows),
+        'number_of_satellites': rng.choice([648, 3236, 4425, 3], rows),
+        'assessment_period_year': rng.choice([5, 15], rows),
+        'total_cost_ownership': rng.uniform(1e8, 1e10, rows),
+    })
+
+    return df, decile_statistics()
+
+
+def decile_emission_inputs(size, rng):
+    """
+    Synthetic emission results and decile statistics giving size rows once
+    every result is paired with every decile.
+
+    """
+    rows = max(size // len(deciles), 1)
+
+    df = pd.DataFrame({
+        'constellation': rng.choice(['starlink', 'oneweb', 'kuiper',
+                                     'geo_generic'], rows),
+        'number_of_satellites': rng.choice([648, 3236, 4425, 3], rows),
+        'satellite_lifespan': rng.choice([5, 15], rows),
+        'total_baseline_carbon_emissions_kg': rng.uniform(1e7, 1e10, rows),
+    })
+
+    return df, decile_statistics()
+
+
+def decile_statistics():
+    """
+    Synthetic decile summary statistics.
+
+    """
+    decile_stats = pd.DataFrame({
+        'decile': deciles,
+        'mean_area_sqkm': np.geomspace(10, 1e5, len(deciles)),
+        'mean_poor_connected': np.geomspace(1e5, 1e3, len(deciles)),
+        'cost_per_1GB_usd': np.linspace(5, 1, len(deciles)),
+        'monthly_income_usd': np.geomspace(20, 500, len(deciles)),
+        'cost_per_month_usd': np.linspace(50, 10, len(deciles)),
+        'adoption_rate_perc': np.linspace(5, 50, len(deciles)),
+        'arpu_usd': np.linspace(2, 20, len(deciles)),
+    })
+
+    return decile_stats
+
+
+def split_rows(size, parts):
+    """
+    Split a number of rows into nearly equal parts.
+
+    """
+    return [size // parts + (1 if part < size % parts else 0)
+            for part in range(parts)]
+
+
+def kernel_benchmarks():
+    """
+    This function declares a benchmark for every function of saleos.capacity
+    and saleos.cost.
+
+    Returns
+    -------
+    benchmarks : list
+        Tuples of group, name, input builder, timed function and whether the
+        function only accepts scalars. The timed function is called with the
+        output of the input builder.
+
+    """
+    lookup = cy.compile_lut(tuple(map(tuple, lut)))
+
+    def link_budget(size, rng):
+
+        df = capacity_inputs(size, rng)
+        link_budget = cy.calc_link_budget(df, lookup)
+        link_budget.update({column: df[column].to_numpy(dtype = float)
+                            for column in df.columns
+                            if df[column].dtype.kind in 'biuf'})
+        link_budget['subscribers'] = link_budget['subscribers_baseline']
+
+        return (link_budget,)
+
+    def costs(size, rng):
+
+        df = cost_inputs(size, rng)
+
+        return ({column: df[column].to_numpy() for column in df.columns},)
+
+    def opex_args(c):
+
+        return (c['regulation_fees'], c['ground_station_energy'],
+                c['staff_costs'], c['subscriber_acquisition'],
+                c['maintenance_costs'], c['discount_rate'],
+                c['assessment_period_year'])
+
+    def cost_args(c):
+
+        return (c['satellite_manufacturing'], c['satellite_launch_cost'],
+                c['ground_station_cost'], c['regulation_fees'],
+                c['fiber_infrastructure_cost'], c['ground_station_energy'],
+                c['subscriber_acquisition'], c['staff_costs'],
+                c['maintenance_costs'], c['discount_rate'],
+                c['assessment_period_year'])
+
+    def scalar_rows(function, *columns):
+
+        return [function(*row) for row in zip(*[column.tolist()
+                                                for column in columns])]
+
+    def cashflows(size, rng):
+
+        c, = costs(size, rng)
+
+        return (ct.cashflow_matrix(*cost_args(c)), 
+                c['assessment_period_year'])
+
+    benchmarks = [
+        ('capacity', 'calc_geographic_metrics', link_budget, lambda b:
+         cy.calc_geographic_metrics(b['number_of_satellites'],
+                                    b['total_area_earth_km_sq']), False),
+        ('capacity', 'signal_distance', link_budget, lambda b:
+         cy.signal_distance(b['altitude_km'], b['elevation_angle']), False),
+        ('capacity', 'calc_sat_centric_angle', link_budget, lambda b:
+         cy.calc_sat_centric_angle(b['altitude_km'], b['elevation_angle']),
+         False),
+        ('capacity', 'calc_earth_central_angle', link_budget, lambda b:
+         cy.calc_earth_central_angle(b['altitude_km'],
+                                     b['elevation_angle']), False),
+        ('capacity', 'calc_satellite_coverage', link_budget, lambda b:
+         cy.calc_satellite_coverage(b['altitude_km'], b['elevation_angle']),
+         False),
+        ('capacity', 'calc_geometry', link_budget, lambda b:
+         cy.calc_geometry(b['altitude_km'], b['elevation_angle']), False),
+        ('capacity', 'calc_free_path_loss', link_budget, lambda b:
+         cy.calc_free_path_loss(b['dl_frequency_hz'], b['signal_path_km']),
+         False),
+        ('capacity', 'calc_antenna_gain', link_budget, lambda b:
+         cy.calc_antenna_gain(b['speed_of_light'], b['antenna_diameter_m'],
+                              b['dl_frequency_hz'], b['antenna_efficiency']),
+         False),
+        ('capacity', 'calc_eirpd', link_budget, lambda b:
+         cy.calc_eirpd(b['power_dbw'], b['antenna_gain_db']), False),
+        ('capacity', 'calc_losses', link_budget, lambda b:
+         cy.calc_losses(b['earth_atmospheric_losses_db'],
+                        b['all_other_losses_db']), False),
+        ('capacity', 'calc_received_power', link_budget, lambda b:
+         cy.calc_received_power(b['eirp_db'], b['path_loss_db'],
+                                b['receiver_gain_db'], b['losses_db']),
+         False),
+        ('capacity', 'calc_noise', link_budget, lambda b:
+         [cy.calc_noise() for _ in range(len(b['noise_db']))], True),
+        ('capacity', 'calc_cnr', link_budget, lambda b:
+         cy.calc_cnr(b['received_power_db'], b['noise_db']), False),
+        ('capacity', 'scan_spectral_efficiency', link_budget, lambda b:
+         scalar_rows(lambda cnr: cy.scan_spectral_efficiency(cnr, lut),
+                     b['cnr_db']), True),
+        ('capacity', 'calc_spectral_efficiency', link_budget, lambda b:
+         cy.calc_spectral_efficiency(b['cnr_db'], lookup), False),
+        ('capacity', 'calc_capacity', link_budget, lambda b:
+         cy.calc_capacity(b['spectral_efficiency_bphz'],
+                          b['dl_bandwidth_hz']), False),
+        ('capacity', 'single_satellite_capacity', link_budget, lambda b:
+         cy.single_satellite_capacity(b['dl_bandwidth_hz'],
+            b['spectral_efficiency_bphz'], b['number_of_channels'],
+            b['polarization'], b['number_of_beams']), False),
+        ('capacity', 'calc_constellation_capacity', link_budget, lambda b:
+         cy.calc_constellation_capacity(b['channel_capacity_mbps'],
+            b['number_of_channels'], b['polarization'], b['number_of_beams'],
+            b['number_of_satellites'], b['percent_coverage']), False),
+        ('capacity', 'capacity_subscriber', link_budget, lambda b:
+         cy.capacity_subscriber(b['constellation_capacity_mbps'],
+            b['subscribers'], b['subscriber_traffic_percent']), False),
+        ('capacity', 'monthly_traffic', link_budget, lambda b:
+         cy.monthly_traffic(b['constellation_capacity_mbps']), False),
+        ('capacity', 'subscribers_per_area', link_budget, lambda b:
+         cy.subscribers_per_area(b['number_of_satellites'],
+            b['percent_coverage'], b['subscribers'],
+            b['satellite_coverage_area_km']), False),
+        ('capacity', 'calc_link_budget', capacity_inputs_only, lambda df:
+         cy.calc_link_budget(df, lookup), False),
+        ('capacity', 'calc_unique_link_budget', capacity_inputs_only, 
+         lambda df: cy.calc_unique_link_budget(df, lookup), False),
+        ('cost', 'opex_cost', costs, lambda c:
+         scalar_rows(ct.opex_cost, *opex_args(c)), True),
+        ('cost', 'opex_cost_batch', costs, lambda c:
+         ct.opex_cost_batch(*opex_args(c)), False),
+        ('cost', 'cost_model', costs, lambda c:
+         scalar_rows(ct.cost_model, *cost_args(c)), True),
+        ('cost', 'cost_model_batch', costs, lambda c:
+         ct.cost_model_batch(*cost_args(c)), False),
+        ('cost', 'discount_divisors', costs, lambda c:
+         ct.discount_divisors(c['discount_rate'], range(
+            int(c['assessment_period_year'].max()))), False),
+        ('cost', 'user_monthly_cost', costs, lambda c:
+         ct.user_monthly_cost(c['capex_costs'] / c['subscribers_baseline'],
+                              c['assessment_period_year']), False),
+        ('cost', 'cost_sweep', costs, lambda c:
+         ct.cost_sweep(*cost_args(c)[:9], SWEEP_DISCOUNT_RATES, 
+                       SWEEP_ASSESSMENT_PERIODS, c['subscribers_baseline']),
+         False),
+        ('cost', 'cashflow_matrix', costs, lambda c:
+         ct.cashflow_matrix(*cost_args(c)), False),
+        ('cost', 'cashflow_table', cashflows, ct.cashflow_table, False),
+    ]
+
+    return benchmarks
+
+
+def stage_benchmarks():
+    """
+    This function declares a benchmark for the in-memory part of every
+    pipeline stage.
+
+    Returns
+    -------
+    benchmarks : list
+        Tuples as returned by kernel_benchmarks.
+
+    """
+    def constellation_rng(size, rng):
+
+        return (size, rng)
+
+    def capacity_results(size, rng):
+
+        df = calc_capacity_results(capacity_inputs(size, rng))
+
+        return (subscriber_rows(df, 'subscribers_baseline'),)
+
+    def cost_results(size, rng):
+
+        df = calc_cost_results(cost_inputs(size, rng))
+
+        return (subscriber_rows(df, 'subscribers_baseline'),)
+
+    def launches(size, rng):
+
+        return (launch_inputs(size, rng), read_rocket_factors())
+
+    benchmarks = [
+        ('stage', 'uq_capacity_generation', constellation_rng,
+         capacity_inputs, False),
+        ('stage', 'uq_cost_generation', constellation_rng, cost_inputs,
+         False),
+        ('stage', 'uq_capacity_run', capacity_inputs_only,
+         calc_capacity_results, False),
+        ('stage', 'uq_cost_run', cost_inputs_only, calc_cost_results, False),
+        ('stage', 'launch_emissions', launches, calc_launch_emissions, False),
+        ('stage', 'mission_capacity', capacity_results,
+         calc_mission_capacity, False),
+        ('stage', 'mission_cost', cost_results, calc_mission_cost, False),
+        ('stage', 'decile_capacity_per_user', decile_inputs,
+         calc_decile_capacity, False),
+        ('stage', 'decile_cost_per_user', decile_cost_inputs,
+         calc_decile_cost, False),
+        ('stage', 'decile_emission_per_user', decile_emission_inputs,
+         calc_decile_emission, False),
+    ]
+
+    return benchmarks
+
+
+def time_benchmark(inputs, function, size, scalar = False, seed = SEED,
+                   repeats = REPEATS):
+    """
+    This function times a benchmark on synthetic inputs of a given size.
+
+    Inputs are built chunk by chunk outside of the timed region, and the
+    fastest of the repeats is kept for every chunk.
+
+    Parameters
+    ----------
+    inputs : callable
+        Input builder taking a number of rows and a numpy Generator, and
+        returning the arguments of function.
+    function : callable
+        Timed function.
+    size : int
+        Number of rows.
+    scalar : bool
+        If True, only min(size, SCALAR_ROWS) rows are timed.
+    seed : int
+        Seed of the synthetic inputs.
+    repeats : int
+        Number of timed calls per chunk.
+
+    Returns
+    -------
+    result : dict
+        Number of rows timed, seconds and rows per second.
+
+    """
+    rng = np.random.default_rng(seed)
+    rows = min(size, SCALAR_ROWS) if scalar else size
+    seconds = 0.0
+
+    for chunk in split_rows(rows, -(-rows // CHUNK_SIZE)):
+
+        args = inputs(chunk, rng)
+        timings = []
+
+        for _ in range(repeats):
+
+            start = time.perf_counter()
+            function(*args)
+            timings.append(time.perf_counter() - start)
+
+        seconds += min(timings)
+
+    result = {
+        'rows': rows,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds > 0 else None,
+    }
+
+    return result
+
+
+def run_benchmarks(sizes = SIZES, benchmarks = None):
+    """
+    This function runs every benchmark at every size.
+
+    Parameters
+    ----------
+    sizes : list
+        Numbers of rows.
+    benchmarks : list
+        Benchmark declarations. Defaults to every kernel and stage.
+
+    Returns
+    -------
+    report : dict
+        Environment of the run and one result per benchmark and size.
+
+    """
+    if benchmarks is None:
+
+        benchmarks = kernel_benchmarks() + stage_benchmarks()
+
+    results = []
+
+    for size in sizes:
+
+        for group, name, inputs, function, scalar in benchmarks:
+
+            result = {'group': group, 'name': name, 'size': size}
+            result.update(time_benchmark(inputs, function, size, scalar))
+            results.append(result)
+
+            print('{:<10} {:<28} {:>10} rows  {:>14,.0f} rows/s'.format(
+                group, name, result['rows'], result['rows_per_second'] or 0))
+
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'processors': os.cpu_count(),
+        'chunk_size': CHUNK_SIZE,
+        'scalar_rows': SCALAR_ROWS,
+        'repeats': REPEATS,
+        'results': results,
+    }
+
+    return report
+
+
+def git_commit():
+    """
+    The current git commit, or None outside of a git checkout.
+
+    """
+    try:
+
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'],
+            cwd = os.path.dirname(os.path.abspath(__file__)),
+            capture_output = True, text = True, check = True).stdout.strip()
+
+    except (OSError, subprocess.CalledProcessError):
+
+        commit = None
+
+    return commit
+
+
+if __name__ == '__main__':
+
+    start = time.time()
+
+    if not os.path.exists(RESULTS):
+
+        os.makedirs(RESULTS)
+
+    sizes = [int(size) for size in sys.argv[1:]] or SIZES
+
+    report = run_benchmarks(sizes)
+
+    path_out = os.path.join(RESULTS, 'benchmark_results.json')
+
+    with open(path_out, 'w') as handle:
+
+        json.dump(report, handle, indent = 2)
+
+    print('Benchmark report written to {}'.format(path_out))
+
+    executionTime = (time.time() - start)
+
+    print('Execution time in minutes: ' + str(round(executionTime / 60, 2)))
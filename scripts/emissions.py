@@ -0,0 +1,318 @@
+"""
+Table-driven launch emissions for saleos.
+
+The per launch life cycle emission factors of every rocket are read from
+data/raw/rocket_life_cycle_factors.csv into a dense array indexed by rocket,
+indicator and impact category, with integer codes for each name. Emissions
+for every launch row are obtained by indexing the array with the codes of
+the row and multiplying by the number of launches. The totals of each
+rocket are the sums of its factors over the impact categories. Constellation
+properties from inputs.parameters are joined onto the launch rows as a
+table.
+
+"""
+import configparser
+import os
+import numpy as np
+import pandas as pd
+
+CONFIG = configparser.ConfigParser()
+CONFIG.read(os.path.join(os.path.dirname(__file__), 'script_config.ini'))
+BASE_PATH = CONFIG['file_locations']['base_path']
+ROCKET_FACTORS = os.path.join(BASE_PATH, 'raw', 
+                              'rocket_life_cycle_factors.csv')
+
+IMPACT_CATEGORIES = ['launch_event', 'launcher_production', 'launcher_ait',
+                     'propellant_production', 'propellant_scheduling',
+                     'launcher_transportation', 'launch_campaign']
+
+EMISSION_INDICATORS = ['climate_change_baseline', 'climate_change_worst_case',
+                       'ozone_depletion_baseline', 'ozone_depletion_worst_case',
+                       'resource_depletion', 'freshwater_toxicity',
+                       'human_toxicity']
+
+TOTAL_INDICATORS = ['total_baseline_carbon_emissions',
+                    'total_worst_case_carbon_emissions',
+                    'total_ozone_depletion_baseline',
+                    'total_ozone_depletion_worst_case',
+                    'total_resource_depletion', 'total_freshwater_toxicity',
+                    'total_human_toxicity']
+
+# Constellation names used in the launch scenarios for each entry of the
+# inputs.parameters dictionary.
+SCENARIO_CONSTELLATIONS = {
+    'starlink': 'starlink',
+    'oneweb': 'oneweb',
+    'kuiper': 'kuiper',
+    'geo': 'geo_generic',
+}
+
+SUBSCRIBER_SCENARIOS = ['subscribers_low', 'subscribers_baseline',
+                        'subscribers_high']
+
+
+class RocketFactors(object):
+    """
+    Per launch emission factors of every rocket as a dense array.
+
+    Rockets, indicators and impact categories are numbered in the order 
+    given, and factors[rocket, indicator, category] holds the emission of 
+    one launch. Factors missing for a rocket are NaN.
+
+    Parameters
+    ----------
+    rockets : list
+        Rocket names.
+    indicators : list
+        Emission indicator names.
+    categories : list
+        Impact category names.
+    factors : numpy array
+        Emission factors of shape (rockets, indicators, categories).
+
+    """
+    def __init__(self, rockets, indicators = EMISSION_INDICATORS, 
+                 categories = IMPACT_CATEGORIES, factors = None):
+
+        self.rockets = list(rockets)
+        self.indicators = list(indicators)
+        self.categories = list(categories)
+
+        self.rocket_codes = {name: code for code, name in 
+                             enumerate(self.rockets)}
+        self.indicator_codes = {name: code for code, name in 
+                                enumerate(self.indicators)}
+        self.category_codes = {name: code for code, name in 
+                               enumerate(self.categories)}
+
+        shape = (len(self.rockets), len(self.indicators), 
+                 len(self.categories))
+
+        if factors is None:
+
+            factors = np.full(shape, np.nan)
+
+        self.factors = np.asarray(factors, dtype = float)
+
+        if self.factors.shape != shape:
+
+            raise ValueError('Expected factors of shape {}, got {}'.format(
+                shape, self.factors.shape))
+
+
+    def totals(self):
+        """
+        Total per launch emission factors of every rocket, summed over the
+        impact categories.
+
+        Returns
+        -------
+        totals : numpy array
+            Totals of shape (rockets, indicators).
+
+        """
+        return self.factors.sum(axis = 2)
+
+
+    def encode(self, names, codes):
+        """
+        Integer codes of an array of names, with -1 for unknown names.
+
+        Parameters
+        ----------
+        names : array_like
+            Rocket, indicator or impact category names.
+        codes : dict
+            One of rocket_codes, indicator_codes or category_codes.
+
+        Returns
+        -------
+        codes : numpy array
+            int64 codes.
+
+        """
+        index = pd.Index(list(codes), dtype = object)
+
+        return index.get_indexer(pd.Index(names, dtype = object))
+
+
+    def lookup(self, rockets, categories = None):
+        """
+        Per launch emission factors of every row.
+
+        Parameters
+        ----------
+        rockets : array_like
+            Rocket name of every row.
+        categories : array_like
+            Impact category of every row. If None, the totals of each rocket
+            are looked up instead.
+
+        Returns
+        -------
+        factors : numpy array
+            Factors of shape (rows, indicators), NaN for unknown rockets or 
+            categories.
+
+        """
+        rocket = self.encode(rockets, self.rocket_codes)
+        known = rocket >= 0
+
+        if categories is None:
+
+            factors = self.totals()[rocket]
+
+        else:
+
+            category = self.encode(categories, self.category_codes)
+            known &= category >= 0
+            factors = self.factors[rocket, :, category]
+
+        factors[~known] = np.nan
+
+        return factors
+
+
+def read_rocket_factors(path = ROCKET_FACTORS):
+    """
+    This function reads the per launch emission factors of every rocket.
+
+    Parameters
+    ----------
+    path : string
+        CSV file with 'rocket', 'indicator', 'impact_category' and 'value'
+        columns, one row per factor.
+
+    Returns
+    -------
+    factors : RocketFactors
+        Emission factors of the rockets in the order of the file.
+
+    """
+    df = pd.read_csv(path)
+
+    rockets = list(pd.unique(df['rocket']))
+    indicators = EMISSION_INDICATORS + [name for name in 
+        pd.unique(df['indicator']) if name not in EMISSION_INDICATORS]
+    categories = IMPACT_CATEGORIES + [name for name in 
+        pd.unique(df['impact_category']) if name not in IMPACT_CATEGORIES]
+
+    factors = RocketFactors(rockets, indicators, categories)
+
+    rocket = factors.encode(df['rocket'], factors.rocket_codes)
+    indicator = factors.encode(df['indicator'], factors.indicator_codes)
+    category = factors.encode(df['impact_category'], factors.category_codes)
+
+    factors.factors[rocket, indicator, category] = df['value'].to_numpy(
+        dtype = float)
+
+    return factors
+
+
+def calc_launch_emissions(df, factors, totals = False):
+    """
+    This function calculates the emissions of every launch row by looking up
+    the emission factors of its rocket and multiplying them by the number of
+    launches.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Launch scenarios with 'rocket' and 'no_of_launches' columns, and an
+        'impact_category' column unless totals is True.
+    factors : RocketFactors
+        Emission factors from read_rocket_factors.
+    totals : bool
+        If True, the emissions summed over the impact categories are 
+        calculated, in the TOTAL_INDICATORS columns.
+
+    Returns
+    -------
+    df : DataFrame
+        Launch scenarios with one emission column per indicator.
+
+    """
+    if totals:
+
+        names = dict(zip(EMISSION_INDICATORS, TOTAL_INDICATORS))
+        indicators = [names.get(name, 'total_' + name) 
+                      for name in factors.indicators]
+        values = factors.lookup(df['rocket'])
+
+    else:
+
+        indicators = list(factors.indicators)
+        values = factors.lookup(df['rocket'], df['impact_category'])
+
+    launches = df['no_of_launches'].to_numpy()
+
+    df = df.drop(columns = [column for column in indicators
+                            if column in df.columns])
+
+    df[indicators] = values * launches[:, None]
+
+    return df
+
+
+def constellation_table(parameters):
+    """
+    This function builds the constellation properties used by the emission
+    outputs, keyed by the constellation names of the launch scenarios.
+
+    Parameters
+    ----------
+    parameters : dict
+        dictionary of dictionary containing constellation values.
+
+    Returns
+    -------
+    constellations : DataFrame
+        Number of satellites and subscriber scenarios indexed by
+        constellation.
+
+    """
+    constellations = []
+
+    for key, constellation in SCENARIO_CONSTELLATIONS.items():
+
+        item = parameters[key]
+        row = {'constellation': constellation,
+               'number_of_satellites': item['number_of_satellites']}
+
+        for scenario, subscribers in zip(SUBSCRIBER_SCENARIOS,
+                                         item['subscribers']):
+
+            row[scenario] = subscribers
+
+        constellations.append(row)
+
+    constellations = pd.DataFrame(constellations).set_index('constellation')
+
+    return constellations
+
+
+def add_subscribers(df, parameters):
+    """
+    This function joins the subscriber scenarios of each constellation onto
+    the launch rows.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Launch scenarios with a 'constellation' column.
+    parameters : dict
+        dictionary of dictionary containing constellation values.
+
+    Returns
+    -------
+    df : DataFrame
+        Launch scenarios with one column per subscriber scenario.
+
+    """
+    subscribers = constellation_table(parameters)[SUBSCRIBER_SCENARIOS]
+
+    df = df.drop(columns = [column for column in SUBSCRIBER_SCENARIOS
+                            if column in df.columns])
+    df = df.join(subscribers, on = 'constellation')
+
+    return df
@@ -338,306 +338,6 @@ lut = [
 ]
 
 
-falcon_9 = {
-    'climate_change_baseline' : {
-        'launch_event' : 630466.1352,
-        'launcher_production' : 4113533.907,
-        'launcher_ait' : 1616263.557,
-        'propellant_production' : 4744753.339,
-        'propellant_scheduling' : 5594990.917,
-        'launcher_transportation' : 17220.72491,
-        'launch_campaign' : 5666556.742,
-    },
-    'climate_change_worst_case' : {
-        'launch_event' : 26728958.94,
-        'launcher_production' : 4113533.907,
-        'launcher_ait' : 1616263.557,
-        'propellant_production' : 4744753.339,
-        'propellant_scheduling' : 5594990.917,
-        'launcher_transportation' : 17220.72491,
-        'launch_campaign' : 5666556.742,
-    },
-    'ozone_depletion_baseline' : {
-        'launch_event' : 6837.18,
-        'launcher_production' : 0.277478514,
-        'launcher_ait' : 0.156575296,
-        'propellant_production' : 0.546874653,
-        'propellant_scheduling' : 0.499423015,
-        'launcher_transportation' : 0.003568284,
-        'launch_campaign' : 0.777870405,
-    },
-    'ozone_depletion_worst_case' : {
-        'launch_event' : 30767.31,
-        'launcher_production' : 0.277478514,
-        'launcher_ait' : 0.156575296,
-        'propellant_production' : 0.546874653,
-        'propellant_scheduling' : 0.499423015,
-        'launcher_transportation' : 0.003568284,
-        'launch_campaign' : 0.777870405,
-    },
-    'resource_depletion' : {
-        'launch_event' : 0,
-        'launcher_production' : 1783.337118,
-        'launcher_ait' : 15.65466435,
-        'propellant_production' : 32.92663196,
-        'propellant_scheduling' : 277.7569651,
-        'launcher_transportation' : 0.83687164,
-        'launch_campaign' : 33.22600998,
-    },
-    'freshwater_toxicity' : {
-        'launch_event' : 0,
-        'launcher_production' : 20253601.64,
-        'launcher_ait' : 7701094.993,
-        'propellant_production' : 15292951.2,
-        'propellant_scheduling' : 36949013.69,
-        'launcher_transportation' : 47571.20342,
-        'launch_campaign' : 18683396.82,
-    },
-    'human_toxicity' : {
-        'launch_event' : 0,
-        'launcher_production' : 1.51530806,
-        'launcher_ait' : 0.486234151,
-        'propellant_production' : 1.378727964,
-        'propellant_scheduling' : 2.431926984,
-        'launcher_transportation' : 0.004766684,
-        'launch_campaign' : 1.695861368,
-    },
-    'totals' : {'total_baseline_carbon_emissions': 22383785.32211,
-                'total_worst_case_carbon_emissions' : 48482278.12691,
-                'total_ozone_depletion_baseline' : 6839.441790167000,
-                'total_ozone_depletion_worst_case' : 30769.571790167,
-                'total_resource_depletion' : 2143.73826103,
-                'total_freshwater_toxicity' : 98927629.54642,
-                'total_human_toxicity' : 7.512825211
-                }
-}
-
-
-soyuz = {
-    'climate_change_baseline' : {
-        'launch_event' : 288655.1096,
-        'launcher_production' : 44680412.98,
-        'launcher_ait' : 1616263.557,
-        'propellant_production' : 968910.1994,
-        'propellant_scheduling' : 3223330.483,
-        'launcher_transportation' : 4328.603808,
-        'launch_campaign' : 5666556.742 
-        },
-    'climate_change_worst_case' : {
-        'launch_event' : 12031437.19,
-        'launcher_production' : 44680412.98,
-        'launcher_ait' : 1616263.557,
-        'propellant_production' : 968910.1994,
-        'propellant_scheduling' : 3223330.483,
-        'launcher_transportation' : 4328.603808,
-        'launch_campaign' : 5666556.742
-        },
-    'ozone_depletion_baseline' : {
-        'launch_event' : 3157.14,
-        'launcher_production' : 3.11181773,
-        'launcher_ait' : 0.156575296,
-        'propellant_production' : 0.109998823,
-        'propellant_scheduling' : 0.287848601,
-        'launcher_transportation' : 0.001339551,
-        'launch_campaign' : 0.777870405
-        },
-    'ozone_depletion_worst_case' : {
-        'launch_event' : 13872.25,
-        'launcher_production' : 3.11181773,
-        'launcher_ait' : 0.156575296,
-        'propellant_production' : 0.109998823,
-        'propellant_scheduling' : 0.287848601,
-        'launcher_transportation' : 0.001339551,
-        'launch_campaign' : 0.777870405
-        },
-    'resource_depletion' : {
-        'launch_event' : 0,
-        'launcher_production' : 12473.4086,
-        'launcher_ait' : 15.65466435,
-        'propellant_production' : 6.71625049,
-        'propellant_scheduling' : 159.775698,
-        'launcher_transportation' : 0.158493574,
-        'launch_campaign' : 33.22600998
-        },
-    'freshwater_toxicity' : {
-        'launch_event' : 0,
-        'launcher_production' : 280703930.5,
-        'launcher_ait' : 7701094.993,
-        'propellant_production' : 3114043.098,
-        'propellant_scheduling' : 21269740.34,
-        'launcher_transportation' : 22931.63867,
-        'launch_campaign' : 18683396.82
-        },
-    'human_toxicity' : {
-        'launch_event' : 0,
-        'launcher_production' : 19.1361269,
-        'launcher_ait' : 0.486234151,
-        'propellant_production' : 0.28140976,
-        'propellant_scheduling' : 1.399552839,
-        'launcher_transportation' : 0.002580373,
-        'launch_campaign' : 1.695861368
-    },
-    'totals' : {'total_baseline_carbon_emissions': 56448457.674808,
-                'total_worst_case_carbon_emissions' : 68191239.755208,
-                'total_ozone_depletion_baseline' : 3161.585450406,
-                'total_ozone_depletion_worst_case' : 13876.6954504,
-                'total_resource_depletion' : 12688.939716394,
-                'total_freshwater_toxicity' : 331495137.38967,
-                'total_human_toxicity' : 23.001765391
-                }
-}
-
-
-unknown_hyc = {
-    'climate_change_baseline' : {
-        'launch_event' : 459560.6224,
-        'launcher_production' : 24396973.44,
-        'launcher_ait' : 1616263.557,
-        'propellant_production' : 2856831.769,
-        'propellant_scheduling' : 4409160.7,
-        'launcher_transportation' : 10774.66436,
-        'launch_campaign' : 5666556.742,
-    },
-    'climate_change_worst_case' : {
-        'launch_event' : 19380198.06,
-        'launcher_production' : 24396973.44,
-        'launcher_ait' : 1616263.557,
-        'propellant_production' : 2856831.769,
-        'propellant_scheduling' : 4409160.7,
-        'launcher_transportation' : 10774.66436,
-        'launch_campaign' : 5666556.742
-        },
-    'ozone_depletion_baseline' : {
-        'launch_event' : 4997.16,
-        'launcher_production' : 1.694648122,
-        'launcher_ait' : 0.156575296,
-        'propellant_production' : 0.328436738,
-        'propellant_scheduling' : 0.393635808,
-        'launcher_transportation' : 0.002453918,
-        'launch_campaign' : 0.777870405
-        },
-    'ozone_depletion_worst_case' : {
-        'launch_event' : 22319.78,
-        'launcher_production' : 1.694648122,
-        'launcher_ait' : 0.156575296,
-        'propellant_production' : 0.328436738,
-        'propellant_scheduling' : 0.393635808,
-        'launcher_transportation' : 0.002453918,
-        'launch_campaign' : 0.777870405
-        },
-    'resource_depletion' : {
-        'launch_event' : 0,
-        'launcher_production' : 7128.37286,
-        'launcher_ait' : 15.65466435,
-        'propellant_production' : 19.82144123,
-        'propellant_scheduling' : 218.7663315,
-        'launcher_transportation' : 0.497682607,
-        'launch_campaign' : 33.22600998
-        },
-    'freshwater_toxicity' : {
-        'launch_event' : 0,
-        'launcher_production' : 69735037.48,
-        'launcher_ait' : 7701094.993,
-        'propellant_production' : 17124098.34,
-        'propellant_scheduling' : 61938424.03,
-        'launcher_transportation' : 17341.87779,
-        'launch_campaign' : 18683396.82
-        },
-    'human_toxicity' : {
-        'launch_event' : 0,
-        'launcher_production' : 10.32571748,
-        'launcher_ait' : 0.486234151,
-        'propellant_production' : 0.830068862,
-        'propellant_scheduling' : 1.915739911,
-        'launcher_transportation' : 0.003673529,
-        'launch_campaign' : 1.695861368
-        },
-    'totals' : {'total_baseline_carbon_emissions': 39416121.49476,
-                'total_worst_case_carbon_emissions' : 58336758.93236,
-                'total_ozone_depletion_baseline' : 5000.51362028698,
-                'total_ozone_depletion_worst_case' : 22323.133620287,
-                'total_resource_depletion' : 7416.338989667,
-                'total_freshwater_toxicity' : 175199393.525983,
-                'total_human_toxicity' : 15.257295301
-                }
-}
-
-
-unknown_hyg = {
-    'climate_change_baseline' : {
-        'launch_event' : 467816.8,
-        'launcher_production' : 11018755.48,
-        'launcher_ait' : 1616263.557,
-        'propellant_production' : 4793267.48,
-        'propellant_scheduling' : 8984275.336,
-        'launcher_transportation' : 11043.18682,
-        'launch_campaign' : 5666556.742,
-    },
-    'climate_change_worst_case' : {
-        'launch_event' : 107643343.2,
-        'launcher_production' : 11018755.48,
-        'launcher_ait' : 1616263.557,
-        'propellant_production' : 4793267.48,
-        'propellant_scheduling' : 8984275.336,
-        'launcher_transportation' : 11043.18682,
-        'launch_campaign' : 5666556.742
-        },
-    'ozone_depletion_baseline' : {
-        'launch_event' : 86728.6,
-        'launcher_production' : 0.745735051,
-        'launcher_ait' : 0.156575296,
-        'propellant_production' : 0.223292749,
-        'propellant_scheduling' : 0.753927596,
-        'launcher_transportation' : 0.001892801,
-        'launch_campaign' : 0.777870405
-        },
-    'ozone_depletion_worst_case' : {
-        'launch_event' : 211083.6,
-        'launcher_production' : 0.745735051,
-        'launcher_ait' : 0.156575296,
-        'propellant_production' : 0.223292749,
-        'propellant_scheduling' : 0.753927596,
-        'launcher_transportation' : 0.001892801,
-        'launch_campaign' : 0.777870405
-        },
-    'resource_depletion' : {
-        'launch_event' : 0,
-        'launcher_production' : 2719.725687,
-        'launcher_ait' : 15.65466435,
-        'propellant_production' : 34.59642811,
-        'propellant_scheduling' : 510.2021181,
-        'launcher_transportation' : 0.194786912,
-        'launch_campaign' : 33.22600998,
-        },
-    'freshwater_toxicity' : {
-        'launch_event' : 0,
-        'launcher_production' : 69735037.48,
-        'launcher_ait' : 7701094.993,
-        'propellant_production' : 17124098.34,
-        'propellant_scheduling' : 61938424.03,
-        'launcher_transportation' : 17341.87779,
-        'launch_campaign' : 18683396.82,
-        },
-    'human_toxicity' : {
-        'launch_event' : 0,
-        'launcher_production' : 4.585385379,
-        'launcher_ait' : 0.486234151,
-        'propellant_production' : 1.520253794,
-        'propellant_scheduling' : 4.18110838,
-        'launcher_transportation' : 0.001653926,
-        'launch_campaign' : 1.695861368,
-        },
-    'totals' : {'total_baseline_carbon_emissions': 32557978.58182,
-                'total_worst_case_carbon_emissions' : 139733504.98182,
-                'total_ozone_depletion_baseline' : 86731.2592938982,
-                'total_ozone_depletion_worst_case' : 211086.2592938980,
-                'total_resource_depletion' : 3313.60,
-                'total_freshwater_toxicity' : 175199393.530898,
-                'total_human_toxicity' : 12.470
-                }
-}
-
-
  # The number of satellites per decile is obtained by dividing the average area
  # of the decile by 379km^2 corresponding to a hexagon inscribed in a 15-mile 
  # circle that Starlink uses to plan its solid coverage, with an area of 379 
@@ -0,0 +1,387 @@
+"""
+Instrumentation of the saleos pipeline stages.
+
+Every stage run records its wall time, CPU time, peak memory, the rows of
+its input and output tables and its throughput. Inside a stage, calls to the
+model kernels are grouped with measure (or measure_chunks for the chunks of
+a reader), and each group records the same quantities summed over its
+calls. The records are plain dictionaries, written as JSON with
+write_metrics or formatted as a table with metrics_table.
+
+The resident set size high-water mark of the process running the stage is 
+recorded for every stage and group. It covers the lifetime of the process, 
+so on a reused pool worker it includes the stages which ran in that worker 
+before. As tracing slows down allocation heavy code, the peak memory of 
+every stage and group on its own is only traced with tracemalloc, numpy 
+allocations included, when a stage is run with trace_memory set.
+
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from outputs import table_rows
+
+try:
+
+    import resource
+
+except ImportError:
+
+    # The resource module only exists on Unix. On Windows the peak working 
+    # set is read with psutil when it is installed.
+    resource = None
+
+# Kernel call groups measured in this process since the last stage started,
+# and the traced memory peak of every open measurement.
+_GROUPS = {}
+_PEAKS = []
+
+
+def max_rss_mb():
+    """
+    The resident set size high-water mark of this process in MB, or None 
+    when it cannot be read.
+
+    """
+    if resource is None:
+
+        try:
+
+            import psutil
+
+        except ImportError:
+
+            return None
+
+        memory = psutil.Process().memory_info()
+
+        # peak_wset is the peak working set on Windows.
+        return getattr(memory, 'peak_wset', memory.rss) / 1024 ** 2
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    if sys.platform == 'darwin':
+
+        return rss / 1024 ** 2
+
+    return rss / 1024
+
+
+def _start():
+
+    if tracemalloc.is_tracing():
+
+        if _PEAKS:
+
+            _PEAKS[-1] = max(_PEAKS[-1], tracemalloc.get_traced_memory()[1])
+
+        _PEAKS.append(0)
+        tracemalloc.reset_peak()
+
+    return time.perf_counter(), time.process_time()
+
+
+def _stop(started):
+
+    wall = time.perf_counter() - started[0]
+    cpu = time.process_time() - started[1]
+    peak = None
+
+    if tracemalloc.is_tracing() and _PEAKS:
+
+        peak = max(_PEAKS.pop(), tracemalloc.get_traced_memory()[1])
+
+        if _PEAKS:
+
+            _PEAKS[-1] = max(_PEAKS[-1], peak)
+
+        peak = peak / 1024 ** 2
+
+    return wall, cpu, peak
+
+
+def _record(wall, cpu, peak, rows_in, rows_out, calls = 1):
+
+    rows = rows_in or rows_out
+
+    record = {
+        'calls': calls,
+        'wall_seconds': wall,
+        'cpu_seconds': cpu,
+        'peak_traced_mb': peak,
+        'max_rss_mb': max_rss_mb(),
+        'rows_in': rows_in,
+        'rows_out': rows_out,
+        'rows_per_second': rows / wall if rows and wall > 0 else None,
+    }
+
+    return record
+
+
+def _add_group(group, record):
+
+    if group not in _GROUPS:
+
+        _GROUPS[group] = record
+        return
+
+    total = _GROUPS[group]
+
+    for key in ['calls', 'wall_seconds', 'cpu_seconds', 'rows_in',
+                'rows_out']:
+
+        total[key] += record[key]
+
+    if record['peak_traced_mb'] is not None:
+
+        total['peak_traced_mb'] = max(total['peak_traced_mb'] or 0,
+                                      record['peak_traced_mb'])
+
+    total['max_rss_mb'] = record['max_rss_mb']
+
+    rows = total['rows_in'] or total['rows_out']
+    total['rows_per_second'] = (rows / total['wall_seconds']
+                                if rows and total['wall_seconds'] > 0
+                                else None)
+
+
+@contextmanager
+def measure(group, rows_in = 0, rows_out = 0):
+    """
+    This function measures a kernel call and adds it to its call group.
+
+    Set 'rows_out' on the yielded dictionary to record the rows produced
+    when they are only known after the call.
+
+    Parameters
+    ----------
+    group : string
+        Name of the call group.
+    rows_in : int
+        Number of rows handed to the call.
+    rows_out : int
+        Number of rows produced by the call.
+
+    Yields
+    ------
+    rows : dict
+        Dictionary with a 'rows_out' entry.
+
+    """
+    rows = {'rows_out': rows_out}
+    started = _start()
+
+    try:
+
+        yield rows
+
+    finally:
+
+        wall, cpu, peak = _stop(started)
+        _add_group(group, _record(wall, cpu, peak, rows_in,
+                                  rows['rows_out']))
+
+
+def measure_chunks(chunks, group):
+    """
+    This function measures the production of every chunk of an iterator,
+    such as a chunked table reader, as calls of one group.
+
+    Parameters
+    ----------
+    chunks : iterator
+        DataFrames.
+    group : string
+        Name of the call group.
+
+    Yields
+    ------
+    df : DataFrame
+        The chunks, unchanged.
+
+    """
+    chunks = iter(chunks)
+
+    while True:
+
+        started = _start()
+        df = next(chunks, None)
+        wall, cpu, peak = _stop(started)
+
+        if df is None:
+
+            return
+
+        _add_group(group, _record(wall, cpu, peak, 0, len(df)))
+
+        yield df
+
+
+def run_measured(function, inputs = (), outputs = (), trace_memory = False):
+    """
+    This function runs a stage function and measures it, together with the
+    kernel call groups measured while it runs.
+
+    Parameters
+    ----------
+    function : callable
+        Stage function taking no arguments.
+    inputs : list
+        Paths of the data tables read by the stage, counted as rows in. 
+        Lookup files are left out so they do not inflate the throughput.
+    outputs : list
+        Paths of the tables written by the stage, counted as rows out.
+    trace_memory : bool
+        If True, the peak memory of the stage and its call groups is traced 
+        with tracemalloc. Otherwise their peak is None, unless tracemalloc is
+        already tracing.
+
+    Returns
+    -------
+    metrics : dict
+        Measurements of the stage, with its call groups under 'groups'.
+
+    """
+    _GROUPS.clear()
+    del _PEAKS[:]
+
+    tracing = trace_memory and not tracemalloc.is_tracing()
+
+    if tracing:
+
+        tracemalloc.start()
+
+    try:
+
+        started = _start()
+        function()
+        wall, cpu, peak = _stop(started)
+
+    finally:
+
+        if tracing:
+
+            tracemalloc.stop()
+
+    metrics = _record(wall, cpu, peak, count_rows(inputs),
+                      count_rows(outputs))
+    del metrics['calls']
+    metrics['groups'] = dict(_GROUPS)
+
+    return metrics
+
+
+def count_rows(paths):
+    """
+    The total number of rows of the tables among the given paths.
+
+    """
+    rows = [table_rows(path) for path in paths]
+
+    return sum(count for count in rows if count is not None)
+
+
+def write_metrics(metrics, path, total = None):
+    """
+    This function writes the stage measurements as JSON.
+
+    Parameters
+    ----------
+    metrics : dict
+        Measurements of each stage, or None for a skipped stage.
+    path : string
+        Path of the JSON file.
+    total : float
+        End-to-end wall time in seconds.
+
+    """
+    folder = os.path.dirname(path)
+
+    if folder and not os.path.exists(folder):
+
+        os.makedirs(folder)
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'total_seconds': total,
+        'stages': metrics,
+    }
+
+    with open(path, 'w') as handle:
+
+        json.dump(report, handle, indent = 2)
+
+
+def metrics_table(metrics, total = None):
+    """
+    This function formats the stage measurements as a table, with the call
+    groups of each stage indented below it.
+
+    Parameters
+    ----------
+    metrics : dict
+        Measurements of each stage, or None for a skipped stage.
+    total : float
+        End-to-end wall time in seconds.
+
+    Returns
+    -------
+    table : string
+        One line per stage and call group, followed by the total.
+
+    """
+    rows = []
+
+    for name, stage_metrics in metrics.items():
+
+        rows.append((name, stage_metrics))
+
+        if stage_metrics is not None:
+
+            for group, group_metrics in stage_metrics['groups'].items():
+
+                rows.append(('  ' + group, group_metrics))
+
+    width = max([len(name) for name, _ in rows] + [len('Total')])
+
+    header = ('{}  {:>10}  {:>10}  {:>10}  {:>16}  {:>12}  {:>12}  '
+              '{:>12}')
+    line = ('{}  {:>10.2f}  {:>10.2f}  {:>10}  {:>16}  {:>12,}  {:>12,}  '
+            '{:>12}')
+
+    lines = [header.format('Stage'.ljust(width), 'Wall (s)', 'CPU (s)',
+                           'Peak (MB)', 'Process RSS (MB)', 'Rows in', 
+                           'Rows out', 'Rows/s')]
+
+    for name, item in rows:
+
+        if item is None:
+
+            lines.append('{}  {:>10}'.format(name.ljust(width), 'cached'))
+            continue
+
+        peak, rss = [('-' if item[key] is None 
+                      else '{:.1f}'.format(item[key])) 
+                     for key in ['peak_traced_mb', 'max_rss_mb']]
+        rate = item['rows_per_second']
+
+        lines.append(line.format(name.ljust(width), item['wall_seconds'],
+            item['cpu_seconds'], peak, rss, item['rows_in'], item['rows_out'],
+            '-' if rate is None else '{:,.0f}'.format(rate)))
+
+    if total is not None:
+
+        lines.append('{}  {:>10.2f}'.format('Total'.ljust(width), total))
+
+    lines.append('Peak is traced for each stage and call group on its own when '
+                 'trace_memory is set. Process RSS is the high-water mark of '
+                 'the process over its lifetime.')
+
+    table = '\n'.join(lines)
+
+    return table
@@ -0,0 +1,635 @@
+"""
+Table storage for saleos simulation results.
+
+Results are appended to a single open file in fixed-size batches, so the cost
+of writing grows linearly with the number of rows rather than rewriting the
+whole file every iteration.
+
+Tables handed between the pipeline stages are stored as CSV, as compressed
+Parquet or as a memory-mapped result store, as set by table_format in
+script_config.ini. Parquet and the result store keep the column types and
+read only the requested columns from disk. The result store can also be
+sliced without loading it, so very large runs are processed with flat peak
+memory.
+
+"""
+import configparser
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+CONFIG = configparser.ConfigParser()
+CONFIG.read(os.path.join(os.path.dirname(__file__), 'script_config.ini'))
+TABLE_FORMAT = CONFIG.get('storage', 'table_format', fallback = 'csv')
+PARQUET_COMPRESSION = 'zstd'
+
+FILE_FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.memmap': 'memmap',
+}
+
+
+def table_path(folder, name, file_format = None):
+    """
+    This function gives the path of a pipeline table in the configured 
+    storage format.
+
+    Parameters
+    ----------
+    folder : string
+        Folder of the table.
+    name : string
+        Table name without extension.
+    file_format : string
+        One of 'csv', 'parquet' or 'memmap'. Defaults to TABLE_FORMAT.
+
+    Returns
+    -------
+    path : string
+        Path of the table.
+
+    """
+    if file_format is None:
+
+        file_format = TABLE_FORMAT
+
+    extensions = {value: key for key, value in FILE_FORMATS.items()}
+
+    if file_format not in extensions:
+
+        raise ValueError('Unrecognized file format {}'.format(file_format))
+
+    path = os.path.join(folder, name + extensions[file_format])
+
+    return path
+
+
+def read_table(path, columns = None, chunksize = None):
+    """
+    This function reads a pipeline table, optionally only some of its 
+    columns or in chunks.
+
+    Parameters
+    ----------
+    path : string
+        Path of a CSV, Parquet or result store table.
+    columns : list
+        Columns to read, in the returned order. Parquet tables and result 
+        stores read only these columns from disk.
+    chunksize : int
+        If given, an iterator of DataFrames of at most chunksize rows is 
+        returned.
+
+    Returns
+    -------
+    df : DataFrame or iterator
+        The table, or its chunks.
+
+    """
+    file_format = FILE_FORMATS.get(os.path.splitext(path)[1].lower())
+
+    if file_format == 'memmap':
+
+        store = ResultStore(path)
+
+        if chunksize is None:
+
+            return store.read(columns)
+
+        return (store.read(columns, start, start + chunksize) 
+                for start in range(0, len(store), chunksize))
+
+    if file_format == 'parquet':
+
+        import pyarrow.parquet as pq
+
+        if chunksize is None:
+
+            return pq.read_table(path, columns = columns).to_pandas()
+
+        batches = pq.ParquetFile(path).iter_batches(batch_size = chunksize, 
+                                                    columns = columns)
+
+        return (batch.to_pandas() for batch in batches)
+
+    if file_format != 'csv':
+
+        raise ValueError('Unrecognized file format for {}'.format(path))
+
+    df = pd.read_csv(path, usecols = columns, chunksize = chunksize)
+
+    if columns is None:
+
+        return df
+
+    if chunksize is None:
+
+        return df[list(columns)]
+
+    return (chunk[list(columns)] for chunk in df)
+
+
+def table_rows(path):
+    """
+    This function counts the rows of a pipeline table without loading it.
+
+    Parameters
+    ----------
+    path : string
+        Path of a CSV, Parquet or result store table.
+
+    Returns
+    -------
+    rows : int
+        Number of rows, or None if the path is missing or not a table.
+
+    """
+    file_format = FILE_FORMATS.get(os.path.splitext(path)[1].lower())
+
+    if file_format is None or not os.path.exists(path):
+
+        return None
+
+    if file_format == 'memmap':
+
+        return len(ResultStore(path))
+
+    if file_format == 'parquet':
+
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(path).metadata.num_rows
+
+    with open(path, 'rb') as handle:
+
+        lines = sum(block.count(b'\n') for block in
+                    iter(lambda: handle.read(1 << 20), b''))
+
+        handle.seek(0, os.SEEK_END)
+
+        if handle.tell() > 0:
+
+            handle.seek(-1, os.SEEK_END)
+
+            if handle.read(1) != b'\n':
+
+                lines += 1
+
+    rows = max(lines - 1, 0)
+
+    return rows
+
+
+def write_table(df, path):
+    """
+    This function writes a whole pipeline table.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Table to write.
+    path : string
+        Path of a CSV, Parquet or result store table.
+
+    """
+    file_format = FILE_FORMATS.get(os.path.splitext(path)[1].lower())
+
+    if file_format == 'memmap':
+
+        with ResultStore(path, 'w') as store:
+
+            store.append(df)
+
+    elif file_format == 'parquet':
+
+        df.to_parquet(path, index = False, compression = PARQUET_COMPRESSION)
+
+    elif file_format == 'csv':
+
+        df.to_csv(path, index = False)
+
+    else:
+
+        raise ValueError('Unrecognized file format for {}'.format(path))
+
+
+class ResultStore(object):
+    """
+    On-disk result table with one fixed-dtype array per column, read through
+    memory maps.
+
+    A store is a folder holding one raw binary file per column and a 
+    manifest.json recording the number of rows and the dtype of every 
+    column. Text columns are stored as int32 codes into a list of categories
+    kept in the manifest. Rows are appended in chunks, and reads map only 
+    the requested columns and rows. A numeric column is promoted to a wider
+    dtype when a later chunk needs one, for example from int64 to float64, 
+    so no values are truncated.
+
+    Parameters
+    ----------
+    path : string
+        Folder of the store.
+    mode : string
+        'r' to read an existing store or 'w' to create a new, empty one.
+
+    """
+    def __init__(self, path, mode = 'r'):
+
+        self.path = path
+        self.mode = mode
+
+        if mode == 'w':
+
+            if os.path.exists(path):
+
+                shutil.rmtree(path)
+
+            os.makedirs(path)
+
+            self.manifest = {'rows': 0, 'columns': {}}
+            self._save_manifest()
+
+        elif mode == 'r':
+
+            with open(os.path.join(path, 'manifest.json')) as handle:
+
+                self.manifest = json.load(handle)
+
+        else:
+
+            raise ValueError('Unrecognized mode {}'.format(mode))
+
+
+    def __enter__(self):
+
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        self.close()
+
+
+    def __len__(self):
+
+        return self.manifest['rows']
+
+
+    @property
+    def columns(self):
+        """
+        Column names in the order they were first written.
+
+        """
+        return list(self.manifest['columns'])
+
+
+    def append(self, df):
+        """
+        Append rows to the store. The first chunk fixes the columns and 
+        whether each is numeric or text. Numeric columns are promoted to the
+        common dtype of the stored and the new values, and a ValueError is 
+        raised for text values in a numeric column.
+
+        Parameters
+        ----------
+        df : DataFrame
+            Rows to append.
+
+        """
+        if self.mode != 'w':
+
+            raise ValueError('{} is open for reading'.format(self.path))
+
+        if len(df) == 0:
+
+            return
+
+        columns = self.manifest['columns']
+
+        if not columns:
+
+            for name in df.columns:
+
+                if df[name].dtype.kind in 'biuf':
+
+                    columns[name] = {'dtype': df[name].dtype.str}
+
+                else:
+
+                    columns[name] = {'dtype': np.dtype('int32').str, 
+                                     'categories': []}
+
+        for name, column in columns.items():
+
+            if ('categories' not in column 
+                and df[name].dtype.kind not in 'biuf'):
+
+                raise ValueError('Column {} of {} is numeric, got {} '
+                                 'values'.format(name, self.path, 
+                                                 df[name].dtype))
+
+        for name, column in columns.items():
+
+            values = df[name].to_numpy()
+
+            if 'categories' in column:
+
+                values = self._encode(values, column['categories'])
+
+            else:
+
+                dtype = np.result_type(np.dtype(column['dtype']), values.dtype)
+
+                if dtype != np.dtype(column['dtype']):
+
+                    self._promote(name, dtype)
+
+            with open(self._column_path(name), 'ab') as handle:
+
+                np.ascontiguousarray(values, dtype = column['dtype']).tofile(
+                    handle)
+
+        self.manifest['rows'] += len(df)
+        self._save_manifest()
+
+
+    def column(self, name):
+        """
+        Map a stored column without loading it.
+
+        Parameters
+        ----------
+        name : string
+            Column name.
+
+        Returns
+        -------
+        values : numpy memmap
+            Stored values, or category codes for text columns.
+
+        """
+        dtype = np.dtype(self.manifest['columns'][name]['dtype'])
+
+        if len(self) == 0:
+
+            return np.empty(0, dtype = dtype)
+
+        values = np.memmap(self._column_path(name), dtype = dtype, 
+                           mode = 'r', shape = (len(self),))
+
+        return values
+
+
+    def read(self, columns = None, start = 0, stop = None):
+        """
+        Read a slice of rows for some columns.
+
+        Parameters
+        ----------
+        columns : list
+            Columns to read, in the returned order. Defaults to all.
+        start : int
+            First row.
+        stop : int
+            Row after the last one. Defaults to the end of the store.
+
+        Returns
+        -------
+        df : DataFrame
+            The requested rows and columns.
+
+        """
+        if columns is None:
+
+            columns = self.columns
+
+        df = {}
+
+        for name in columns:
+
+            values = np.array(self.column(name)[start:stop])
+            categories = self.manifest['columns'][name].get('categories')
+
+            if categories is not None:
+
+                values = np.asarray(categories, dtype = object)[values]
+
+            df[name] = values
+
+        df = pd.DataFrame(df, columns = list(columns))
+
+        return df
+
+
+    def close(self):
+        """
+        Write the manifest of a store open for writing.
+
+        """
+        if self.mode == 'w':
+
+            self._save_manifest()
+
+
+    def _promote(self, name, dtype):
+
+        column = self.manifest['columns'][name]
+        path = self._column_path(name)
+
+        if os.path.exists(path):
+
+            values = np.fromfile(path, dtype = column['dtype'])
+            values.astype(dtype).tofile(path)
+
+        column['dtype'] = np.dtype(dtype).str
+
+
+    def _column_path(self, name):
+
+        return os.path.join(self.path, name + '.bin')
+
+
+    def _save_manifest(self):
+
+        with open(os.path.join(self.path, 'manifest.json'), 'w') as handle:
+
+            json.dump(self.manifest, handle, indent = 2)
+
+
+    @staticmethod
+    def _encode(values, categories):
+
+        codes = {category: code for code, category in enumerate(categories)}
+
+        for value in pd.unique(values):
+
+            if value not in codes:
+
+                codes[value] = len(categories)
+                categories.append(value)
+
+        return pd.Series(values).map(codes).to_numpy()
+
+
+class ResultWriter(object):
+    """
+    Streaming writer that appends result rows to a CSV or Parquet file, or
+    to a result store.
+
+    Rows are buffered and written in batches of batch_size through one open
+    file handle. Any remaining rows are flushed when the writer is closed.
+
+    Parameters
+    ----------
+    path : string
+        Output file path. The file format is taken from the extension unless
+        given explicitly.
+    batch_size : int
+        Number of buffered rows which triggers a write.
+    file_format : string
+        One of 'csv', 'parquet' or 'memmap'.
+
+    """
+    def __init__(self, path, batch_size = 10000, file_format = None):
+
+        if file_format is None:
+
+            extension = os.path.splitext(path)[1].lower()
+            file_format = FILE_FORMATS.get(extension)
+
+        if file_format not in FILE_FORMATS.values():
+
+            raise ValueError('Unrecognized file format for {}'.format(path))
+
+        folder = os.path.dirname(os.path.normpath(path))
+
+        if folder and not os.path.exists(folder):
+
+            os.makedirs(folder)
+
+        self.path = path
+        self.batch_size = batch_size
+        self.file_format = file_format
+        self.rows_written = 0
+        self._rows = []
+        self._columns = None
+        self._handle = None
+
+
+    def __enter__(self):
+
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        self.close()
+
+
+    def write(self, row):
+        """
+        Buffer a single result row.
+
+        Parameters
+        ----------
+        row : dict
+            Dictionary of column values for one result.
+
+        """
+        self._rows.append(row)
+
+        if len(self._rows) >= self.batch_size:
+
+            self.flush()
+
+
+    def write_batch(self, df):
+        """
+        Write a batch of result rows.
+
+        Parameters
+        ----------
+        df : DataFrame
+            Results to append.
+
+        """
+        self.flush()
+        self._write_frame(df)
+
+
+    def flush(self):
+        """
+        Write all buffered rows to the output file.
+
+        """
+        if not self._rows:
+
+            return
+
+        df = pd.DataFrame.from_dict(self._rows)
+        self._rows = []
+        self._write_frame(df)
+
+
+    def close(self):
+        """
+        Flush buffered rows and close the output file.
+
+        """
+        self.flush()
+
+        if self._handle is not None:
+
+            self._handle.close()
+            self._handle = None
+
+
+    def _write_frame(self, df):
+
+        if len(df) == 0:
+
+            return
+
+        if self._columns is None:
+
+            self._columns = list(df.columns)
+
+        df = df[self._columns]
+
+        if self.file_format == 'memmap':
+
+            if self._handle is None:
+
+                self._handle = ResultStore(self.path, 'w')
+
+            self._handle.append(df)
+
+        elif self.file_format == 'csv':
+
+            if self._handle is None:
+
+                self._handle = open(self.path, 'w', newline = '')
+
+            df.to_csv(self._handle, header = (self.rows_written == 0),
+                      index = False)
+
+        else:
+
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index = False)
+
+            if self._handle is None:
+
+                self._handle = pq.ParquetWriter(self.path, table.schema, 
+                    compression = PARQUET_COMPRESSION)
+
+            self._handle.write_table(table.cast(self._handle.schema))
+
+        self.rows_written += len(df)
@@ -4,9 +4,9 @@ import math
 import warnings
 import numpy as np
 import pandas as pd
-from tqdm import tqdm
 import saleos.capacity as cy
 from inputs import decile_satellites
+from outputs import ResultWriter, read_table, table_path
 warnings.filterwarnings('ignore')
 pd.options.mode.chained_assignment = None 
 
@@ -18,7 +18,27 @@ DATA_RESULTS = os.path.join(BASE_PATH, '..', 'results')
 DATA_SSA = os.path.join(BASE_PATH, '..', 'results', 'SSA')
 DECILE_DATA = os.path.join(BASE_PATH, '..', '..', 'geosafi-consav', 'results', 
                            'SSA')
-
+CHUNK_SIZE = 100000
+
+
+# Constellation properties used by the regional coverage engine. The 
+# footprint names a key of FOOTPRINT_RULES and the size factor scales the 
+# number of connected satellites relative to that rule.
+COVERAGE_CONSTELLATIONS = pd.DataFrame({
+    'constellation': ['Starlink', 'OneWeb', 'Kuiper', 'GEO'],
+    'footprint': ['leo', 'leo', 'leo', 'geo'],
+    'size_factor': [4425 / 3236, 1, 1, 1],
+    'assessment_period': [5, 5, 5, 15],
+})
+
+# Constellation names of the launch scenarios and emission results, keyed to
+# the names used in COVERAGE_CONSTELLATIONS.
+SCENARIO_CONSTELLATIONS = {
+    'starlink': 'Starlink',
+    'oneweb': 'OneWeb',
+    'kuiper': 'Kuiper',
+    'geo_generic': 'GEO',
+}
 
 deciles = ['Decile 1', 'Decile 2', 'Decile 3', 'Decile 4', 'Decile 5',
            'Decile 6', 'Decile 7', 'Decile 8', 'Decile 9', 'Decile 10']
@@ -95,85 +115,185 @@ def calc_social_carbon_cost(carbon_amount):
     return social_carbon_cost
 
 
+def decile_connected_satellites(constellation, decile_area):
+    """
+    This function calculates the number of connected satellites over every 
+    decile area at once.
+
+    The footprint rule and size factor of each constellation are taken from
+    COVERAGE_CONSTELLATIONS, so GEO satellites follow GEO_decile_satellites 
+    and LEO satellites follow LEO_decile_satellite, with Starlink scaled by 
+    its constellation size relative to Kuiper. The launch scenario names of 
+    SCENARIO_CONSTELLATIONS are accepted as well.
+
+    Parameters
+    ----------
+    constellation : array
+        Constellation name of each row.
+    decile_area : array
+        Decile area of each row in km^2
+
+    Returns
+    -------
+    connected_sats : array
+        Number of connected satellites of each row.
+    """
+    constellation = pd.Series(np.asarray(constellation, dtype = object))
+    constellation = constellation.replace(SCENARIO_CONSTELLATIONS)
+    decile_area = np.asarray(decile_area, dtype = float)
+
+    properties = COVERAGE_CONSTELLATIONS.set_index('constellation')
+
+    unknown = set(constellation) - set(properties.index)
+
+    if unknown:
+
+        raise ValueError('Unrecognized constellations {}'.format(
+            sorted(unknown)))
+
+    footprint = constellation.map(properties['footprint']).to_numpy()
+    size_factor = constellation.map(properties['size_factor'])
+    size_factor = size_factor.to_numpy(dtype = float)
+
+    connected_sats = np.zeros(len(decile_area))
+
+    for name, rule in FOOTPRINT_RULES.items():
+
+        rows = footprint == name
+        connected_sats[rows] = rule(decile_area[rows])
+
+    connected_sats = connected_sats * size_factor
+
+    return connected_sats
+
+
+def expand_deciles(df, decile_stats):
+    """
+    This function pairs every result row with every decile in one cross join 
+    and attaches the decile statistics.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Result rows with a 'constellation' column.
+    decile_stats : DataFrame
+        Decile summary statistics with a 'decile' column.
+
+    Returns
+    -------
+    df : DataFrame
+        One row per result and decile.
+    """
+    columns = [column for column in df.columns if column != 'constellation']
+
+    expanded = {'constellation': np.repeat(df['constellation'].to_numpy(), 
+                                           len(deciles)),
+                'decile': np.tile(deciles, len(df))}
+
+    for column in columns:
+
+        expanded[column] = np.repeat(df[column].to_numpy(), len(deciles))
+
+    df = pd.DataFrame(expanded)
+    df = pd.merge(df, decile_stats, on = 'decile')
+
+    return df
+
+
+def write_decile_chunks(chunks, function, decile_stats, filename):
+    """
+    This function applies a per user calculation to each chunk of results 
+    and streams the rows to one decile file, so only one chunk of results is
+    held in memory at a time.
+
+    Parameters
+    ----------
+    chunks : iterator
+        DataFrames of result rows.
+    function : function
+        Per user calculation taking a chunk and the decile statistics.
+    decile_stats : DataFrame
+        Decile summary statistics.
+    filename : string
+        Name of the output file in the SSA results folder.
+
+    """
+    path_out = os.path.join(DATA_SSA, filename)
+
+    with ResultWriter(path_out, CHUNK_SIZE) as writer:
+
+        for df in chunks:
+
+            writer.write_batch(function(df, decile_stats))
+
+
+    return None
+
+
 def decile_capacity_per_user():
     """
     This function calculates the per user metrics for each decile.
     """
     print('Generating per user metrics')
 
-    cap_data = os.path.join(DATA_PROCESSED, 'interim_results_capacity.csv')
+    cap_data = table_path(DATA_PROCESSED, 'interim_results_capacity')
     pop_path = os.path.join(DECILE_DATA, 'SSA_decile_summary_stats.csv')
     df1 = pd.read_csv(pop_path) 
     df1 = df1[['decile', 'mean_area_sqkm', 'mean_poor_connected']]
 
-    df = pd.read_csv(cap_data)
-    df = df[['constellation', 'capacity_per_single_satellite_mbps']]
-    df = df.to_dict('records')
-
-    results = []
+    chunks = read_table(cap_data, columns = ['constellation', 
+                        'capacity_per_single_satellite_mbps'], 
+                        chunksize = CHUNK_SIZE)
     
-    for item in tqdm((df), desc = "Processing deciles' capacity input"):
-        
-        for decile in deciles:
-            
-            results.append({
-                'constellation' : item['constellation'],
-                'decile' : decile,
-                'capacity_per_single_satellite_mbps' : (
-                    item['capacity_per_single_satellite_mbps'])
-            })
+    ################### Per user capacity #####################
 
-            df = pd.DataFrame.from_dict(results)
+    write_decile_chunks(chunks, calc_decile_capacity, df1, 
+                        'SSA_decile_capacity.csv')
 
-    df[['technology', 'connected_sats', 'total_capacity_mbps', 
-        'per_user_capacity_mbps', 'monthly_gb']] = ''
 
+    return None
 
-    df = pd.merge(df, df1, on = 'decile')
-    for i in tqdm(range(len(df)), desc = "Processing deciles' capacity results"):
 
-        if df.loc[i, 'constellation'] == 'geo_generic':
-            
-            df.loc[i, 'connected_sats'] = GEO_decile_satellites(
-                df['mean_area_sqkm'].loc[i])
-            
-        elif df.loc[i, 'constellation'] == 'Starlink':
+def calc_decile_capacity(df, decile_stats):
+    """
+    This function calculates the per user capacity metrics of every capacity
+    result in every decile.
 
-            constellation_size_factor = 4425 / 3236
-            df.loc[i, 'connected_sats'] = LEO_decile_satellite(
-                df['mean_area_sqkm'].loc[i]) * constellation_size_factor
+    Parameters
+    ----------
+    df : DataFrame
+        Capacity results with 'constellation' and 
+        'capacity_per_single_satellite_mbps' columns.
+    decile_stats : DataFrame
+        Decile summary statistics with 'decile', 'mean_area_sqkm' and 
+        'mean_poor_connected' columns.
 
-        else:
+    Returns
+    -------
+    df : DataFrame
+        Per user capacity with one row per result and decile.
+    """
+    df = expand_deciles(df, decile_stats)
 
-            df.loc[i, 'connected_sats'] = LEO_decile_satellite(
-                df['mean_area_sqkm'].loc[i])
+    df['technology'] = 'satellite'
 
-        df.loc[i, 'technology'] = 'satellite'
+    df['connected_sats'] = decile_connected_satellites(df['constellation'], 
+                                                       df['mean_area_sqkm'])
 
-        df.loc[i, 'total_capacity_mbps'] = (df[
-            'capacity_per_single_satellite_mbps'].loc[i] 
-            * df['connected_sats'].loc[i])
-        
-        df.loc[i, 'per_user_capacity_mbps'] = (df['total_capacity_mbps'].loc[i] 
-            / df['mean_poor_connected'].loc[i])
-        
-        df.loc[i, 'monthly_gb'] = cy.monthly_traffic(df.loc[i, 
-                                    'per_user_capacity_mbps'])
-    
-    ################### Per user capacity #####################
+    df['total_capacity_mbps'] = (df['capacity_per_single_satellite_mbps'] 
+                                 * df['connected_sats'])
 
-    filename = 'SSA_decile_capacity.csv'
-    folder_out = os.path.join(DATA_SSA)
+    df['per_user_capacity_mbps'] = (df['total_capacity_mbps'] 
+                                    / df['mean_poor_connected'])
 
-    if not os.path.exists(folder_out):
+    df['monthly_gb'] = cy.monthly_traffic(df['per_user_capacity_mbps'])
 
-        os.makedirs(folder_out)
-    
-    path_out = os.path.join(folder_out, filename)
-    df.to_csv(path_out, index = False)
+    df = df[['constellation', 'decile', 'capacity_per_single_satellite_mbps', 
+             'technology', 'connected_sats', 'total_capacity_mbps', 
+             'per_user_capacity_mbps', 'monthly_gb', 'mean_area_sqkm', 
+             'mean_poor_connected']]
 
-
-    return None
+    return df
 
 
 def decile_cost_per_user():
@@ -181,95 +301,78 @@ def decile_cost_per_user():
     This function calculates the per user cost metrics for each decile.
     """
 
-    cost_data = os.path.join(DATA_PROCESSED, 'interim_results_cost.csv')
+    cost_data = table_path(DATA_PROCESSED, 'interim_results_cost')
     pop_path = os.path.join(DECILE_DATA, 'SSA_decile_summary_stats.csv')
     df1 = pd.read_csv(pop_path) 
     df1 = df1[['decile', 'mean_area_sqkm', 'mean_poor_connected', 
                'cost_per_1GB_usd', 'monthly_income_usd', 'cost_per_month_usd', 
                'adoption_rate_perc', 'arpu_usd']]
 
-    df = pd.read_csv(cost_data)
-    df = df[['constellation', 'number_of_satellites', 
-             'assessment_period_year', 'total_cost_ownership']]
-    
-    df = df.to_dict('records')
+    chunks = read_table(cost_data, columns = ['constellation', 
+                        'number_of_satellites', 'assessment_period_year', 
+                        'total_cost_ownership'], chunksize = CHUNK_SIZE)
 
-    results = []
-    
-    for item in tqdm((df), desc = "Processing deciles' cost input"):
-        
-        for decile in deciles:
-            
-            results.append({
-                'constellation' : item['constellation'],
-                'decile' : decile,
-                'number_of_satellites' : item['number_of_satellites'],
-                'assessment_period_year' : item['assessment_period_year'],
-                'total_cost_ownership' : (item['total_cost_ownership'])
-            })
-
-            df = pd.DataFrame.from_dict(results)
-   
-    df[['technology', 'connected_sats', 'total_tco_per_satellite', 
-        'total_tco_usd', 'per_user_tco_usd', 'annualized_per_user_tco_usd',
-        'monthly_per_user_tco_usd']] = ''
-    
-    df = pd.merge(df, df1, on = 'decile')
-    
-    for i in tqdm(range(len(df)), desc = "Processing deciles' cost results"):
+    ################### Per user cost #####################
 
-        if df.loc[i, 'constellation'] == 'geo_generic':
-            
-            df.loc[i, 'connected_sats'] = GEO_decile_satellites(
-                df['mean_area_sqkm'].loc[i])
-            
-        elif df.loc[i, 'constellation'] == 'Starlink':
-            
-            constellation_size_factor = 4425 / 3236
-            df.loc[i, 'connected_sats'] = LEO_decile_satellite(
-                df['mean_area_sqkm'].loc[i]) * constellation_size_factor
+    write_decile_chunks(chunks, calc_decile_cost, df1, 'SSA_decile_cost.csv')
 
-        else:
 
-            df.loc[i, 'connected_sats'] = LEO_decile_satellite(
-                df['mean_area_sqkm'].loc[i])
-            
-        df.loc[i, 'technology'] = 'satellite'
-
-        df.loc[i, 'total_tco_per_satellite'] = (df[
-            'total_cost_ownership'].loc[i] 
-            / df['number_of_satellites'].loc[i])
-        
-        df.loc[i, 'total_tco_usd'] = (df['total_tco_per_satellite'].loc[i] 
-            * df['connected_sats'].loc[i])
-        
-        df.loc[i, 'per_user_tco_usd'] = (df['total_tco_usd'].loc[i] 
-            / (df['mean_poor_connected'].loc[i] 
-            * (df['adoption_rate_perc'].loc[i] / 100)))
-        
-        df.loc[i, 'annualized_per_user_tco_usd'] = (df['per_user_tco_usd'].loc[i] 
-            / df['assessment_period_year'].loc[i]) 
-        
-        df.loc[i, 'monthly_per_user_tco_usd'] = (
-            df['annualized_per_user_tco_usd'].loc[i] / 12)
-
-        df.loc[i, 'percent_gni'] = ((df['monthly_per_user_tco_usd'].loc[i] 
-        / df['monthly_income_usd'].loc[i]) * 100)
+    return None
 
-    ################### Per user cost #####################
 
-    filename = 'SSA_decile_cost.csv'
-    folder_out = os.path.join(DATA_SSA)
+def calc_decile_cost(df, decile_stats):
+    """
+    This function calculates the per user cost metrics of every cost result
+    in every decile.
 
-    if not os.path.exists(folder_out):
+    Parameters
+    ----------
+    df : DataFrame
+        Cost results with 'constellation', 'number_of_satellites', 
+        'assessment_period_year' and 'total_cost_ownership' columns.
+    decile_stats : DataFrame
+        Decile summary statistics with 'decile', 'mean_area_sqkm', 
+        'mean_poor_connected', 'cost_per_1GB_usd', 'monthly_income_usd', 
+        'cost_per_month_usd', 'adoption_rate_perc' and 'arpu_usd' columns.
 
-        os.makedirs(folder_out)
-    
-    path_out = os.path.join(folder_out, filename)
-    df.to_csv(path_out, index = False)
+    Returns
+    -------
+    df : DataFrame
+        Per user cost with one row per result and decile.
+    """
+    df = expand_deciles(df, decile_stats)
 
+    df['technology'] = 'satellite'
 
-    return None
+    df['connected_sats'] = decile_connected_satellites(df['constellation'], 
+                                                       df['mean_area_sqkm'])
+
+    df['total_tco_per_satellite'] = (df['total_cost_ownership'] 
+                                     / df['number_of_satellites'])
+
+    df['total_tco_usd'] = df['total_tco_per_satellite'] * df['connected_sats']
+
+    df['per_user_tco_usd'] = (df['total_tco_usd'] / (df['mean_poor_connected'] 
+                              * (df['adoption_rate_perc'] / 100)))
+
+    df['annualized_per_user_tco_usd'] = (df['per_user_tco_usd'] 
+                                         / df['assessment_period_year'])
+
+    df['monthly_per_user_tco_usd'] = df['annualized_per_user_tco_usd'] / 12
+
+    df['percent_gni'] = ((df['monthly_per_user_tco_usd'] 
+                          / df['monthly_income_usd']) * 100)
+
+    df = df[['constellation', 'decile', 'number_of_satellites', 
+             'assessment_period_year', 'total_cost_ownership', 'technology', 
+             'connected_sats', 'total_tco_per_satellite', 'total_tco_usd', 
+             'per_user_tco_usd', 'annualized_per_user_tco_usd', 
+             'monthly_per_user_tco_usd', 'mean_area_sqkm', 
+             'mean_poor_connected', 'cost_per_1GB_usd', 'monthly_income_usd', 
+             'cost_per_month_usd', 'adoption_rate_perc', 'arpu_usd', 
+             'percent_gni']]
+
+    return df
 
 
 def decile_emission_per_user():
@@ -278,97 +381,83 @@ def decile_emission_per_user():
     """
     print('Generating satellite per user emission metrics')
 
-    emission_data = os.path.join(DATA_RESULTS, 'total_emissions.csv')
+    emission_data = table_path(DATA_RESULTS, 'total_emissions')
     pop_path = os.path.join(DECILE_DATA, 'SSA_decile_summary_stats.csv')
     df1 = pd.read_csv(pop_path) 
     df1 = df1[['decile', 'mean_area_sqkm', 'mean_poor_connected']]
 
-    df = pd.read_csv(emission_data)
-    df = df[df['subscriber_scenario'] == 'subscribers_baseline']
-    df = df[['constellation', 'number_of_satellites', 'satellite_lifespan', 
-             'total_baseline_carbon_emissions_kg']]
-    
-    df = df.to_dict('records')
-
-    results = []
-    
-    for item in (df):
-        
-        for decile in deciles:
-            
-            results.append({
-                'constellation' : item['constellation'],
-                'decile' : decile,
-                'number_of_satellites' : item['number_of_satellites'],
-                'satellite_lifespan' : item['satellite_lifespan'],
-                'total_baseline_carbon_emissions_kg' : (
-                    item['total_baseline_carbon_emissions_kg'])
-            })
-
-            df = pd.DataFrame.from_dict(results)
-
-    df[['technology', 'connected_sats', 'emission_per_satellite_kg', 
-        'total_emission_kg', 'total_SCC_usd', 'per_user_emissions_kg', 
-        'per_user_SCC_usd', 'annualized_per_user_emissions_kg',
-        'annualized_per_user_SCC_usd']] = ''
-    
-    df = pd.merge(df, df1, on = 'decile')
-    for i in range(len(df)):
+    columns = ['constellation', 'number_of_satellites', 'satellite_lifespan', 
+               'total_baseline_carbon_emissions_kg']
 
-        if df.loc[i, 'constellation'] == 'geo_generic':
-            
-            df.loc[i, 'connected_sats'] = GEO_decile_satellites(
-                df['mean_area_sqkm'].loc[i])
-            
-        elif df.loc[i, 'constellation'] == 'Starlink':
-            
-            constellation_size_factor = 4425 / 3236
-            df.loc[i, 'connected_sats'] = LEO_decile_satellite(
-                df['mean_area_sqkm'].loc[i]) * constellation_size_factor
-
-        else:
-
-            df.loc[i, 'connected_sats'] = LEO_decile_satellite(
-                df['mean_area_sqkm'].loc[i])
-
-        df.loc[i, 'technology'] = 'satellite'
-
-        df.loc[i, 'emission_per_satellite_kg'] = (df[
-            'total_baseline_carbon_emissions_kg'].loc[i] 
-            / df['number_of_satellites'].loc[i])
-        
-        df.loc[i, 'total_emission_kg'] = (df['emission_per_satellite_kg'].loc[i] 
-            * df['connected_sats'].loc[i])
-        
-        df.loc[i, 'total_SCC_usd'] = calc_social_carbon_cost(
-            df['total_emission_kg'].loc[i])
-        
-        df.loc[i, 'per_user_emissions_kg'] = (df['total_emission_kg'].loc[i] 
-            / df['mean_poor_connected'].loc[i]) 
-        
-        df.loc[i, 'per_user_SCC_usd'] = (df['total_SCC_usd'].loc[i] 
-            / df['mean_poor_connected'].loc[i]) 
-        
-        df.loc[i, 'annualized_per_user_emissions_kg'] = (
-            df['per_user_emissions_kg'].loc[i] / df['satellite_lifespan'].loc[i]) 
-        
-        df.loc[i, 'annualized_per_user_SCC_usd'] = (
-            df['per_user_SCC_usd'].loc[i] / df['satellite_lifespan'].loc[i]) 
+    chunks = (df.loc[df['subscriber_scenario'] == 'subscribers_baseline', 
+                     columns] for df in read_table(emission_data, 
+                     columns = columns + ['subscriber_scenario'], 
+                     chunksize = CHUNK_SIZE))
     
     ################### Per user emissions #####################
 
-    filename = 'SSA_decile_emissions.csv'
-    folder_out = os.path.join(DATA_SSA)
+    write_decile_chunks(chunks, calc_decile_emission, df1, 
+                        'SSA_decile_emissions.csv')
 
-    if not os.path.exists(folder_out):
 
-        os.makedirs(folder_out)
-    
-    path_out = os.path.join(folder_out, filename)
-    df.to_csv(path_out, index = False)
+    return None
 
 
-    return None
+def calc_decile_emission(df, decile_stats):
+    """
+    This function calculates the per user emission metrics of every emission
+    result in every decile.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Emission results with 'constellation', 'number_of_satellites', 
+        'satellite_lifespan' and 'total_baseline_carbon_emissions_kg' 
+        columns.
+    decile_stats : DataFrame
+        Decile summary statistics with 'decile', 'mean_area_sqkm' and 
+        'mean_poor_connected' columns.
+
+    Returns
+    -------
+    df : DataFrame
+        Per user emissions with one row per result and decile.
+    """
+    df = expand_deciles(df, decile_stats)
+
+    df['technology'] = 'satellite'
+
+    df['connected_sats'] = decile_connected_satellites(df['constellation'], 
+                                                       df['mean_area_sqkm'])
+
+    df['emission_per_satellite_kg'] = (df['total_baseline_carbon_emissions_kg'] 
+                                       / df['number_of_satellites'])
+
+    df['total_emission_kg'] = (df['emission_per_satellite_kg'] 
+                               * df['connected_sats'])
+
+    df['total_SCC_usd'] = calc_social_carbon_cost(df['total_emission_kg'])
+
+    df['per_user_emissions_kg'] = (df['total_emission_kg'] 
+                                   / df['mean_poor_connected'])
+
+    df['per_user_SCC_usd'] = df['total_SCC_usd'] / df['mean_poor_connected']
+
+    df['annualized_per_user_emissions_kg'] = (df['per_user_emissions_kg'] 
+                                              / df['satellite_lifespan'])
+
+    df['annualized_per_user_SCC_usd'] = (df['per_user_SCC_usd'] 
+                                         / df['satellite_lifespan'])
+
+    df = df[['constellation', 'decile', 'number_of_satellites', 
+             'satellite_lifespan', 'total_baseline_carbon_emissions_kg', 
+             'technology', 'connected_sats', 'emission_per_satellite_kg', 
+             'total_emission_kg', 'total_SCC_usd', 'per_user_emissions_kg', 
+             'per_user_SCC_usd', 'annualized_per_user_emissions_kg',
+             'annualized_per_user_SCC_usd', 'mean_area_sqkm', 
+             'mean_poor_connected']]
+
+    return df
 
 
 def decile_satellite(decile):
@@ -395,14 +484,24 @@ def decile_satellite(decile):
     return number_of_satellites
 
 
-def capacity_coverage():
+FOOTPRINT_RULES = {
+    'leo': LEO_decile_satellite,
+    'geo': GEO_decile_satellites,
+}
+
+
+def ssa_coverage_regions():
     """
-    This function calculate the capacity provided by the satellites for users in
-    different areas across Sub-Saharan Africa.
+    This function loads the Sub-Saharan Africa regions with their area and 
+    mean number of poor unconnected people.
+
+    Returns
+    -------
+    df : DataFrame
+        One row per region.
     """
     uncov_population = os.path.join(DECILE_DATA, 'SSA_poor_unconnected.csv')
     ssa = os.path.join(DECILE_DATA, 'SSA_subregional_population_deciles.csv')
-    sat_capacity = os.path.join(DATA_PROCESSED, 'interim_results_capacity.csv')
 
     cov = pd.read_csv(uncov_population)
     cov = cov[cov['technology'] == 'GSM']
@@ -414,60 +513,74 @@ def capacity_coverage():
     df = df[['GID_2', 'decile', 'area']]
     df = df.rename(columns = {'GID_2': 'GID_1'})
     df = pd.merge(df, cov, on = 'GID_1', how = 'inner')
-    
-    sat = pd.read_csv(sat_capacity)
-    starlink_cap = sat[sat['constellation'] == 'Starlink']
-    starlink_cap = starlink_cap['capacity_per_single_satellite_mbps'].mean()
 
-    oneweb_cap = sat[sat['constellation'] == 'OneWeb']
-    oneweb_cap = (oneweb_cap['capacity_per_single_satellite_mbps'].mean())
+    return df
 
-    kuiper_cap = sat[sat['constellation'] == 'Kuiper']
-    kuiper_cap = (kuiper_cap['capacity_per_single_satellite_mbps'].mean())
 
-    geo_cap = sat[sat['constellation'] == 'GEO']
-    geo_cap = (geo_cap['capacity_per_single_satellite_mbps'].mean())
+def regional_coverage(regions, constellations, metric, per_user):
+    """
+    This function calculates the per user metric of every constellation over 
+    every region as a single broadcast operation.
 
-    constellations = ['Starlink', 'OneWeb', 'Kuiper', 'GEO']
+    Parameters
+    ----------
+    regions : DataFrame
+        Regions with 'area' (km^2) and 'poor_unconnected' columns.
+    constellations : DataFrame
+        Constellations with 'constellation', 'footprint', 'size_factor' and 
+        per satellite metric columns.
+    metric : string
+        Name of the per satellite metric column, e.g. capacity or TCO.
+    per_user : string
+        Name of the output per user column.
 
-    dfs = []
-    for constellation in constellations:
+    Returns
+    -------
+    df : DataFrame
+        One row per constellation and region, ordered by constellation.
+    """
+    area = regions['area'].to_numpy(dtype = float)
+    poor_unconnected = regions['poor_unconnected'].to_numpy(dtype = float)
 
-        df_copy = df.copy()
-        
-        df_copy['constellation'] = constellation
-        dfs.append(df_copy)
+    footprints = {rule: FOOTPRINT_RULES[rule](area) 
+                  for rule in constellations['footprint'].unique()}
 
-    df = pd.concat(dfs, ignore_index = True)
-    for i in range(len(df)):
+    connected_sats = (np.vstack([footprints[rule] for rule in 
+                      constellations['footprint']]) 
+                      * constellations['size_factor'].to_numpy(
+                      dtype = float)[:, None])
 
-        if df.loc[i, 'constellation'] == 'geo_generic':
-            
-            df.loc[i, 'sat_cap'] = geo_cap
-            df.loc[i, 'connected_sats'] = GEO_decile_satellites(
-                df['area'].loc[i])
-            
-        elif df.loc[i, 'constellation'] == 'Kuiper':
-            
-            df.loc[i, 'sat_cap'] = kuiper_cap
-            df.loc[i, 'connected_sats'] = LEO_decile_satellite(
-                df.loc[i, 'area'])
+    values = constellations[metric].to_numpy(dtype = float)[:, None]
 
-        elif df.loc[i, 'constellation'] == 'Starlink':
+    df = pd.DataFrame({column: np.tile(regions[column].to_numpy(), 
+                       len(constellations)) for column in regions.columns})
+    df['constellation'] = np.repeat(
+        constellations['constellation'].to_numpy(), len(regions))
+    df[metric] = np.broadcast_to(values, connected_sats.shape).ravel()
+    df['connected_sats'] = connected_sats.ravel()
+    df[per_user] = ((connected_sats * values) / poor_unconnected).ravel()
 
-            df.loc[i, 'sat_cap'] = starlink_cap
-            constellation_size_factor = 4425 / 3236
-            df.loc[i, 'connected_sats'] = LEO_decile_satellite(
-                df.loc[i, 'area']) * constellation_size_factor
+    return df
 
-        else:
 
-            df.loc[i, 'sat_cap'] = oneweb_cap
-            df.loc[i, 'connected_sats'] = LEO_decile_satellite(
-                df.loc[i, 'area'])
-            
-        df.loc[i, 'per_user_mbps'] = ((df.loc[i, 'connected_sats'] 
-                * df.loc[i, 'sat_cap']) / df.loc[i, 'poor_unconnected'])
+def capacity_coverage():
+    """
+    This function calculate the capacity provided by the satellites for users in
+    different areas across Sub-Saharan Africa.
+    """
+    sat_capacity = table_path(DATA_PROCESSED, 'interim_results_capacity')
+
+    df = ssa_coverage_regions()
+
+    sat = read_table(sat_capacity, columns = ['constellation', 
+                     'capacity_per_single_satellite_mbps'])
+    sat = sat.groupby('constellation').agg(
+        {'capacity_per_single_satellite_mbps': 'mean'})
+    sat = sat.rename(columns = {'capacity_per_single_satellite_mbps': 'sat_cap'})
+
+    constellations = COVERAGE_CONSTELLATIONS.join(sat, on = 'constellation')
+
+    df = regional_coverage(df, constellations, 'sat_cap', 'per_user_mbps')
 
     fileout = 'satellite_capacity_coverage.csv'
     path_out = os.path.join(DATA_SSA, fileout)
@@ -481,93 +594,27 @@ def cost_coverage():
     This function calculate the cost provided by the satellites for users in
     different areas across Sub-Saharan Africa.
     """
-    uncov_population = os.path.join(DECILE_DATA, 'SSA_poor_unconnected.csv')
-    ssa = os.path.join(DECILE_DATA, 'SSA_subregional_population_deciles.csv')
-    sat_cost = os.path.join(DATA_RESULTS, 'final_cost_results.csv')
+    sat_cost = table_path(DATA_RESULTS, 'final_cost_results')
 
-    cov = pd.read_csv(uncov_population)
-    cov = cov[cov['technology'] == 'GSM']
-    cov = cov[cov['poverty_range'] == 'GSAP2_poor']
-    cov = cov[['iso3', 'GID_1', 'poor_unconnected']]
-    cov = cov.groupby(['iso3', 'GID_1']).agg({'poor_unconnected': 'mean'}).reset_index()
+    df = ssa_coverage_regions()
 
-    df = pd.read_csv(ssa)
-    df = df[['GID_2', 'decile', 'area']]
-    df = df.rename(columns = {'GID_2': 'GID_1'})
-    df = pd.merge(df, cov, on = 'GID_1', how = 'inner')
-    
-    sat = pd.read_csv(sat_cost)
-    starlink_cost = sat[sat['constellation'] == 'Starlink']
-    starlink_tco = starlink_cost['total_cost_ownership'].mean()
-    starlink_sats = starlink_cost['number_of_satellites'].mean()
-    starlink_tco = starlink_tco / starlink_sats
-
-    oneweb_cost = sat[sat['constellation'] == 'OneWeb']
-    oneweb_tco = (oneweb_cost['total_cost_ownership'].mean())
-    oneweb_sats = oneweb_cost['number_of_satellites'].mean()
-    oneweb_tco = oneweb_tco / oneweb_sats
-
-    kuiper_cost = sat[sat['constellation'] == 'Kuiper']
-    kuiper_tco = (kuiper_cost['total_cost_ownership'].mean())
-    kuiper_sats = kuiper_cost['number_of_satellites'].mean()
-    kuiper_tco = kuiper_tco / kuiper_sats
-
-    geo_cost = sat[sat['constellation'] == 'GEO']
-    geo_tco = (geo_cost['total_cost_ownership'].mean())
-    geo_sats = geo_cost['number_of_satellites'].mean()
-    geo_tco = geo_tco / geo_sats
-
-    constellations = ['Starlink', 'OneWeb', 'Kuiper', 'GEO']
-
-    dfs = []
-    for constellation in constellations:
-
-        df_copy = df.copy()
-        
-        df_copy['constellation'] = constellation
-        dfs.append(df_copy)
-
-    df = pd.concat(dfs, ignore_index = True)
-  
-    for i in tqdm(range(len(df)), desc = 'Processing coverage capacity'):
-
-        if df.loc[i, 'constellation'] == 'geo_generic':
-            
-            df.loc[i, 'sat_cost'] = geo_tco
-            df.loc[i, 'connected_sats'] = GEO_decile_satellites(
-                df['area'].loc[i])
-            period = 15
-            
-        elif df.loc[i, 'constellation'] == 'Kuiper':
-            
-            df.loc[i, 'sat_cost'] = kuiper_tco
-            df.loc[i, 'connected_sats'] = LEO_decile_satellite(
-                df.loc[i, 'area'])
-            period = 5
-
-        elif df.loc[i, 'constellation'] == 'Starlink':
-
-            df.loc[i, 'sat_cost'] = starlink_tco
-            constellation_size_factor = 4425 / 3236
-            df.loc[i, 'connected_sats'] = LEO_decile_satellite(
-                df.loc[i, 'area']) * constellation_size_factor
-            period = 5
-
-        else:
-
-            df.loc[i, 'sat_cost'] = oneweb_tco
-            df.loc[i, 'connected_sats'] = LEO_decile_satellite(
-                df.loc[i, 'area'])
-            period = 5
-  
-        df.loc[i, 'per_user_tco'] = ((df.loc[i, 'connected_sats'] 
-                * df.loc[i, 'sat_cost']) / df.loc[i, 'poor_unconnected'])
-        
-        df.loc[i, 'per_user_annualized_tco'] = (df.loc[i, 'per_user_tco'] 
-                / period)
-        
-        df.loc[i, 'per_user_monthly_tco'] = (
-            df.loc[i, 'per_user_annualized_tco'] / 12)
+    sat = read_table(sat_cost, columns = ['constellation', 
+                     'total_cost_ownership', 'number_of_satellites'])
+    sat = sat.groupby('constellation').agg({'total_cost_ownership': 'mean', 
+                                            'number_of_satellites': 'mean'})
+    sat['sat_cost'] = sat['total_cost_ownership'] / sat['number_of_satellites']
+
+    constellations = COVERAGE_CONSTELLATIONS.join(sat[['sat_cost']], 
+                                                  on = 'constellation')
+
+    df = regional_coverage(df, constellations, 'sat_cost', 'per_user_tco')
+
+    period = df['constellation'].map(
+        constellations.set_index('constellation')['assessment_period'])
+
+    df['per_user_annualized_tco'] = df['per_user_tco'] / period
+
+    df['per_user_monthly_tco'] = df['per_user_annualized_tco'] / 12
 
     fileout = 'satellite_cost_coverage.csv'
     path_out = os.path.join(DATA_SSA, fileout)
@@ -0,0 +1,368 @@
+"""
+Stage runner for the saleos scripts.
+
+Each stage declares the files it reads and writes. A stage depends on every
+other stage which writes one of its inputs, and stages whose dependencies
+have finished are run concurrently on a process pool, so the end-to-end time
+is bounded by the longest chain of dependent stages.
+
+Stages can be cached. A stage key hashes the stage parameters, the contents
+of its input files and the source of its code, and a stage whose key and
+outputs are unchanged since the last run is skipped.
+
+Every stage run is measured with instrument.run_measured, and the runner
+returns the measurements of all stages.
+
+"""
+import hashlib
+import inspect
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from instrument import run_measured
+
+
+def stage(name, function, inputs = (), outputs = (), params = None, 
+          code = (), rows_from = None):
+    """
+    This function declares a pipeline stage.
+
+    Parameters
+    ----------
+    name : string
+        Unique stage name.
+    function : callable
+        Module level function, taking no arguments, which runs the stage.
+    inputs : list
+        Paths of the files read by the stage.
+    outputs : list
+        Paths of the files written by the stage.
+    params : dict
+        JSON serializable values the stage depends on besides its input 
+        files, such as a parameter slice, a lookup table or a seed.
+    code : list
+        Modules used by the stage besides the module of function.
+    rows_from : list
+        Paths among inputs of the data tables whose rows are counted as the
+        rows in of the stage, leaving out lookup files. Defaults to inputs.
+
+    Returns
+    -------
+    stage : dict
+        Stage declaration.
+
+    """
+    stage = {
+        'name': name,
+        'function': function,
+        'inputs': list(inputs),
+        'outputs': list(outputs),
+        'params': params,
+        'code': list(code),
+        'rows_from': list(inputs if rows_from is None else rows_from),
+    }
+
+    return stage
+
+
+def stage_dependencies(stages):
+    """
+    This function builds the dependency graph of the stages from their
+    declared inputs and outputs. An input which no stage writes must already
+    exist, and the graph must not contain a cycle, otherwise a ValueError is
+    raised before any stage runs.
+
+    Parameters
+    ----------
+    stages : list
+        Stage declarations.
+
+    Returns
+    -------
+    dependencies : dict
+        Set of stage names each stage depends on, keyed by stage name.
+
+    """
+    names = set()
+    writers = {}
+
+    for item in stages:
+
+        if item['name'] in names:
+
+            raise ValueError('Duplicate stage name {}'.format(item['name']))
+
+        names.add(item['name'])
+
+        for path in item['outputs']:
+
+            if path in writers:
+
+                raise ValueError('{} is written by both {} and {}'.format(
+                    path, writers[path], item['name']))
+
+            writers[path] = item['name']
+
+    dependencies = {}
+
+    for item in stages:
+
+        for path in item['inputs']:
+
+            if path not in writers and not os.path.exists(path):
+
+                raise ValueError('{} is read by {} but no stage writes it '
+                                 'and it does not exist'.format(path, 
+                                                                item['name']))
+
+        dependencies[item['name']] = set(writers[path] for path in
+            item['inputs'] if path in writers and writers[path] !=
+            item['name'])
+
+    pending = dict(dependencies)
+    finished = set()
+
+    while pending:
+
+        ready = [name for name in pending if pending[name] <= finished]
+
+        if not ready:
+
+            raise ValueError('Circular dependency between stages: '
+                             '{}'.format(', '.join(sorted(pending))))
+
+        for name in ready:
+
+            del pending[name]
+            finished.add(name)
+
+    return dependencies
+
+
+def file_digest(path):
+    """
+    This function calculates the SHA-256 digest of a file's contents, or of
+    the files of a folder such as a result store.
+
+    Parameters
+    ----------
+    path : string
+        File path, or folder path whose files are digested in name order.
+
+    Returns
+    -------
+    digest : string
+        Hexadecimal digest, or None if the file does not exist.
+
+    """
+    if not os.path.exists(path):
+
+        return None
+
+    if os.path.isdir(path):
+
+        paths = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+
+    else:
+
+        paths = [path]
+
+    digest = hashlib.sha256()
+
+    for item in paths:
+
+        digest.update(os.path.basename(item).encode('utf-8'))
+
+        with open(item, 'rb') as handle:
+
+            for block in iter(lambda: handle.read(1 << 20), b''):
+
+                digest.update(block)
+
+    return digest.hexdigest()
+
+
+def stage_key(item):
+    """
+    This function calculates the cache key of a stage from its parameters,
+    the contents of its input files and the source files of its code.
+
+    Parameters
+    ----------
+    item : dict
+        Stage declaration.
+
+    Returns
+    -------
+    key : string
+        Hexadecimal SHA-256 digest.
+
+    """
+    code = [inspect.getsourcefile(item['function'])]
+    code += [inspect.getsourcefile(module) for module in item['code']]
+
+    contents = {
+        'name': item['name'],
+        'params': item['params'],
+        'inputs': {path: file_digest(path) for path in item['inputs']},
+        'code': [file_digest(path) for path in code],
+    }
+
+    contents = json.dumps(contents, sort_keys = True, default = repr)
+    key = hashlib.sha256(contents.encode('utf-8')).hexdigest()
+
+    return key
+
+
+def load_cache(path):
+    """
+    Load the stage cache manifest, or an empty one if it does not exist.
+
+    """
+    if path is None or not os.path.exists(path):
+
+        return {}
+
+    with open(path) as handle:
+
+        return json.load(handle)
+
+
+def save_cache(path, manifest):
+    """
+    Write the stage cache manifest.
+
+    """
+    folder = os.path.dirname(path)
+
+    if folder and not os.path.exists(folder):
+
+        os.makedirs(folder)
+
+    with open(path, 'w') as handle:
+
+        json.dump(manifest, handle, indent = 2, sort_keys = True)
+
+
+def is_cached(item, key, manifest):
+    """
+    This function checks whether a stage can be skipped, which requires the 
+    same key as the last run and unchanged outputs.
+
+    Parameters
+    ----------
+    item : dict
+        Stage declaration.
+    key : string
+        Current stage key.
+    manifest : dict
+        Stage cache manifest.
+
+    Returns
+    -------
+    cached : bool
+        True if the stage outputs can be reused.
+
+    """
+    entry = manifest.get(item['name'])
+
+    if entry is None or entry['key'] != key:
+
+        return False
+
+    cached = all(entry['outputs'].get(path) is not None and 
+                 file_digest(path) == entry['outputs'][path] 
+                 for path in item['outputs'])
+
+    return cached
+
+
+def run_stages(stages, max_workers = None, cache = None, 
+               trace_memory = False):
+    """
+    This function runs the stages in dependency order, executing independent
+    stages concurrently on a process pool.
+
+    Parameters
+    ----------
+    stages : list
+        Stage declarations.
+    max_workers : int
+        Number of worker processes. Defaults to the number of processors.
+    cache : string
+        Path of the stage cache manifest. If given, stages whose key and 
+        outputs are unchanged since the last run are skipped.
+    trace_memory : bool
+        If True, the peak memory of each stage is traced with tracemalloc, 
+        which slows down allocation heavy stages. Otherwise only the 
+        high-water mark of the worker process is recorded, and workers are 
+        reused between stages.
+
+    Returns
+    -------
+    metrics : dict
+        Measurements of each stage (see instrument.run_measured), or None for
+        a skipped stage, in order of completion.
+
+    """
+    dependencies = stage_dependencies(stages)
+    items = {item['name']: item for item in stages}
+    manifest = load_cache(cache)
+
+    pending = [item['name'] for item in stages]
+    finished = set()
+    running = {}
+    keys = {}
+    metrics = {}
+
+    with ProcessPoolExecutor(max_workers = max_workers) as executor:
+
+        while pending or running:
+
+            ready = [name for name in pending
+                     if dependencies[name] <= finished]
+
+            for name in ready:
+
+                pending.remove(name)
+
+                if cache is not None:
+
+                    keys[name] = stage_key(items[name])
+
+                    if is_cached(items[name], keys[name], manifest):
+
+                        metrics[name] = None
+                        finished.add(name)
+                        continue
+
+                future = executor.submit(run_measured, 
+                    items[name]['function'], items[name]['rows_from'], 
+                    items[name]['outputs'], trace_memory)
+                running[future] = name
+
+            if ready and not running:
+
+                continue
+
+            if not running:
+
+                raise ValueError('Circular dependency between stages: '
+                                 '{}'.format(', '.join(pending)))
+
+            done, _ = wait(running, return_when = FIRST_COMPLETED)
+
+            for future in done:
+
+                name = running.pop(future)
+                metrics[name] = future.result()
+                finished.add(name)
+
+                if cache is not None:
+
+                    manifest[name] = {'key': keys[name], 'outputs': {path: 
+                        file_digest(path) for path in items[name]['outputs']}}
+                    save_cache(cache, manifest)
+
+    return metrics
@@ -9,18 +9,68 @@ May 2022
 import configparser
 import os
 import random
+import warnings
 import numpy as np
 import pandas as pd
 import saleos.cost as ct
+from scipy.stats import qmc
 from inputs import parameters
+from outputs import ResultWriter, table_path, write_table
+from instrument import measure, metrics_table, write_metrics
+from pipeline import run_stages, stage
 pd.options.mode.chained_assignment = None 
 
 CONFIG = configparser.ConfigParser()
 CONFIG.read(os.path.join(os.path.dirname(__file__), 'script_config.ini'))
 BASE_PATH = CONFIG['file_locations']['base_path']
-
-
-def uq_inputs_capacity(parameters):
+PROCESSED = os.path.join(BASE_PATH, 'processed')
+STAGE_CACHE = os.path.join(PROCESSED, 'stage_cache.json')
+METRICS = os.path.join(PROCESSED, 'preprocess_metrics.json')
+BATCH_SIZE = 100000
+SAMPLERS = ['random', 'lhs', 'sobol']
+SAMPLER = CONFIG.get('model', 'sampler', fallback = 'random')
+SEED = 10
+TRACE_MEMORY = CONFIG.getboolean('instrumentation', 'trace_memory', 
+                                 fallback = False)
+
+# Parameters drawn between their '_low' and '_high' keys, and whether they are 
+# drawn as integers (randint) or as continuous values (uniform).
+CAPACITY_UQ_PARAMETERS = [
+    ('altitude_km', True),
+    ('elevation_angle', True),
+    ('dl_frequency_hz', True),
+    ('power_dbw', True),
+    ('receiver_gain', True),
+    ('earth_atmospheric_losses', True),
+    ('antenna_diameter_m', False),
+]
+
+COST_UQ_PARAMETERS = [
+    ('satellite_manufacturing', True),
+    ('satellite_launch_cost', True),
+    ('ground_station_cost', True),
+    ('regulation_fees', True),
+    ('fiber_infrastructure', True),
+    ('ground_station_energy', True),
+    ('subscriber_acquisition', True),
+    ('staff_costs', True),
+    ('maintenance', True),
+]
+
+# Constellation values read by the capacity and cost generators besides the 
+# '_low' and '_high' keys of the UQ parameters.
+CAPACITY_CONSTANTS = ['name', 'iteration_quantity', 'number_of_satellites', 
+    'number_of_ground_stations', 'subscribers', 'total_area_earth_km_sq', 
+    'percent_coverage', 'speed_of_light', 'antenna_efficiency', 
+    'all_other_losses_db', 'number_of_beams', 'number_of_channels', 
+    'polarization', 'dl_bandwidth_hz', 'subscriber_traffic_percent']
+
+COST_CONSTANTS = ['name', 'iteration_quantity', 'number_of_satellites', 
+    'number_of_ground_stations', 'subscribers', 'number_of_planes', 
+    'number_of_employees', 'discount_rate', 'assessment_period']
+
+
+def uq_inputs_capacity(parameters, rng = None, sampler = 'random'):
     """
     Generate all UQ capacity inputs in preparation for running through the 
     saleos model. 
@@ -29,8 +79,42 @@ def uq_inputs_capacity(parameters):
     ----------
     parameters : dict
         dictionary of dictionary containing constellation engineering values.
+    rng : numpy Generator
+        Seeded generator. If given, all iterations of a constellation are 
+        drawn at once as arrays and written in batches.
+    sampler : string
+        Sampling design used with rng, one of 'random', 'lhs' (Latin 
+        hypercube) or 'sobol' (scrambled Sobol).
 
     """
+    path_out = table_path(PROCESSED, 'uq_parameters_capacity')
+
+    if rng is not None:
+
+        with ResultWriter(path_out, BATCH_SIZE) as writer:
+
+            for key, constellation_params in parameters.items():
+
+                if key not in ['starlink', 'oneweb', 'kuiper', 'geo']:
+
+                    continue
+
+                engine = create_sampler(sampler, len(CAPACITY_UQ_PARAMETERS), rng)
+
+                for iterations in batch_iterations(constellation_params):
+
+                    with measure('sample_capacity_inputs') as rows:
+
+                        df = multiorbit_sat_capacity_batch(iterations, 
+                            constellation_params, rng, engine)
+                        rows['rows_out'] = len(df)
+
+                    with measure('write_table', len(df), len(df)):
+
+                        writer.write_batch(df)
+
+        return
+
     iterations = []
 
     for key, constellation_params in parameters.items():
@@ -41,22 +125,151 @@ def uq_inputs_capacity(parameters):
                 
                 data = multiorbit_sat_capacity(i, constellation_params)
 
-            iterations = iterations + data
+            iterations.extend(data)
 
     df = pd.DataFrame.from_dict(iterations)
 
-    filename = 'uq_parameters_capacity.csv'
-
     if not os.path.exists(BASE_PATH):
 
         os.makedirs(BASE_PATH)
     
-    path_out = os.path.join(BASE_PATH, 'processed', filename)
-    df.to_csv(path_out, index = False)
+    write_table(df, path_out)
 
     return
 
 
+def create_sampler(sampler, dimensions, rng):
+    """
+    Create the sampling engine used to draw UQ parameters.
+
+    Parameters
+    ----------
+    sampler : string
+        One of 'random', 'lhs' (Latin hypercube) or 'sobol' (scrambled Sobol).
+    dimensions : int
+        Number of parameters drawn together.
+    rng : numpy Generator
+        Seeded generator.
+
+    Return
+    ------
+    engine : scipy.stats.qmc.QMCEngine
+        Stratified sampling engine, or None for independent random draws.
+
+    """
+    if sampler not in SAMPLERS:
+
+        raise ValueError('Sampler must be one of {}'.format(SAMPLERS))
+
+    if sampler == 'lhs':
+
+        return qmc.LatinHypercube(d = dimensions, seed = rng)
+
+    if sampler == 'sobol':
+
+        return qmc.Sobol(d = dimensions, scramble = True, seed = rng)
+
+    return None
+
+
+def sample_parameters(constellation_params, uq_parameters, size, rng, 
+                      engine = None):
+    """
+    Draw UQ parameters between their low and high values.
+
+    Without an engine, integer parameters are drawn as with randint and 
+    continuous ones as with uniform. With a stratified engine, each unit 
+    sample is scaled to the parameter range, and integer parameters are 
+    binned onto the whole numbers between low and high inclusive.
+
+    Parameters
+    ----------
+    constellation_params : dict
+        Dictionary containing satellite engineering or cost details.
+    uq_parameters : list of tuples
+        Parameter names and whether each is drawn as an integer.
+    size : int
+        Number of draws.
+    rng : numpy Generator
+        Seeded generator.
+    engine : scipy.stats.qmc.QMCEngine
+        Stratified sampling engine.
+
+    Return
+    ------
+    draws : dict
+        Array of draws for every parameter.
+
+    """
+    draws = {}
+
+    if engine is not None:
+
+        with warnings.catch_warnings():
+
+            # Sobol balance is best at powers of two, but batches are sized 
+            # by the iteration quantity.
+            warnings.simplefilter('ignore', UserWarning)
+            unit_samples = engine.random(size)
+
+    for dimension, (key, integer) in enumerate(uq_parameters):
+
+        low = constellation_params[key + '_low']
+        high = constellation_params[key + '_high']
+
+        if integer:
+
+            low, high = int(low), int(high)
+
+        if engine is None:
+
+            if integer:
+
+                draws[key] = rng.integers(low, high, size = size, 
+                                          endpoint = True)
+
+            else:
+
+                draws[key] = rng.uniform(low, high, size = size)
+
+            continue
+
+        unit_sample = unit_samples[:, dimension]
+
+        if integer:
+
+            draws[key] = np.minimum(low + np.floor(
+                unit_sample * (high - low + 1)).astype(np.int64), high)
+
+        else:
+
+            draws[key] = low + unit_sample * (high - low)
+
+    return draws
+
+
+def batch_iterations(constellation_params):
+    """
+    Split the iterations of a constellation into fixed-size batches.
+
+    Parameters
+    ----------
+    constellation_params : dict
+        Dictionary containing satellite engineering details
+
+    Return
+    ------
+    iterations : generator of numpy arrays
+        Iteration numbers of each batch.
+
+    """
+    quantity = constellation_params['iteration_quantity']
+
+    for start in range(0, quantity, BATCH_SIZE):
+
+        yield np.arange(start, min(start + BATCH_SIZE, quantity))
+
+
 def multiorbit_sat_capacity(i, constellation_params):
     """
     This function generates random values within the given parameter ranges. 
@@ -147,7 +360,72 @@ def multiorbit_sat_capacity(i, constellation_params):
     return output
 
 
-def uq_inputs_cost(parameters):
+def multiorbit_sat_capacity_batch(iterations, constellation_params, rng, 
+                                  engine = None):
+    """
+    This function generates random values within the given parameter ranges 
+    for a batch of iterations at once.
+
+    Parameters
+    ----------
+    iterations : numpy array
+        Iteration numbers of the batch.
+    constellation_params : dict
+        Dictionary containing satellite engineering details
+    rng : numpy Generator
+        Seeded generator used for every draw.
+    engine : scipy.stats.qmc.QMCEngine
+        Stratified sampling engine, or None for independent random draws.
+
+    Return
+    ------
+    output : DataFrame
+        Capacity inputs with one row per iteration.
+
+    """
+    draws = sample_parameters(constellation_params, CAPACITY_UQ_PARAMETERS, 
+                              len(iterations), rng, engine)
+
+    ideal_coverage_area_per_sat_sqkm = (
+        constellation_params['total_area_earth_km_sq'] 
+        / constellation_params['number_of_satellites'])
+
+    output = pd.DataFrame({
+        'iteration': iterations,
+        'constellation': constellation_params['name'], 
+        'number_of_satellites': constellation_params['number_of_satellites'],
+        'number_of_ground_stations': (
+            constellation_params['number_of_ground_stations']),
+        'subscribers_low': constellation_params['subscribers'][0],
+        'subscribers_baseline': constellation_params['subscribers'][1],
+        'subscribers_high': constellation_params['subscribers'][2],
+        'altitude_km': draws['altitude_km'],
+        'elevation_angle': draws['elevation_angle'],
+        'dl_frequency_hz': draws['dl_frequency_hz'],
+        'power_dbw': draws['power_dbw'],
+        'receiver_gain_db': draws['receiver_gain'],
+        'earth_atmospheric_losses_db': (
+            draws['earth_atmospheric_losses']),
+        'antenna_diameter_m': draws['antenna_diameter_m'],
+        'total_area_earth_km_sq' : (
+            constellation_params['total_area_earth_km_sq']),
+        'ideal_coverage_area_per_sat_sqkm': ideal_coverage_area_per_sat_sqkm,
+        'percent_coverage' : constellation_params['percent_coverage'],
+        'speed_of_light': constellation_params['speed_of_light'],
+        'antenna_efficiency' : constellation_params['antenna_efficiency'],
+        'all_other_losses_db' : constellation_params['all_other_losses_db'],
+        'number_of_beams' : constellation_params['number_of_beams'],
+        'number_of_channels' : constellation_params['number_of_channels'],
+        'polarization' : constellation_params['polarization'],
+        'dl_bandwidth_hz' : constellation_params['dl_bandwidth_hz'],
+        'subscriber_traffic_percent' : (
+            constellation_params['subscriber_traffic_percent'])
+    })
+
+    return output
+
+
+def uq_inputs_cost(parameters, rng = None, sampler = 'random'):
     """
     Generate all UQ cost inputs in preparation for running through the saleos 
     model. 
@@ -156,8 +434,42 @@ def uq_inputs_cost(parameters):
     ----------
     parameters : dict
         dictionary of dictionary containing constellation cost values.
+    rng : numpy Generator
+        Seeded generator. If given, all iterations of a constellation are 
+        drawn at once as arrays and written in batches.
+    sampler : string
+        Sampling design used with rng, one of 'random', 'lhs' (Latin 
+        hypercube) or 'sobol' (scrambled Sobol).
 
     """
+    path_out = table_path(PROCESSED, 'uq_parameters_cost')
+
+    if rng is not None:
+
+        with ResultWriter(path_out, BATCH_SIZE) as writer:
+
+            for key, constellation_params in parameters.items():
+
+                if key not in ['starlink', 'oneweb', 'kuiper', 'geo']:
+
+                    continue
+
+                engine = create_sampler(sampler, len(COST_UQ_PARAMETERS), rng)
+
+                for iterations in batch_iterations(constellation_params):
+
+                    with measure('sample_cost_inputs') as rows:
+
+                        df = multiorbit_sat_costs_batch(iterations, 
+                            constellation_params, rng, engine)
+                        rows['rows_out'] = len(df)
+
+                    with measure('write_table', len(df), len(df)):
+
+                        writer.write_batch(df)
+
+        return
+
     iterations = []
 
     for key, constellation_params in parameters.items():
@@ -169,18 +481,15 @@ def uq_inputs_cost(parameters):
 
                 data = multiorbit_sat_costs(i, constellation_params)
 
-            iterations = iterations + data
+            iterations.extend(data)
 
     df = pd.DataFrame.from_dict(iterations)
 
-    filename = 'uq_parameters_cost.csv'
-
     if not os.path.exists(BASE_PATH):
 
         os.makedirs(BASE_PATH)
     
-    path_out = os.path.join(BASE_PATH, 'processed', filename)
-    df.to_csv(path_out, index = False)
+    write_table(df, path_out)
 
     return
 
@@ -285,15 +594,179 @@ def multiorbit_sat_costs(i, constellation_params):
     return output
 
 
-if __name__ == '__main__':
+def multiorbit_sat_costs_batch(iterations, constellation_params, rng, 
+                               engine = None):
+    """
+    This function generates random values within the given parameter ranges 
+    for a batch of iterations at once.
+
+    Parameters
+    ----------
+    iterations : numpy array
+        Iteration numbers of the batch.
+    constellation_params : dict
+        Dictionary containing satellite cost details
+    rng : numpy Generator
+        Seeded generator used for every draw.
+    engine : scipy.stats.qmc.QMCEngine
+        Stratified sampling engine, or None for independent random draws.
+
+    Return
+    ------
+    output : DataFrame
+        Cost inputs with one row per iteration.
+
+    """
+    draws = sample_parameters(constellation_params, COST_UQ_PARAMETERS, 
+                              len(iterations), rng, engine)
+
+    number_of_satellites = constellation_params['number_of_satellites']
+    number_of_ground_stations = (
+        constellation_params['number_of_ground_stations'])
+
+    #these calcs are unit input cost * number of units. 
+    satellite_manufacturing = (draws['satellite_manufacturing'] 
+                               * number_of_satellites)
+    satellite_launch_cost = (draws['satellite_launch_cost'] 
+                             * number_of_satellites)
+    ground_station_cost = (draws['ground_station_cost'] 
+                           * number_of_ground_stations)
+    regulation_fees = (draws['regulation_fees'] 
+                       * constellation_params['number_of_planes'])
+    fiber_infrastructure_cost = (draws['fiber_infrastructure'] 
+                                 * number_of_ground_stations)
+    ground_station_energy = (draws['ground_station_energy'] 
+                             * number_of_ground_stations)
+    subscriber_acquisition = draws['subscriber_acquisition']
+    staff_costs = (draws['staff_costs'] 
+                   * constellation_params['number_of_employees'])
+    maintenance_costs = draws['maintenance']
+
+    capex_costs = (satellite_manufacturing + satellite_launch_cost 
+                   + ground_station_cost + fiber_infrastructure_cost)
+    
+    opex_costs = ct.opex_cost_batch(regulation_fees, ground_station_energy, 
+                                    staff_costs, subscriber_acquisition, 
+                                    maintenance_costs, 
+                                    constellation_params['discount_rate'], 
+                                    constellation_params['assessment_period'])
+
+    output = pd.DataFrame({
+        'iteration': iterations,
+        'constellation': constellation_params['name'], 
+        'number_of_satellites': number_of_satellites,
+        'number_of_ground_stations': number_of_ground_stations,
+        'subscribers_low': constellation_params['subscribers'][0],
+        'subscribers_baseline': constellation_params['subscribers'][1],
+        'subscribers_high': constellation_params['subscribers'][2],
+        'satellite_manufacturing': satellite_manufacturing,
+        'satellite_launch_cost': satellite_launch_cost,
+        'ground_station_cost': ground_station_cost,
+        'regulation_fees': regulation_fees,
+        'fiber_infrastructure_cost': fiber_infrastructure_cost,
+        'ground_station_energy': ground_station_energy,
+        'subscriber_acquisition': subscriber_acquisition,
+        'staff_costs': staff_costs,
+        'maintenance_costs': maintenance_costs,
+        'capex_costs': capex_costs,
+        'opex_costs': opex_costs,
+        'discount_rate': constellation_params['discount_rate'],
+        'assessment_period_year': constellation_params['assessment_period'],
+    })
+
+    return output
+
+
+def parameter_slice(parameters, uq_parameters, constants):
+    """
+    This function selects the constellation values used by one of the UQ 
+    input generators, so that its cache key only changes with them.
+
+    Parameters
+    ----------
+    parameters : dict
+        dictionary of dictionary containing constellation values.
+    uq_parameters : list
+        (key, is_integer) pairs of the parameters drawn by the generator.
+    constants : list
+        Other constellation keys read by the generator.
+
+    Returns
+    -------
+    params : dict
+        Selected values keyed by constellation.
 
-    print('Setting seed for consistent results')
-    random.seed(10)
+    """
+    keys = list(constants)
+
+    for key, is_integer in uq_parameters:
+
+        keys += [key + '_low', key + '_high']
+
+    params = {}
+
+    for constellation in ['starlink', 'oneweb', 'kuiper', 'geo']:
+
+        params[constellation] = {key: parameters[constellation][key] 
+                                 for key in keys}
+
+    return params
+
+
+def generate_capacity_inputs():
+    """
+    Generate the UQ capacity inputs from the first seeded stream, with the 
+    sampler set in script_config.ini.
+
+    """
+    uq_inputs_capacity(parameters, np.random.default_rng([SEED, 0]), 
+                       SAMPLER)
+
+
+def generate_cost_inputs():
+    """
+    Generate the UQ cost inputs from the second seeded stream, with the 
+    sampler set in script_config.ini.
+
+    """
+    uq_inputs_cost(parameters, np.random.default_rng([SEED, 1]), SAMPLER)
+
+
+def preprocess_stages():
+    """
+    This function declares the UQ input generators as pipeline stages. Each 
+    draws from its own seeded stream so the stages can be run, or skipped, 
+    independently.
+
+    Returns
+    -------
+    stages : list
+        Stage declarations for pipeline.run_stages.
+
+    """
+    stages = [
+        stage('uq_inputs_capacity', generate_capacity_inputs, [], 
+              [table_path(PROCESSED, 'uq_parameters_capacity')], 
+              {'seed': [SEED, 0], 'sampler': SAMPLER, 
+              'parameters': parameter_slice(parameters, 
+              CAPACITY_UQ_PARAMETERS, CAPACITY_CONSTANTS)}),
+        stage('uq_inputs_cost', generate_cost_inputs, [], 
+              [table_path(PROCESSED, 'uq_parameters_cost')], 
+              {'seed': [SEED, 1], 'sampler': SAMPLER, 
+              'parameters': parameter_slice(parameters, 
+              COST_UQ_PARAMETERS, COST_CONSTANTS)}, [ct]),
+    ]
+
+    return stages
+
+
+if __name__ == '__main__':
 
-    print('Running uq_capacity_inputs_generator()')
-    uq_inputs_capacity(parameters)
+    print('Generating UQ inputs')
+    metrics = run_stages(preprocess_stages(), cache = STAGE_CACHE, 
+                         trace_memory = TRACE_MEMORY)
 
-    print('Running uq_cost_inputs_generator()')
-    uq_inputs_cost(parameters)
+    write_metrics(metrics, METRICS)
+    print(metrics_table(metrics))
 
-    print('Completed')
\ No newline at end of file
+    print('Completed')
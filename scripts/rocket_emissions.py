@@ -7,6 +7,7 @@ import configparser
 import os
 import pandas as pd
 import numpy as np
+from outputs import read_table, table_path
 pd.options.mode.chained_assignment = None 
 
 CONFIG = configparser.ConfigParser()
@@ -20,8 +21,11 @@ def calc():
     classified by the impact category.
 
     """
-    emission_data = os.path.join(RESULTS, 'individual_emissions.csv')
-    df = pd.read_csv(emission_data)
+    emission_data = table_path(RESULTS, 'individual_emissions')
+    df = read_table(emission_data, columns = ['rocket_detailed', 'scenario', 
+        'no_of_launches', 'subscriber_scenario', 'impact_category', 
+        'climate_change_baseline_kg', 'ozone_depletion_baseline_kg', 
+        'resource_depletion_kg', 'freshwater_toxicity_m3', 'human_toxicity'])
     df = df[df['scenario'] == 'scenario1']
     df = df[df['subscriber_scenario'] == 'subscribers_baseline']
 
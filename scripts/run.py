@@ -8,13 +8,21 @@ May 2022
 """
 import configparser
 import os
-import math
 import time
+from collections import Counter
+import numpy as np
 import pandas as pd
 import saleos.cost as ct
 import saleos.capacity as cy
 
-from inputs import falcon_9, soyuz, unknown_hyc, unknown_hyg, lut, parameters
+from inputs import lut, parameters
+import emissions
+from emissions import (ROCKET_FACTORS, SUBSCRIBER_SCENARIOS, add_subscribers, 
+                       calc_launch_emissions, constellation_table, 
+                       read_rocket_factors)
+from outputs import ResultWriter, read_table, table_path, write_table
+from instrument import measure, measure_chunks, metrics_table, write_metrics
+from pipeline import run_stages, stage
 from tqdm import tqdm
 pd.options.mode.chained_assignment = None 
 
@@ -23,6 +31,26 @@ CONFIG.read(os.path.join(os.path.dirname(__file__), 'script_config.ini'))
 BASE_PATH = CONFIG['file_locations']['base_path']
 RESULTS = os.path.join(BASE_PATH, '..', 'results')
 DATA = os.path.join(BASE_PATH, 'processed')
+STAGE_CACHE = os.path.join(DATA, 'stage_cache.json')
+METRICS = os.path.join(RESULTS, 'run_metrics.json')
+BATCH_SIZE = 10000
+
+# Evaluate the link budget sub-stages once per distinct tuple of their inputs
+# in a batch, as set by deduplicate_link_budget in script_config.ini. This 
+# pays off when the inputs are drawn from narrow integer ranges.
+DEDUPLICATE_LINK_BUDGET = CONFIG.getboolean('model', 
+    'deduplicate_link_budget', fallback = False)
+
+# CNR to spectral efficiency lookup, compiled once for every batch.
+SPECTRAL_EFFICIENCY = cy.SpectralEfficiencyLookup(lut)
+TRACE_MEMORY = CONFIG.getboolean('instrumentation', 'trace_memory', 
+                                 fallback = False)
+
+# Constellation names used in the cost results, with their orbit type.
+CONSTELLATIONS = pd.DataFrame({
+    'constellation': ['Kuiper', 'OneWeb', 'Starlink', 'GEO'],
+    'orbit': ['LEO', 'LEO', 'LEO', 'GEO'],
+}).set_index('constellation')
 
 
 def run_uq_processing_capacity():
@@ -30,254 +58,111 @@ def run_uq_processing_capacity():
     Run the UQ inputs through the saleos model. 
     
     """
-    path = os.path.join(BASE_PATH, 'processed', 'uq_parameters_capacity.csv') 
+    path = table_path(DATA, 'uq_parameters_capacity')
 
     if not os.path.exists(path):
-        print('Cannot locate uq_parameters_capacity.csv')
+        print('Cannot locate {}'.format(os.path.basename(path)))
 
-    df = pd.read_csv(path)
-    df = df.to_dict('records')
-
-    results = []
-
-    for item in tqdm(df, desc = "Processing uncertainty results"):
-
-        satellite_coverage_area_km = cy.calc_geographic_metrics(
-            item['number_of_satellites'], item['total_area_earth_km_sq'])
-        
-        slant_distance = round(cy.signal_distance(item['altitude_km'], 
-                         item['elevation_angle']), 4)
-        
-        satellite_centric_angle = cy.calc_sat_centric_angle(
-                                  item['altitude_km'], item['elevation_angle'])
-        
-        earth_central_angle = cy.calc_earth_central_angle(
-                                  item['altitude_km'], item['elevation_angle'])
-        
-        sat_coverage_area = cy.calc_satellite_coverage(item['altitude_km'], 
-                                  item['elevation_angle'])
-         
-        path_loss = round(cy.calc_free_path_loss(item['dl_frequency_hz'], 
-                    slant_distance), 4)
-        
-        losses = round(cy.calc_losses(item['earth_atmospheric_losses_db'], 
-            item['all_other_losses_db']), 4)
-
-        antenna_gain = round(cy.calc_antenna_gain(
-            item['speed_of_light'], item['antenna_diameter_m'], 
-            item['dl_frequency_hz'], item['antenna_efficiency']), 4) 
-
-        eirp = round(cy.calc_eirpd(item['power_dbw'], antenna_gain), 4)
-
-        noise = round(cy.calc_noise(), 4)
-
-        received_power = round(cy.calc_received_power(
-            eirp, path_loss, item['receiver_gain_db'], losses), 4)
-
-        cnr = round(cy.calc_cnr(received_power, noise), 4)
-
-        spectral_efficiency = cy.calc_spectral_efficiency(cnr, lut)
-
-        channel_capacity = round(cy.calc_capacity(spectral_efficiency, 
-            item['dl_bandwidth_hz']), 4)
-
-        sat_capacity = round(cy.single_satellite_capacity(
-            item['dl_bandwidth_hz'], spectral_efficiency, 
-            item['number_of_channels'], item['polarization'],
-            item['number_of_beams']), 4)
-        
-        constellation_capacity = round((cy.calc_constellation_capacity(
-                channel_capacity, item['number_of_channels'], 
-                item['polarization'], item['number_of_beams'], 
-                item['number_of_satellites'], item['percent_coverage'])), 4)
-            
-        # 0.567805 and 1.647211 are spectral efficiency threshold values o
-        # btained from page 53 of DVB-S2 documentation
-        # ( https://dvb.org/?standard=second-generation-framing-structure
-        #   -channel-coding-and-modulation-systems-for-broadcasting-interactive
-        #   -services-news-gathering-and-other-broadband-satellite-applications
-        #   -part-2-dvb-s2-extensions)
-        if spectral_efficiency <= 0.567805:
-            cnr_scenario = 'low'
-        elif spectral_efficiency >= 1.647211:
-            cnr_scenario = 'high'
-        else:
-            cnr_scenario = 'baseline'
- 
-        results.append({
-            'constellation': item['constellation'], 
-            'number_of_satellites': item['number_of_satellites'],
-            'total_area_earth_km_sq': item['total_area_earth_km_sq'],
-            'elevation_angle': item['elevation_angle'],
-            'altitude_km': item['altitude_km'],
-            'satellite_centric_angle': satellite_centric_angle,
-            'earth_central_angle' : earth_central_angle,
-            'signal_path_km': round(slant_distance, 4), 
-            'coverage_area_per_sat_sqkm' : round(sat_coverage_area, 4),
-            'dl_frequency_hz': item['dl_frequency_hz'],
-            'dl_bandwidth_hz': item['dl_bandwidth_hz'],
-            'power_dbw': item['power_dbw'],
-            'receiver_gain_db': item['receiver_gain_db'],
-            'earth_atmospheric_losses_db': item['earth_atmospheric_losses_db'],
-            'all_other_losses_db': item['all_other_losses_db'],
-            'subscribers_low': item['subscribers_low'],
-            'subscribers_baseline': item['subscribers_baseline'],
-            'subscribers_high': item['subscribers_high'],
-            'subscriber_traffic_percent' : item['subscriber_traffic_percent'],
-            'satellite_coverage_area_km': round(satellite_coverage_area_km, 4),
-            'percent_coverage' : item['percent_coverage'],
-            'path_loss_db': path_loss, 
-            'losses_db': losses, 
-            'antenna_gain_db': antenna_gain, 
-            'eirp_db': eirp,
-            'noise_db': noise, 
-            'received_power_db': received_power, 
-            'cnr_db': cnr, 
-            'spectral_efficiency_bphz': spectral_efficiency, 
-            'channel_capacity_mbps': channel_capacity,
-            'capacity_per_single_satellite_mbps': sat_capacity,
-            'constellation_capacity_mbps': constellation_capacity,
-            'cnr_scenario' : cnr_scenario
-        })
-
-        df = pd.DataFrame.from_dict(results)
-
-        filename = 'interim_results_capacity.csv'
-        
-        if not os.path.exists(DATA):
-
-            os.makedirs(DATA)
-
-        path_out = os.path.join(DATA, filename)
-        df.to_csv(path_out, index = False)
+    path_out = table_path(DATA, 'interim_results_capacity')
 
-    return 
+    evaluated = Counter()
 
+    with ResultWriter(path_out, BATCH_SIZE) as writer:
 
-def calc_emission_type(df, rocket, datapoint, emission_category, no_launches):
+        for df in tqdm(measure_chunks(read_table(path, chunksize = 
+                       BATCH_SIZE), 'read_table'), 
+                       desc = 'Processing uncertainty results'):
 
-    """
-    This function is for calculating emission type.
+            with measure('calc_capacity_results', len(df)) as rows:
 
-    Parameters
-    ----------
-    df : panda core series
-        dataframe.
-    rocket : string
-        Launching rocket
-    datapoint : int
-        individual data values
-    emission_category : string
-        Emission type e.g 'launch event'.
-    no_launches : 1
-        Number of satellite launches
+                df = calc_capacity_results(df, DEDUPLICATE_LINK_BUDGET, 
+                                           evaluated)
+                rows['rows_out'] = len(df)
 
-    Returns
-    -------
-    emission_dict : dict
-        Dictionary containing all the emission categories.
-    """
-    emission_dict = {}
+            with measure('write_table', len(df), len(df)):
 
-    df.loc[datapoint, 'climate_change_baseline'] = (
-        rocket['climate_change_baseline'][emission_category] 
-        * no_launches) 
-    
-    emission_dict['climate_change_baseline'] = (
-        df['climate_change_baseline'].loc[datapoint])
+                writer.write_batch(df)
 
-    df.loc[datapoint, 'climate_change_worst_case'] = (
-        rocket['climate_change_worst_case'][emission_category] 
-        * no_launches)
-    
-    emission_dict['climate_change_worst_case'] = (
-        df['climate_change_worst_case'].loc[datapoint])
+    if DEDUPLICATE_LINK_BUDGET and evaluated['rows']:
 
-    df.loc[datapoint, 'ozone_depletion_baseline'] = (
-        rocket['ozone_depletion_baseline'][emission_category] 
-        * no_launches)
-    
-    emission_dict['ozone_depletion_baseline'] = (
-        df['ozone_depletion_baseline'].loc[datapoint])
+        for name in ['geometry', 'path_loss', 'spectral_efficiency']:
 
-    df.loc[datapoint, 'ozone_depletion_worst_case'] = (
-        rocket['ozone_depletion_worst_case'][emission_category]
-        * no_launches)
-    
-    emission_dict['ozone_depletion_worst_case'] = (
-        df['ozone_depletion_worst_case'].loc[datapoint])
-
-    df.loc[datapoint, 'resource_depletion'] = (
-        rocket['resource_depletion'][emission_category]
-        * no_launches)
-    
-    emission_dict['resource_depletion'] = (
-        df['resource_depletion'].loc[datapoint])
-
-    df.loc[datapoint, 'freshwater_toxicity'] = (
-        rocket['freshwater_toxicity'][emission_category]
-        * no_launches)
-    
-    emission_dict['freshwater_toxicity'] = (
-        df['freshwater_toxicity'].loc[datapoint])
-
-    df.loc[datapoint,'human_toxicity'] = (
-        rocket['human_toxicity'][emission_category]
-        * no_launches)
-    
-    emission_dict['human_toxicity'] = (
-        df.loc[datapoint, 'human_toxicity'])
-
-    return emission_dict
+            print('Link budget {} evaluated for {} distinct of {} rows (dedup '
+                  'ratio {:.1f})'.format(name, evaluated[name], 
+                  evaluated['rows'], evaluated['rows'] / 
+                  max(evaluated[name], 1)))
 
+    return 
 
-def calc_total_carbon_emission(df, rocket, datapoint, no_launches):
 
+def calc_capacity_results(df, deduplicate = False, evaluated = None):
     """
-    This function is for calculating total carbon emission by scenario.
+    This function evaluates the link budget for a batch of UQ capacity inputs.
 
     Parameters
     ----------
-    df : panda core series
-        dataframe.
-    rocket : string
-        Launching rocket
-    datapoint : int
-        individual data values
-    no_launches : 1
-        Number of satellite launches
+    df : DataFrame
+        UQ capacity inputs.
+    deduplicate : bool
+        If True, the geometry, path loss and spectral efficiency of the link 
+        budget are evaluated once per distinct tuple of their inputs and 
+        broadcast to the rows sharing it.
+    evaluated : Counter
+        If given, the number of rows ('rows') and the number of evaluations 
+        of every deduplicated sub-stage are added to it.
 
     Returns
     -------
-    total_dict : dict
-        Dictionary containing all carbon emission scenarios.
+    df : DataFrame
+        Interim capacity results.
+
     """
+    if deduplicate:
 
-    total_dict = {}
+        link_budget, distinct = cy.calc_unique_link_budget(df, 
+            SPECTRAL_EFFICIENCY)
 
-    df.loc[datapoint, 'total_baseline_carbon_emissions'] = (
-        rocket['totals']['total_baseline_carbon_emissions'] * no_launches) 
-    
-    df.loc[datapoint, 'total_worst_case_carbon_emissions'] = (
-        rocket['totals']['total_worst_case_carbon_emissions'] * no_launches) 
-    
-    df.loc[datapoint, 'total_ozone_depletion_baseline'] = (
-        rocket['totals']['total_ozone_depletion_baseline'] * no_launches)
-    
-    df.loc[datapoint, 'total_ozone_depletion_worst_case'] = (
-        rocket['totals']['total_ozone_depletion_worst_case'] * no_launches)
+    else:
 
-    df.loc[datapoint, 'total_resource_depletion'] = (
-        rocket['totals']['total_resource_depletion'] * no_launches)
+        link_budget = cy.calc_link_budget(df, SPECTRAL_EFFICIENCY)
+        distinct = {}
 
-    df.loc[datapoint, 'total_freshwater_toxicity'] = (
-        rocket['totals']['total_freshwater_toxicity'] * no_launches)
-    
-    df.loc[datapoint, 'total_human_toxicity'] = (
-        rocket['totals']['total_human_toxicity'] * no_launches)
+    if evaluated is not None:
+
+        evaluated.update(distinct)
+        evaluated['rows'] += len(df)
+
+    for key, values in link_budget.items():
+
+        df[key] = values
+
+    # 0.567805 and 1.647211 are spectral efficiency threshold values o
+    # btained from page 53 of DVB-S2 documentation
+    # ( https://dvb.org/?standard=second-generation-framing-structure
+    #   -channel-coding-and-modulation-systems-for-broadcasting-interactive
+    #   -services-news-gathering-and-other-broadband-satellite-applications
+    #   -part-2-dvb-s2-extensions)
+    spectral_efficiency = df['spectral_efficiency_bphz']
+    df['cnr_scenario'] = np.select([spectral_efficiency <= 0.567805, 
+                         spectral_efficiency >= 1.647211], ['low', 'high'], 
+                         'baseline')
+
+    df = df[['constellation', 'number_of_satellites', 'total_area_earth_km_sq',
+             'elevation_angle', 'altitude_km', 'satellite_centric_angle', 
+             'earth_central_angle', 'signal_path_km', 
+             'coverage_area_per_sat_sqkm', 'dl_frequency_hz', 
+             'dl_bandwidth_hz', 'power_dbw', 'receiver_gain_db', 
+             'earth_atmospheric_losses_db', 'all_other_losses_db', 
+             'subscribers_low', 'subscribers_baseline', 'subscribers_high', 
+             'subscriber_traffic_percent', 'satellite_coverage_area_km', 
+             'percent_coverage', 'path_loss_db', 'losses_db', 
+             'antenna_gain_db', 'eirp_db', 'noise_db', 'received_power_db', 
+             'cnr_db', 'spectral_efficiency_bphz', 'channel_capacity_mbps', 
+             'capacity_per_single_satellite_mbps', 
+             'constellation_capacity_mbps', 'cnr_scenario']]
+
+    return df
 
-    return total_dict
-    
 
 def calc_social_carbon_cost(carbon_amount):
     """
@@ -326,173 +211,13 @@ def calc_emissions():
 
     df = df.drop('value', axis = 1) 
 
-    df[['climate_change_baseline', 'climate_change_worst_case', 
-        'ozone_depletion_baseline', 'ozone_depletion_worst_case',
-        'resource_depletion', 'freshwater_toxicity', 
-        'human_toxicity', 'subscribers_low', 'subscribers_baseline', 
-        'subscribers_high']] = ''
-
-    for i in range(len(df)):
-
-        ################################### Falcon-9 Rocket ####################
-        if df['rocket'].loc[i] == 'falcon9' and df['impact_category'].loc[i] == 'launch_event':
-
-            for key, item in falcon_9.items():
-
-                calc_emission_type(df, falcon_9, i, 'launch_event', df['no_of_launches'].loc[i])
-                
-        if df['rocket'].loc[i] == 'falcon9' and df['impact_category'].loc[i] == 'launcher_production': 
-
-            calc_emission_type(df, falcon_9, i, 'launcher_production', df['no_of_launches'].loc[i])
-
-        if df['rocket'].loc[i] == 'falcon9' and df['impact_category'].loc[i] == 'launcher_ait':
-
-            calc_emission_type(df, falcon_9, i, 'launcher_ait', df['no_of_launches'].loc[i]) 
-
-        if df['rocket'].loc[i] == 'falcon9' and df['impact_category'].loc[i] == 'propellant_production':
-
-            calc_emission_type(df, falcon_9, i, 'propellant_production', df['no_of_launches'].loc[i]) 
-
-        if df['rocket'].loc[i] == 'falcon9' and df['impact_category'].loc[i] == 'propellant_scheduling':
-
-            calc_emission_type(df, falcon_9, i, 'propellant_scheduling', df['no_of_launches'].loc[i]) 
-
-        if df['rocket'].loc[i] == 'falcon9' and df['impact_category'].loc[i] == 'launcher_transportation':
-
-            calc_emission_type(df, falcon_9, i, 'launcher_transportation', df['no_of_launches'].loc[i]) 
-
-        if df['rocket'].loc[i] == 'falcon9' and df['impact_category'].loc[i] == 'launch_campaign':
-
-            calc_emission_type(df, falcon_9, i, 'launch_campaign', df['no_of_launches'].loc[i])
-
-        ################################### Soyuz-FG Rocket #################################
-        if df['rocket'].loc[i] == 'soyuz' and df['impact_category'].loc[i] == 'launch_event':
-
-            for key, item in soyuz.items():
-
-                calc_emission_type(df, soyuz, i, 'launch_event', df['no_of_launches'].loc[i])
-                
-        if df['rocket'].loc[i] == 'soyuz' and df['impact_category'].loc[i] == 'launcher_production': 
-
-            calc_emission_type(df, soyuz, i, 'launcher_production', df['no_of_launches'].loc[i])
-
-        if df['rocket'].loc[i] == 'soyuz' and df['impact_category'].loc[i] == 'launcher_ait': 
-
-            calc_emission_type(df, soyuz, i, 'launcher_ait', df['no_of_launches'].loc[i])
+    with measure('calc_launch_emissions', len(df)) as rows:
 
-        if df['rocket'].loc[i] == 'soyuz' and df['impact_category'].loc[i] == 'propellant_production': 
+        df = calc_launch_emissions(df, read_rocket_factors())
+        rows['rows_out'] = len(df)
 
-            calc_emission_type(df, soyuz, i, 'propellant_production', df['no_of_launches'].loc[i])
+    df = add_subscribers(df, parameters)
 
-        if df['rocket'].loc[i] == 'soyuz' and df['impact_category'].loc[i] == 'propellant_scheduling': 
-
-            calc_emission_type(df, soyuz, i, 'propellant_scheduling', df['no_of_launches'].loc[i])
-
-        if df['rocket'].loc[i] == 'soyuz' and df['impact_category'].loc[i] == 'launcher_transportation': 
-
-            calc_emission_type(df, soyuz, i, 'launcher_transportation', df['no_of_launches'].loc[i])
-
-        if df['rocket'].loc[i] == 'soyuz' and df['impact_category'].loc[i] == 'launch_campaign': 
-
-            calc_emission_type(df, soyuz, i, 'launch_campaign', df['no_of_launches'].loc[i])
-
-        ############################ Unknown Hydrocarbon Rocket ##################################
-        if df['rocket'].loc[i] == 'unknown_hyc' and df['impact_category'].loc[i] == 'launch_event':
-
-            for key, item in unknown_hyc.items():
-
-                calc_emission_type(df, unknown_hyc, i, 'launch_event', df['no_of_launches'].loc[i])
-
-        if df['rocket'].loc[i] == 'unknown_hyc' and df['impact_category'].loc[i] == 'launcher_production':
-
-            calc_emission_type(df, unknown_hyc, i, 'launcher_production', df['no_of_launches'].loc[i])
-
-        if df['rocket'].loc[i] == 'unknown_hyc' and df['impact_category'].loc[i] == 'launcher_ait':
-
-            calc_emission_type(df, unknown_hyc, i, 'launcher_ait', df['no_of_launches'].loc[i])
-
-        if df['rocket'].loc[i] == 'unknown_hyc' and df['impact_category'].loc[i] == 'propellant_production':
-
-            calc_emission_type(df, unknown_hyc, i, 'propellant_production', df['no_of_launches'].loc[i])
-
-        if df['rocket'].loc[i] == 'unknown_hyc' and df['impact_category'].loc[i] == 'propellant_scheduling':
-
-            calc_emission_type(df, unknown_hyc, i, 'propellant_scheduling', df['no_of_launches'].loc[i])
-
-        if df['rocket'].loc[i] == 'unknown_hyc' and df['impact_category'].loc[i] == 'launcher_transportation':
-
-            calc_emission_type(df, unknown_hyc, i, 'launcher_transportation', df['no_of_launches'].loc[i])
-
-        if df['rocket'].loc[i] == 'unknown_hyc' and df['impact_category'].loc[i] == 'launch_campaign':
-
-            calc_emission_type(df, unknown_hyc, i, 'launch_campaign', df['no_of_launches'].loc[i])
-
-        ################################# Unknown Hydrogen Rocket ################################
-        if df['rocket'].loc[i] == 'unknown_hyg' and df['impact_category'].loc[i] == 'launch_event':
-
-            for key, item in unknown_hyg.items():
-
-                calc_emission_type(df, unknown_hyg, i, 'launch_event', df['no_of_launches'].loc[i])
-
-        if df['rocket'].loc[i] == 'unknown_hyg' and df['impact_category'].loc[i] == 'launcher_production':
-
-            calc_emission_type(df, unknown_hyg, i, 'launcher_production', df['no_of_launches'].loc[i])
-
-        if df['rocket'].loc[i] == 'unknown_hyg' and df['impact_category'].loc[i] == 'launcher_ait':
-
-            calc_emission_type(df, unknown_hyg, i, 'launcher_ait', df['no_of_launches'].loc[i])
-
-        if df['rocket'].loc[i] == 'unknown_hyg' and df['impact_category'].loc[i] == 'propellant_production':
-
-            calc_emission_type(df, unknown_hyg, i, 'propellant_production', df['no_of_launches'].loc[i])
-
-        if df['rocket'].loc[i] == 'unknown_hyg' and df['impact_category'].loc[i] == 'propellant_scheduling':
-
-            calc_emission_type(df, unknown_hyg, i, 'propellant_scheduling', df['no_of_launches'].loc[i])
-
-        if df['rocket'].loc[i] == 'unknown_hyg' and df['impact_category'].loc[i] == 'launcher_transportation':
-
-            calc_emission_type(df, unknown_hyg, i, 'launcher_transportation', df['no_of_launches'].loc[i])
-
-        if df['rocket'].loc[i] == 'unknown_hyg' and df['impact_category'].loc[i] == 'launch_campaign':
-
-            calc_emission_type(df, unknown_hyg, i, 'launch_campaign', df['no_of_launches'].loc[i])
-
-        ################################################# Emission per Subscriber##############################
-        for key, item in parameters.items():
-
-            if key == 'starlink':
-
-                if df['constellation'].loc[i] == 'starlink':
-                    
-                    df.loc[i, 'subscribers_low'] = item['subscribers'][0]
-                    df.loc[i, 'subscribers_baseline'] = item['subscribers'][1]
-                    df.loc[i, 'subscribers_high'] = item['subscribers'][2]
-
-            if key == 'oneweb':
-
-                if df['constellation'].loc[i] == 'oneweb':
-                    
-                    df.loc[i, 'subscribers_low'] = item['subscribers'][0]
-                    df.loc[i, 'subscribers_baseline'] = item['subscribers'][1]
-                    df.loc[i, 'subscribers_high'] = item['subscribers'][2]
-
-            if key == 'kuiper':
-
-                if df['constellation'].loc[i] == 'kuiper':
-                    
-                    df.loc[i, 'subscribers_low'] = item['subscribers'][0]
-                    df.loc[i, 'subscribers_baseline'] = item['subscribers'][1]
-                    df.loc[i, 'subscribers_high'] = item['subscribers'][2]
-
-            if key == 'geo':
-
-                if df['constellation'].loc[i] == 'geo_generic':
-                    
-                    df.loc[i, 'subscribers_low'] = item['subscribers'][0]
-                    df.loc[i, 'subscribers_baseline'] = item['subscribers'][1]
-                    df.loc[i, 'subscribers_high'] = item['subscribers'][2]
-    
     df = pd.melt(df, id_vars = ['constellation', 'rocket', 'no_of_satellites', 
          'no_of_launches', 'climate_change_baseline', 'satellite_lifespan',
          'climate_change_worst_case', 'ozone_depletion_baseline', 
@@ -503,14 +228,8 @@ def calc_emissions():
          'subscribers_high'], 
          var_name = 'subscriber_scenario', value_name = 'subscribers')
     
-    df['per_subscriber_emission'] = ''
-    
-    for i in range(len(df)):
-        
-        df.loc[i, 'per_subscriber_emission'] = (df.loc[i, 
-                  'climate_change_baseline'] / df.loc[i, 'subscribers'])
-
-    filename = 'individual_emissions.csv'
+    df['per_subscriber_emission'] = (df['climate_change_baseline'] 
+                                     / df['subscribers'])
 
     if not os.path.exists(BASE_PATH):
 
@@ -523,11 +242,6 @@ def calc_emissions():
              'freshwater_toxicity', 'human_toxicity', 'subscribers', 
              'subscriber_scenario', 'impact_category', 'scenario', 'status', 
              'representative_of', 'rocket_type', 'rocket_detailed']]
-    df[['annual_baseline_emission_kg', 'annual_worst_case_emission_kg',
-        'baseline_social_carbon_cost_usd', 'worst_case_social_carbon_cost_usd',
-        'annual_baseline_scc_per_subscriber_usd', 
-        'annual_worst_case_scc_per_subscriber_usd']] = ''
-    
     renamed_columns = {'climate_change_baseline': 'climate_change_baseline_kg', 
                 'climate_change_worst_case': 'climate_change_worst_case_kg',
                 'ozone_depletion_baseline': 'ozone_depletion_baseline_kg',
@@ -537,27 +251,25 @@ def calc_emissions():
     
     df.rename(columns = renamed_columns, inplace = True)
     
-    for i in range(len(df)):
+    df['baseline_social_carbon_cost_usd'] = calc_social_carbon_cost(
+        df['climate_change_baseline_kg'])
+
+    df['worst_case_social_carbon_cost_usd'] = calc_social_carbon_cost(
+        df['climate_change_worst_case_kg'])
 
-        df.loc[i, 'baseline_social_carbon_cost_usd'] = (
-            calc_social_carbon_cost(df.loc[i, 'climate_change_baseline_kg']))
- 
-        df.loc[i, 'worst_case_social_carbon_cost_usd'] = (
-            calc_social_carbon_cost(df.loc[i, 'climate_change_worst_case_kg']))
+    df['annual_baseline_emission_kg'] = (df['climate_change_baseline_kg'] 
+                                         / df['satellite_lifespan'])
 
-        df.loc[i, 'annual_baseline_emission_kg'] = (df.loc[i, 
-            'climate_change_baseline_kg'] / df.loc[i, 'satellite_lifespan'])
-        
-        df.loc[i, 'annual_worst_case_emission_kg'] = (df.loc[i, 
-            'climate_change_worst_case_kg'] / df.loc[i, 'satellite_lifespan'])
+    df['annual_worst_case_emission_kg'] = (df['climate_change_worst_case_kg'] 
+                                           / df['satellite_lifespan'])
 
-        df.loc[i, 'annual_baseline_scc_per_subscriber_usd'] = (df.loc[i, 
-            'baseline_social_carbon_cost_usd'] / df.loc[i, 
-            'satellite_lifespan'] / df.loc[i, 'subscribers'])
+    df['annual_baseline_scc_per_subscriber_usd'] = (
+        df['baseline_social_carbon_cost_usd'] / df['satellite_lifespan'] 
+        / df['subscribers'])
 
-        df.loc[i, 'annual_worst_case_scc_per_subscriber_usd'] = (df.loc[i, 
-            'worst_case_social_carbon_cost_usd'] / df.loc[i, 
-            'satellite_lifespan'] / df.loc[i, 'subscribers'])
+    df['annual_worst_case_scc_per_subscriber_usd'] = (
+        df['worst_case_social_carbon_cost_usd'] / df['satellite_lifespan'] 
+        / df['subscribers'])
 
     df = df[['constellation', 'no_of_launches', 'no_of_satellites', 
              'climate_change_baseline_kg', 'climate_change_worst_case_kg', 
@@ -570,8 +282,8 @@ def calc_emissions():
              'annual_worst_case_scc_per_subscriber_usd', 'subscriber_scenario',
              'impact_category', 'scenario', 'rocket_type', 'rocket_detailed']]
     
-    path_out = os.path.join(BASE_PATH, '..', 'results', filename)
-    df.to_csv(path_out, index = False)
+    path_out = table_path(RESULTS, 'individual_emissions')
+    write_table(df, path_out)
 
     return None
 
@@ -587,73 +299,13 @@ def calc_total_emissions():
     df = pd.read_csv(path)
     df = df[df['scenario'] == 'scenario1']
 
-    df[['total_baseline_carbon_emissions', 'total_worst_case_carbon_emissions',
-        'total_ozone_depletion_baseline', 'total_ozone_depletion_worst_case',
-        'total_resource_depletion', 'total_freshwater_toxicity',
-        'total_human_toxicity', 'subscribers_low', 'subscribers_baseline', 
-        'subscribers_high']] = ''
-
-    for i in range(len(df)):
-
-        ################################### Falcon-9 Rocket ####################
-        if df['rocket'].loc[i] == 'falcon9':
-
-            calc_total_carbon_emission(df, falcon_9, i,  
-                                       df['no_of_launches'].loc[i])
-
-        ################################### Soyuz-FG Rocket ####################
-        if df['rocket'].loc[i] == 'soyuz':
-
-            calc_total_carbon_emission(df, soyuz, i,  
-                                       df['no_of_launches'].loc[i])
-
-        ############################ Unknown Hydrocarbon Rocket ################
-        if df['rocket'].loc[i] == 'unknown_hyc':
-
-            calc_total_carbon_emission(df, unknown_hyc, i,  
-                                       df['no_of_launches'].loc[i])
+    with measure('calc_launch_emissions', len(df)) as rows:
 
-        ################################# Unknown Hydrogen Rocket ##############
-        if df['rocket'].loc[i] == 'unknown_hyg':
+        df = calc_launch_emissions(df, read_rocket_factors(), totals = True)
+        rows['rows_out'] = len(df)
 
-            calc_total_carbon_emission(df, unknown_hyg, i,  
-                                       df['no_of_launches'].loc[i])
+    df = add_subscribers(df, parameters)
 
-        ########################## Emission per Subscriber######################
-        for key, item in parameters.items():
-
-            if key == 'starlink':
-
-                if df['constellation'].loc[i] == 'starlink':
-                    
-                    df.loc[i, 'subscribers_low'] = item['subscribers'][0]
-                    df.loc[i, 'subscribers_baseline'] = item['subscribers'][1]
-                    df.loc[i, 'subscribers_high'] = item['subscribers'][2]
-
-            if key == 'oneweb':
-
-                if df['constellation'].loc[i] == 'oneweb':
-                    
-                    df.loc[i, 'subscribers_low'] = item['subscribers'][0]
-                    df.loc[i, 'subscribers_baseline'] = item['subscribers'][1]
-                    df.loc[i, 'subscribers_high'] = item['subscribers'][2]
-
-            if key == 'kuiper':
-
-                if df['constellation'].loc[i] == 'kuiper':
-                    
-                    df.loc[i, 'subscribers_low'] = item['subscribers'][0]
-                    df.loc[i, 'subscribers_baseline'] = item['subscribers'][1]
-                    df.loc[i, 'subscribers_high'] = item['subscribers'][2]
-
-            if key == 'geo':
-
-                if df['constellation'].loc[i] == 'geo_generic':
-                    
-                    df.loc[i, 'subscribers_low'] = item['subscribers'][0]
-                    df.loc[i, 'subscribers_baseline'] = item['subscribers'][1]
-                    df.loc[i, 'subscribers_high'] = item['subscribers'][2]
-  
     df = pd.melt(df, id_vars = ['constellation', 'satellite_lifespan', 
          'total_baseline_carbon_emissions', 
          'total_worst_case_carbon_emissions', 'total_ozone_depletion_baseline', 
@@ -681,35 +333,17 @@ def calc_total_emissions():
                   'total_freshwater_toxicity' : 'sum',
                   'total_human_toxicity' : 'sum'}).reset_index()
    
-    df1[['annual_baseline_emissions_per_subscriber_kg', 
-         'annual_worst_case_emissions_per_subscriber_kg']] = ''
-    df1['number_of_satellites'] = ''
-    for i in range(len(df1)):
+    df1['annual_baseline_emissions_per_subscriber_kg'] = ((
+        df1['total_baseline_carbon_emissions'] / df1['subscribers']) 
+        / df1['satellite_lifespan'])
 
-        df1.loc[i, 'annual_baseline_emissions_per_subscriber_kg'] = ((
-            df1.loc[i, 'total_baseline_carbon_emissions'] 
-            / df1.loc[i, 'subscribers']) / df1.loc[i, 'satellite_lifespan'])  
+    df1['annual_worst_case_emissions_per_subscriber_kg'] = ((
+        df1['total_worst_case_carbon_emissions'] / df1['subscribers']) 
+        / df1['satellite_lifespan'])
 
-        df1.loc[i, 'annual_worst_case_emissions_per_subscriber_kg'] = (
-            (df1.loc[i, 'total_worst_case_carbon_emissions']
-             / df1.loc[i, 'subscribers']) / df1.loc[i, 'satellite_lifespan'])
-        
-        if df1.loc[i, 'constellation'] == 'geo_generic':
+    df1['number_of_satellites'] = df1['constellation'].map(
+        constellation_table(parameters)['number_of_satellites'])
 
-            df1.loc[i, 'number_of_satellites'] = 19
-
-        elif df1.loc[i, 'constellation'] == 'kuiper':
-
-            df1.loc[i, 'number_of_satellites'] = 3236
-
-        elif df1.loc[i, 'constellation'] == 'starlink':
-
-            df1.loc[i, 'number_of_satellites'] = 4425
-
-        else:
-
-            df1.loc[i, 'number_of_satellites'] = 648
-    
     df1 = df1[['constellation', 'satellite_lifespan', 'number_of_satellites',
              'subscribers', 'total_baseline_carbon_emissions',
              'total_worst_case_carbon_emissions', 
@@ -730,9 +364,8 @@ def calc_total_emissions():
     
     df1.rename(columns = renamed_columns, inplace = True)
     
-    filename2 = 'total_emissions.csv'
-    path_out2 = os.path.join(BASE_PATH, '..', 'results', filename2)
-    df1.to_csv(path_out2, index = False)
+    path_out2 = table_path(RESULTS, 'total_emissions')
+    write_table(df1, path_out2)
 
     return None
 
@@ -742,214 +375,329 @@ def run_uq_processing_cost():
     Run the UQ inputs through the saleos model. 
     
     """
-    path = os.path.join(BASE_PATH, 'processed', 'uq_parameters_cost.csv') 
+    path = table_path(DATA, 'uq_parameters_cost')
 
     if not os.path.exists(path):
 
-        print('Cannot locate uq_parameters_cost.csv')
+        print('Cannot locate {}'.format(os.path.basename(path)))
 
-    df = pd.read_csv(path)
-    df = df.to_dict('records')
-
-    results = []
-
-    for item in tqdm(df, desc = 'Processing uncertainty results'):
-
-        total_cost_ownership = ct.cost_model(item['satellite_manufacturing'],
-                                             item['satellite_launch_cost'],
-                                             item['ground_station_cost'],
-                                             item['regulation_fees'],
-                                             item['fiber_infrastructure_cost'],
-                                             item['ground_station_energy'],
-                                             item['subscriber_acquisition'],
-                                             item['staff_costs'],
-                                             item['maintenance_costs'],
-                                             item['discount_rate'],
-                                             item['assessment_period_year'])
-        
-        results.append({
-            'constellation': item['constellation'], 
-            'number_of_satellites': item['number_of_satellites'],
-            'subscribers_low': item['subscribers_low'],
-            'subscribers_baseline': item['subscribers_baseline'],
-            'subscribers_high': item['subscribers_high'],
-            'capex_costs': item['capex_costs'],
-            'opex_costs': item['opex_costs'],
-            'total_cost_ownership': total_cost_ownership,
-            'assessment_period_year': item['assessment_period_year'],
-        })
-
-        df = pd.DataFrame.from_dict(results)
-
-        filename = 'interim_results_cost.csv'
-        
-        if not os.path.exists(DATA):
-
-            os.makedirs(DATA)
-
-        path_out = os.path.join(DATA, filename)
-        df.to_csv(path_out, index = False)
+    path_out = table_path(DATA, 'interim_results_cost')
+
+    with ResultWriter(path_out, BATCH_SIZE) as writer:
+
+        for df in tqdm(measure_chunks(read_table(path, chunksize = 
+                       BATCH_SIZE), 'read_table'), 
+                       desc = 'Processing uncertainty results'):
+
+            with measure('calc_cost_results', len(df)) as rows:
+
+                df = calc_cost_results(df)
+                rows['rows_out'] = len(df)
+
+            with measure('write_table', len(df), len(df)):
+
+                writer.write_batch(df)
 
     return
 
 
-def process_mission_capacity():
+def calc_cost_results(df):
     """
-    This function process the constellation mission capacity.
+    This function runs a batch of UQ cost inputs through the cost model.
 
+    Parameters
+    ----------
+    df : DataFrame
+        UQ cost inputs with one row per iteration.
+
+    Returns
+    -------
+    df : DataFrame
+        Interim cost results with one row per iteration.
+
+    """
+    df['total_cost_ownership'] = ct.cost_model_batch(
+        df['satellite_manufacturing'].values, 
+        df['satellite_launch_cost'].values, 
+        df['ground_station_cost'].values, 
+        df['regulation_fees'].values, 
+        df['fiber_infrastructure_cost'].values, 
+        df['ground_station_energy'].values, 
+        df['subscriber_acquisition'].values, 
+        df['staff_costs'].values, df['maintenance_costs'].values, 
+        df['discount_rate'].values, 
+        df['assessment_period_year'].values)
+
+    df = df[['constellation', 'number_of_satellites', 'subscribers_low', 
+             'subscribers_baseline', 'subscribers_high', 'capex_costs', 
+             'opex_costs', 'total_cost_ownership', 'assessment_period_year']]
+
+    return df
+
+
+def melt_subscriber_chunks(path, id_vars):
     """
-    data_in = os.path.join(DATA, 'interim_results_capacity.csv')
-    df = pd.read_csv(data_in, index_col = False)
+    This function reads a results table in chunks and switches its 
+    subscriber columns from wide format to long format, one subscriber 
+    scenario at a time, so rows come out in the same order as melting the 
+    whole table while only one chunk is held in memory.
 
-    df = df[['constellation', 'number_of_satellites', 'channel_capacity_mbps', 
-             'capacity_per_single_satellite_mbps',
-             'constellation_capacity_mbps', 'subscribers_low', 
-             'subscribers_baseline', 'subscribers_high', 'percent_coverage',
-             'subscriber_traffic_percent', 'satellite_coverage_area_km', 
-             'cnr_scenario']]
-
-    # Classify subscribers by melting the dataframe into long format
-    # Switching the subscriber columns from wide format to long format
-    df = pd.melt(df, id_vars = ['constellation', 'number_of_satellites', 
-                            'constellation_capacity_mbps', 'cnr_scenario', 
-                            'subscriber_traffic_percent', 'percent_coverage', 
-                            'satellite_coverage_area_km'], value_vars = 
-                            ['subscribers_low', 'subscribers_baseline', 
-                            'subscribers_high'], value_name = 'subscribers',
-                            var_name = 'subscriber_scenario')
-    
-    # Create columns to store new data
-    df[['capacity_per_user', 'monthly_gb', 'user_per_area']] = ''
-    
-    # Calculate total metrics
-    for i in tqdm(range(len(df)), desc = 'Processing constellation results'):
+    Parameters
+    ----------
+    path : string
+        Path of the results table.
+    id_vars : list
+        Columns kept on every long format row.
+
+    Returns
+    -------
+    chunks : iterator
+        DataFrames with the id_vars, 'subscriber_scenario' and 'subscribers'
+        columns.
+
+    """
+    for scenario in SUBSCRIBER_SCENARIOS:
+
+        for df in read_table(path, columns = id_vars + [scenario], 
+                             chunksize = BATCH_SIZE):
+
+            df['subscriber_scenario'] = scenario
+            df = df.rename(columns = {scenario: 'subscribers'})
 
-         df.loc[i, 'capacity_per_user'] = cy.capacity_subscriber(df.loc[i, 
-                    'constellation_capacity_mbps'], df.loc[i, 'subscribers'], 
-                    df.loc[i, 'subscriber_traffic_percent'])
+            yield df
 
-         df.loc[i, 'monthly_gb'] = cy.monthly_traffic(df.loc[i, 
-                                    'capacity_per_user'])
 
-         df.loc[i, 'user_per_area'] = cy.subscribers_per_area(df.loc[i, 
-                'number_of_satellites'], df.loc[i, 'percent_coverage'], 
-                df.loc[i, 'subscribers'], df.loc[i, 
-                'satellite_coverage_area_km'])
+def process_mission_capacity():
+    """
+    This function process the constellation mission capacity.
 
-    filename = 'final_capacity_results.csv'
+    """
+    data_in = table_path(DATA, 'interim_results_capacity')
+    path_out = table_path(RESULTS, 'final_capacity_results')
 
     if not os.path.exists(RESULTS):
 
          os.makedirs(RESULTS)
 
-    df = df[['constellation', 'number_of_satellites', 'constellation_capacity_mbps', 
-             'satellite_coverage_area_km', 'capacity_per_user', 
-            'subscribers', 'monthly_gb', 'user_per_area', 
-            'cnr_scenario', 'subscriber_scenario']]
-    
-    path_out = os.path.join(RESULTS, filename)
-    df.to_csv(path_out, index = False)
+    # Classify subscribers by switching the subscriber columns from wide 
+    # format to long format, chunk by chunk.
+    chunks = melt_subscriber_chunks(data_in, ['constellation', 
+             'number_of_satellites', 'constellation_capacity_mbps', 
+             'cnr_scenario', 'subscriber_traffic_percent', 
+             'percent_coverage', 'satellite_coverage_area_km'])
+
+    with ResultWriter(path_out, BATCH_SIZE) as writer:
+
+        for df in measure_chunks(chunks, 'read_table'):
+
+            with measure('calc_mission_capacity', len(df)) as rows:
+
+                df = calc_mission_capacity(df)
+                rows['rows_out'] = len(df)
+
+            df = df[['constellation', 'number_of_satellites', 
+                'constellation_capacity_mbps', 'satellite_coverage_area_km', 
+                'capacity_per_user', 'subscribers', 'monthly_gb', 
+                'user_per_area', 'cnr_scenario', 'subscriber_scenario']]
+
+            with measure('write_table', len(df), len(df)):
+
+                writer.write_batch(df)
 
     return None
 
 
-def process_mission_cost():
+def calc_mission_capacity(df):
     """
-    This function process the constellation mission costs.
+    This function calculates the per user capacity metrics for every 
+    subscriber scenario row at once.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Capacity results in long format with one row per subscriber scenario.
+
+    Returns
+    -------
+    df : DataFrame
+        Capacity results with float capacity_per_user, monthly_gb and 
+        user_per_area columns.
 
     """
-    data_in = os.path.join(DATA, 'interim_results_cost.csv')
-    df = pd.read_csv(data_in, index_col = False)
-
-    df = df[['constellation', 'number_of_satellites', 'capex_costs', 'opex_costs',
-             'assessment_period_year', 'total_cost_ownership', 
-             'subscribers_low', 'subscribers_baseline', 
-             'subscribers_high']]
-
-    # Classify subscribers by melting the dataframe into long format.
-    # Switching the subscriber columns from wide format to long format.
-    df = pd.melt(df, id_vars = ['constellation', 'number_of_satellites', 
-                                'capex_costs', 'opex_costs', 
-                                'assessment_period_year','total_cost_ownership'], 
-                                value_vars = ['subscribers_low', 
-                                'subscribers_baseline', 'subscribers_high'], 
-                                var_name = 'subscriber_scenario', 
-                                value_name = 'subscribers')
-    
-    # Create columns to store new data
-    df[[ 'capex_per_user', 'opex_per_user',
-         'tco_per_user', 'user_monthly_cost',
-         'tco_per_user_annualized']] = ''
-    
-    # Calculate total metrics
-    for i in tqdm(range(len(df)), desc = 'Processing constellation results'):
+    columns = ['constellation_capacity_mbps', 'subscribers', 
+               'subscriber_traffic_percent', 'number_of_satellites', 
+               'percent_coverage', 'satellite_coverage_area_km']
+    values = {column: df[column].to_numpy(dtype = float) for column in columns}
+
+    capacity_per_user = cy.capacity_subscriber(
+        values['constellation_capacity_mbps'], values['subscribers'], 
+        values['subscriber_traffic_percent'])
 
-        df.loc[i, 'capex_per_user'] = (df.loc[i, 'capex_costs'] / 
-                                       df.loc[i, 'subscribers'])
-        
-        df.loc[i, 'opex_per_user'] = (df.loc[i, 'opex_costs'] / 
-                                      df.loc[i, 'subscribers'])
-        
-        df.loc[i, 'tco_per_user'] = (df.loc[i, 'total_cost_ownership'] / 
-                                     df.loc[i, 'subscribers'])
+    df['capacity_per_user'] = capacity_per_user
 
-        df.loc[i, 'user_monthly_cost'] = ct.user_monthly_cost(df.loc[i, 
-                            'tco_per_user'], df.loc[i, 'assessment_period_year'])
+    df['monthly_gb'] = cy.monthly_traffic(capacity_per_user)
 
-        if df['constellation'].loc[i] in ['Kuiper','OneWeb','Starlink']:
+    df['user_per_area'] = cy.subscribers_per_area(
+        values['number_of_satellites'], values['percent_coverage'], 
+        values['subscribers'], values['satellite_coverage_area_km'])
 
-            df.loc[i, 'tco_per_user_annualized'] = (df.loc[i, 'tco_per_user'] / 
-                                         df.loc[i, 'assessment_period_year'])
-     
-        elif df['constellation'].loc[i] in ['GEO']:
+    return df
 
-            df.loc[i, 'tco_per_user_annualized'] = (df.loc[i, 'tco_per_user'] / 
-                                        df.loc[i, 'assessment_period_year'])
-            
-        else:
 
-            print('Constellation name not recognized.')
-            
-    filename = 'final_cost_results.csv'
+def process_mission_cost():
+    """
+    This function process the constellation mission costs.
+
+    """
+    data_in = table_path(DATA, 'interim_results_cost')
+    path_out = table_path(RESULTS, 'final_cost_results')
 
     if not os.path.exists(RESULTS):
 
          os.makedirs(RESULTS)
 
-    df = df[['constellation', 'number_of_satellites', 'capex_costs', 'opex_costs', 
-             'total_cost_ownership', 'assessment_period_year', 
-             'subscribers', 'capex_per_user', 'opex_per_user', 
-             'tco_per_user', 'tco_per_user_annualized', 
-             'user_monthly_cost', 'subscriber_scenario']]
-    
-    path_out = os.path.join(RESULTS, filename)
-    df.to_csv(path_out, index = False)
+    # Classify subscribers by switching the subscriber columns from wide 
+    # format to long format, chunk by chunk.
+    chunks = melt_subscriber_chunks(data_in, ['constellation', 
+             'number_of_satellites', 'capex_costs', 'opex_costs', 
+             'assessment_period_year', 'total_cost_ownership'])
+
+    unknown = Counter()
+
+    with ResultWriter(path_out, BATCH_SIZE) as writer:
+
+        for df in measure_chunks(chunks, 'read_table'):
+
+            with measure('calc_mission_cost', len(df)) as rows:
+
+                df = calc_mission_cost(df)
+                rows['rows_out'] = len(df)
+
+            unknown.update(df.loc[~df['constellation'].isin(
+                CONSTELLATIONS.index), 'constellation'])
+
+            df = df[['constellation', 'number_of_satellites', 
+                'capex_costs', 'opex_costs', 'total_cost_ownership', 
+                'assessment_period_year', 'subscribers', 'capex_per_user', 
+                'opex_per_user', 'tco_per_user', 'tco_per_user_annualized', 
+                'user_monthly_cost', 'subscriber_scenario']]
+
+            with measure('write_table', len(df), len(df)):
+
+                writer.write_batch(df)
+
+    if unknown:
+
+        print('Constellation name not recognized: {}'.format(', '.join(
+            '{} ({} rows)'.format(name, count) 
+            for name, count in unknown.items())))
 
     return None
 
 
-if __name__ == '__main__':
-    
-    start = time.time() 
+def calc_mission_cost(df):
+    """
+    This function calculates the per user cost metrics for every subscriber 
+    scenario row at once.
+
+    Constellation properties are joined from the CONSTELLATIONS table. Rows 
+    with an unrecognized constellation name are left without an annualized 
+    total cost of ownership.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Cost results in long format with one row per subscriber scenario.
+
+    Returns
+    -------
+    df : DataFrame
+        Cost results with float per user cost columns.
+
+    """
+    df = df.join(CONSTELLATIONS, on = 'constellation')
+
+    subscribers = df['subscribers'].to_numpy(dtype = float)
+    period = df['assessment_period_year'].to_numpy(dtype = float)
+
+    df['capex_per_user'] = (df['capex_costs'].to_numpy(dtype = float) 
+                            / subscribers)
+
+    df['opex_per_user'] = (df['opex_costs'].to_numpy(dtype = float) 
+                           / subscribers)
 
-    print('Running on run_uq_processing_capacity()')
-    run_uq_processing_capacity()
+    tco_per_user = (df['total_cost_ownership'].to_numpy(dtype = float) 
+                    / subscribers)
+    df['tco_per_user'] = tco_per_user
 
-    print('Running on run_uq_processing_costs()')
-    run_uq_processing_cost()
+    df['user_monthly_cost'] = ct.user_monthly_cost(tco_per_user, period)
 
-    print('Processing Emission results')
-    calc_emissions()
+    known = df['orbit'].notna().to_numpy()
+    df['tco_per_user_annualized'] = np.where(known, tco_per_user / period, 
+                                             np.nan)
 
-    print('Processing Total Emission results')
-    calc_total_emissions()
+    df = df.drop(columns = 'orbit')
 
-    print('Working on process_mission_capacity()')
-    process_mission_capacity()
+    return df
 
-    print('Working on process_mission_costs()')
-    process_mission_cost()
+
+def pipeline_stages():
+    """
+    This function declares the stages of the run script with the files they 
+    read and write.
+
+    Returns
+    -------
+    stages : list
+        Stage declarations for pipeline.run_stages.
+
+    """
+    scenarios = os.path.join(BASE_PATH, 'raw', 'scenarios.csv')
+    interim_capacity = table_path(DATA, 'interim_results_capacity')
+    interim_cost = table_path(DATA, 'interim_results_cost')
+
+    constellations = constellation_table(parameters).to_dict('index')
+
+    stages = [
+        stage('run_uq_processing_capacity', run_uq_processing_capacity, 
+              [table_path(DATA, 'uq_parameters_capacity')], 
+              [interim_capacity], {'lut': lut, 
+              'deduplicate_link_budget': DEDUPLICATE_LINK_BUDGET}, [cy]),
+        stage('run_uq_processing_cost', run_uq_processing_cost, 
+              [table_path(DATA, 'uq_parameters_cost')], 
+              [interim_cost], code = [ct]),
+        stage('calc_emissions', calc_emissions, [scenarios, ROCKET_FACTORS], 
+              [table_path(RESULTS, 'individual_emissions')], 
+              {'constellations': constellations}, [emissions], 
+              rows_from = []),
+        stage('calc_total_emissions', calc_total_emissions, 
+              [scenarios, ROCKET_FACTORS], 
+              [table_path(RESULTS, 'total_emissions')], 
+              {'constellations': constellations}, [emissions], 
+              rows_from = []),
+        stage('process_mission_capacity', process_mission_capacity, 
+              [interim_capacity], 
+              [table_path(RESULTS, 'final_capacity_results')], 
+              code = [cy]),
+        stage('process_mission_cost', process_mission_cost, [interim_cost], 
+              [table_path(RESULTS, 'final_cost_results')], 
+              code = [ct]),
+    ]
+
+    return stages
+
+
+if __name__ == '__main__':
+    
+    start = time.time() 
+
+    print('Running the run.py stages')
+    metrics = run_stages(pipeline_stages(), cache = STAGE_CACHE, 
+                         trace_memory = TRACE_MEMORY)
 
     executionTime = (time.time() - start)
 
-    print('Execution time in minutes: ' + str(round(executionTime / 60, 2))) 
\ No newline at end of file
+    write_metrics(metrics, METRICS, executionTime)
+    print(metrics_table(metrics, executionTime))
+
+    print('Execution time in minutes: ' + str(round(executionTime / 60, 2))) 
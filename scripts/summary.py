@@ -0,0 +1,690 @@
+"""
+Streaming summary statistics for the saleos UQ outputs.
+
+Instead of writing every draw, the online aggregation mode generates draws
+in batches, runs them through the model and folds the results into running
+moments (Welford) and mergeable quantile sketches per group. Memory grows
+with the number of groups only, and the partial summaries of parallel
+workers are merged into one table.
+
+In the adaptive mode each constellation keeps drawing batches until the
+confidence intervals of its key outputs reach a target relative precision,
+so the number of draws follows the variance of each constellation.
+
+"""
+import configparser
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from inputs import parameters
+from emissions import SUBSCRIBER_SCENARIOS
+from outputs import table_path, write_table
+from preprocess import (CAPACITY_UQ_PARAMETERS, COST_UQ_PARAMETERS, SAMPLER,
+                        SEED, batch_iterations, create_sampler,
+                        multiorbit_sat_capacity_batch,
+                        multiorbit_sat_costs_batch)
+from run import (calc_capacity_results, calc_cost_results,
+                 calc_mission_capacity, calc_mission_cost)
+
+CONFIG = configparser.ConfigParser()
+CONFIG.read(os.path.join(os.path.dirname(__file__), 'script_config.ini'))
+BASE_PATH = CONFIG['file_locations']['base_path']
+RESULTS = os.path.join(BASE_PATH, '..', 'results')
+
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+CONSTELLATION_KEYS = ['starlink', 'oneweb', 'kuiper', 'geo']
+
+CAPACITY_GROUPS = ['constellation', 'cnr_scenario', 'subscriber_scenario']
+CAPACITY_METRICS = ['constellation_capacity_mbps',
+                    'capacity_per_single_satellite_mbps', 'capacity_per_user',
+                    'monthly_gb', 'user_per_area']
+
+COST_GROUPS = ['constellation', 'subscriber_scenario']
+COST_METRICS = ['capex_costs', 'opex_costs', 'total_cost_ownership',
+                'capex_per_user', 'opex_per_user', 'tco_per_user',
+                'tco_per_user_annualized', 'user_monthly_cost']
+
+
+class RunningMoments(object):
+    """
+    Running count, mean, variance, minimum and maximum of a metric.
+
+    Batches are combined with the pairwise form of Welford's algorithm, so
+    updating with many batches, or merging the moments of separate workers,
+    matches a single pass over all values up to rounding.
+
+    """
+    def __init__(self):
+
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+
+    def update(self, values):
+        """
+        Add a batch of values. Non-finite values are ignored.
+
+        Parameters
+        ----------
+        values : numpy array
+            Values to add.
+
+        """
+        values = np.asarray(values, dtype = float)
+        values = values[np.isfinite(values)]
+
+        if len(values) == 0:
+
+            return
+
+        batch = RunningMoments()
+        batch.count = len(values)
+        batch.mean = float(values.mean())
+        batch.m2 = float(((values - batch.mean) ** 2).sum())
+        batch.minimum = float(values.min())
+        batch.maximum = float(values.max())
+
+        self.merge(batch)
+
+
+    def merge(self, other):
+        """
+        Combine the moments of another set of values into these moments.
+
+        Parameters
+        ----------
+        other : RunningMoments
+            Moments to merge.
+
+        """
+        if other.count == 0:
+
+            return
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+
+    @property
+    def std(self):
+        """
+        Sample standard deviation, or nan for fewer than two values.
+
+        """
+        if self.count < 2:
+
+            return np.nan
+
+        return math.sqrt(self.m2 / (self.count - 1))
+
+
+class QuantileSketch(object):
+    """
+    Mergeable quantile sketch with a fixed relative accuracy.
+
+    Values are counted in logarithmic buckets (as in DDSketch), positive and
+    negative values separately, so any quantile is returned within the
+    relative accuracy of the true value. Merging adds bucket counts, so a
+    merged sketch is identical to the sketch of all values.
+
+    Parameters
+    ----------
+    relative_accuracy : float
+        Maximum relative error of the returned quantiles.
+
+    """
+    def __init__(self, relative_accuracy = 0.005):
+
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zero_count = 0
+        self.count = 0
+
+
+    def update(self, values):
+        """
+        Add a batch of values. Non-finite values are ignored.
+
+        Parameters
+        ----------
+        values : numpy array
+            Values to add.
+
+        """
+        values = np.asarray(values, dtype = float)
+        values = values[np.isfinite(values)]
+
+        self.count += len(values)
+        self.zero_count += int((values == 0).sum())
+
+        for buckets, magnitudes in [(self.positive, values[values > 0]),
+                                    (self.negative, -values[values < 0])]:
+
+            if len(magnitudes) == 0:
+
+                continue
+
+            indices = np.ceil(np.log(magnitudes) / self.log_gamma)
+            indices, counts = np.unique(indices.astype(np.int64),
+                                        return_counts = True)
+
+            for index, count in zip(indices.tolist(), counts.tolist()):
+
+                buckets[index] = buckets.get(index, 0) + count
+
+
+    def merge(self, other):
+        """
+        Add the bucket counts of another sketch with the same accuracy.
+
+        Parameters
+        ----------
+        other : QuantileSketch
+            Sketch to merge.
+
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+
+            raise ValueError('Cannot merge sketches of different accuracy')
+
+        for buckets, others in [(self.positive, other.positive),
+                                (self.negative, other.negative)]:
+
+            for index, count in others.items():
+
+                buckets[index] = buckets.get(index, 0) + count
+
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+
+    def quantile(self, q):
+        """
+        Estimate a quantile.
+
+        Parameters
+        ----------
+        q : float
+            Quantile between 0 and 1.
+
+        Returns
+        -------
+        value : float
+            Estimated quantile, or nan if the sketch is empty.
+
+        """
+        if self.count == 0:
+
+            return np.nan
+
+        rank = q * (self.count - 1)
+        seen = 0
+
+        for index in sorted(self.negative, reverse = True):
+
+            seen += self.negative[index]
+
+            if seen > rank:
+
+                return -self._bucket_value(index)
+
+        seen += self.zero_count
+
+        if seen > rank:
+
+            return 0.0
+
+        for index in sorted(self.positive):
+
+            seen += self.positive[index]
+
+            if seen > rank:
+
+                return self._bucket_value(index)
+
+        return self._bucket_value(max(self.positive))
+
+
+    def _bucket_value(self, index):
+
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+
+class SummaryAggregator(object):
+    """
+    Running moments and quantile sketches of several metrics per group.
+
+    Parameters
+    ----------
+    groups : list
+        Columns identifying a group.
+    metrics : list
+        Columns to summarize.
+    quantiles : list
+        Quantiles reported by the summary table.
+
+    """
+    def __init__(self, groups, metrics, quantiles = QUANTILES):
+
+        self.groups = list(groups)
+        self.metrics = list(metrics)
+        self.quantiles = list(quantiles)
+        self.moments = {}
+        self.sketches = {}
+
+
+    def update(self, df):
+        """
+        Add a batch of result rows.
+
+        Parameters
+        ----------
+        df : DataFrame
+            Results with the group and metric columns.
+
+        """
+        for key, group in df.groupby(self.groups, sort = False):
+
+            key = key if isinstance(key, tuple) else (key,)
+
+            for metric in self.metrics:
+
+                values = group[metric].to_numpy(dtype = float)
+
+                self._moments(key, metric).update(values)
+                self._sketch(key, metric).update(values)
+
+
+    def merge(self, other):
+        """
+        Combine the summary of another aggregator, such as a partial result
+        of a parallel worker.
+
+        Parameters
+        ----------
+        other : SummaryAggregator
+            Aggregator over the same groups and metrics.
+
+        """
+        if other.groups != self.groups or other.metrics != self.metrics:
+
+            raise ValueError('Cannot merge summaries of different tables')
+
+        for (key, metric), moments in other.moments.items():
+
+            self._moments(key, metric).merge(moments)
+
+        for (key, metric), sketch in other.sketches.items():
+
+            self._sketch(key, metric).merge(sketch)
+
+
+    def summary(self):
+        """
+        This function builds the summary table.
+
+        Returns
+        -------
+        df : DataFrame
+            One row per group and metric with the count, mean, standard
+            deviation, minimum, maximum and quantiles.
+
+        """
+        rows = []
+
+        for (key, metric), moments in self.moments.items():
+
+            row = dict(zip(self.groups, key))
+            row['metric'] = metric
+            row['count'] = moments.count
+            row['mean'] = moments.mean if moments.count else np.nan
+            row['std'] = moments.std
+            row['min'] = moments.minimum if moments.count else np.nan
+            row['max'] = moments.maximum if moments.count else np.nan
+
+            for q in self.quantiles:
+
+                row['p{:g}'.format(q * 100)] = (
+                    self.sketches[(key, metric)].quantile(q))
+
+            rows.append(row)
+
+        columns = (self.groups + ['metric', 'count', 'mean', 'std', 'min',
+                   'max'] + ['p{:g}'.format(q * 100) for q in self.quantiles])
+
+        df = pd.DataFrame(rows, columns = columns)
+        df = df.sort_values(self.groups + ['metric'], kind = 'stable')
+        df = df.reset_index(drop = True)
+
+        return df
+
+
+    def _moments(self, key, metric):
+
+        if (key, metric) not in self.moments:
+
+            self.moments[(key, metric)] = RunningMoments()
+
+        return self.moments[(key, metric)]
+
+
+    def _sketch(self, key, metric):
+
+        if (key, metric) not in self.sketches:
+
+            self.sketches[(key, metric)] = QuantileSketch()
+
+        return self.sketches[(key, metric)]
+
+
+def subscriber_rows(df, scenario):
+    """
+    Long format rows of one subscriber scenario.
+
+    """
+    df = df.drop(columns = [column for column in SUBSCRIBER_SCENARIOS
+                            if column != scenario])
+    df = df.rename(columns = {scenario: 'subscribers'})
+    df['subscriber_scenario'] = scenario
+
+    return df
+
+
+def capacity_batch(iterations, constellation_params, rng, engine = None):
+    """
+    This function draws a batch of UQ capacity inputs and evaluates the 
+    capacity results of every subscriber scenario.
+
+    """
+    df = multiorbit_sat_capacity_batch(iterations, constellation_params, rng,
+                                       engine)
+    df = calc_capacity_results(df)
+
+    df = pd.concat([calc_mission_capacity(subscriber_rows(df, scenario))
+                    for scenario in SUBSCRIBER_SCENARIOS], ignore_index = True)
+
+    return df
+
+
+def cost_batch(iterations, constellation_params, rng, engine = None):
+    """
+    This function draws a batch of UQ cost inputs and evaluates the cost 
+    results of every subscriber scenario.
+
+    """
+    df = multiorbit_sat_costs_batch(iterations, constellation_params, rng,
+                                    engine)
+    df = calc_cost_results(df)
+
+    df = pd.concat([calc_mission_cost(subscriber_rows(df, scenario))
+                    for scenario in SUBSCRIBER_SCENARIOS], ignore_index = True)
+
+    return df
+
+
+# Summarized UQ runs. Each has its own seeded stream, and its tracked 
+# metrics decide when the adaptive mode stops drawing.
+UQ_RUNS = {
+    'capacity': {
+        'stream': 0,
+        'dimensions': len(CAPACITY_UQ_PARAMETERS),
+        'batch': capacity_batch,
+        'groups': CAPACITY_GROUPS,
+        'metrics': CAPACITY_METRICS,
+        'tracked': ['constellation_capacity_mbps', 'monthly_gb'],
+    },
+    'cost': {
+        'stream': 1,
+        'dimensions': len(COST_UQ_PARAMETERS),
+        'batch': cost_batch,
+        'groups': COST_GROUPS,
+        'metrics': COST_METRICS,
+        'tracked': ['tco_per_user'],
+    },
+}
+
+
+def summarize(kind, key, seed = SEED, sampler = SAMPLER):
+    """
+    This function generates the UQ draws of one constellation in batches of 
+    its iteration quantity and summarizes them without storing the draws.
+
+    Parameters
+    ----------
+    kind : string
+        'capacity' or 'cost'.
+    key : string
+        Constellation key of inputs.parameters.
+    seed : int
+        Seed of the run. Each constellation draws from its own stream.
+    sampler : string
+        One of 'random', 'lhs' or 'sobol'. Defaults to the sampler set in 
+        script_config.ini.
+
+    Returns
+    -------
+    aggregator : SummaryAggregator
+        Summary of the constellation.
+
+    """
+    run = UQ_RUNS[kind]
+    constellation_params = parameters[key]
+    rng = np.random.default_rng([seed, run['stream'], 
+                                 CONSTELLATION_KEYS.index(key)])
+    engine = create_sampler(sampler, run['dimensions'], rng)
+
+    aggregator = SummaryAggregator(run['groups'], run['metrics'])
+
+    for iterations in batch_iterations(constellation_params):
+
+        aggregator.update(run['batch'](iterations, constellation_params, rng,
+                                       engine))
+
+    return aggregator
+
+
+def relative_half_width(moments, confidence):
+    """
+    This function calculates the half width of the normal confidence 
+    interval of a mean, relative to the mean.
+
+    Parameters
+    ----------
+    moments : RunningMoments
+        Moments of the draws.
+    confidence : float
+        Confidence level, e.g. 0.95.
+
+    Returns
+    -------
+    precision : float
+        Relative half width, or inf for fewer than two draws or a zero mean.
+
+    """
+    if moments.count < 2 or moments.mean == 0:
+
+        return math.inf
+
+    z = norm.ppf((1 + confidence) / 2)
+    precision = z * moments.std / math.sqrt(moments.count) / abs(moments.mean)
+
+    return precision
+
+
+def summarize_adaptive(kind, key, seed = SEED, sampler = SAMPLER, 
+                       relative_precision = 0.01, confidence = 0.95, 
+                       batch_size = 1000, min_draws = 2000, 
+                       max_draws = 10000000):
+    """
+    This function generates and summarizes the UQ draws of one constellation
+    in batches until the mean of every tracked metric is known to the target
+    relative precision, so the number of draws follows the variance.
+
+    Convergence is checked on the baseline subscriber scenario, which has 
+    one row per draw.
+
+    Parameters
+    ----------
+    kind : string
+        'capacity' or 'cost'.
+    key : string
+        Constellation key of inputs.parameters.
+    seed : int
+        Seed of the run. Each constellation draws from its own stream.
+    sampler : string
+        One of 'random', 'lhs' or 'sobol'. Defaults to the sampler set in 
+        script_config.ini.
+    relative_precision : float
+        Target confidence interval half width relative to the mean.
+    confidence : float
+        Confidence level of the interval.
+    batch_size : int
+        Number of draws evaluated between convergence checks.
+    min_draws : int
+        Number of draws before the first convergence check.
+    max_draws : int
+        Number of draws after which the run stops unconverged.
+
+    Returns
+    -------
+    aggregator : SummaryAggregator
+        Summary of the constellation.
+    report : DataFrame
+        Draws, mean and achieved relative precision of each tracked metric.
+
+    """
+    run = UQ_RUNS[kind]
+    constellation_params = parameters[key]
+    rng = np.random.default_rng([seed, run['stream'], 
+                                 CONSTELLATION_KEYS.index(key)])
+    engine = create_sampler(sampler, run['dimensions'], rng)
+
+    aggregator = SummaryAggregator(run['groups'], run['metrics'])
+    tracked = {metric: RunningMoments() for metric in run['tracked']}
+
+    draws = 0
+    converged = False
+
+    while draws < max_draws and not converged:
+
+        size = min(batch_size, max_draws - draws)
+        df = run['batch'](np.arange(draws, draws + size), 
+                          constellation_params, rng, engine)
+        draws += size
+
+        aggregator.update(df)
+
+        baseline = df[df['subscriber_scenario'] == 'subscribers_baseline']
+
+        for metric, moments in tracked.items():
+
+            moments.update(baseline[metric].to_numpy(dtype = float))
+
+        converged = draws >= min_draws and all(
+            relative_half_width(moments, confidence) <= relative_precision 
+            for moments in tracked.values())
+
+    report = pd.DataFrame([{
+        'constellation': constellation_params['name'],
+        'metric': metric,
+        'draws': draws,
+        'mean': moments.mean,
+        'relative_half_width': relative_half_width(moments, confidence),
+        'converged': converged,
+    } for metric, moments in tracked.items()])
+
+    return aggregator, report
+
+
+def summarize_uq(kind, adaptive = False, max_workers = None, **kwargs):
+    """
+    This function summarizes every constellation on a process pool and 
+    merges the partial summaries.
+
+    Parameters
+    ----------
+    kind : string
+        'capacity' or 'cost'.
+    adaptive : bool
+        If True, each constellation draws until its tracked metrics converge
+        (see summarize_adaptive), otherwise its iteration quantity is drawn.
+    max_workers : int
+        Number of worker processes. Defaults to the number of processors.
+
+    Returns
+    -------
+    df : DataFrame
+        Summary table of all constellations.
+    report : DataFrame
+        Convergence report of the adaptive mode, otherwise None.
+
+    """
+    function = summarize_adaptive if adaptive else summarize
+
+    with ProcessPoolExecutor(max_workers = max_workers) as executor:
+
+        futures = [executor.submit(function, kind, key, **kwargs)
+                   for key in CONSTELLATION_KEYS]
+
+        results = [future.result() for future in futures]
+
+    if adaptive:
+
+        aggregators = [aggregator for aggregator, report in results]
+        report = pd.concat([report for aggregator, report in results], 
+                           ignore_index = True)
+
+    else:
+
+        aggregators = results
+        report = None
+
+    aggregator = aggregators[0]
+
+    for other in aggregators[1:]:
+
+        aggregator.merge(other)
+
+    return aggregator.summary(), report
+
+
+if __name__ == '__main__':
+
+    start = time.time()
+
+    if not os.path.exists(RESULTS):
+
+        os.makedirs(RESULTS)
+
+    for kind in UQ_RUNS:
+
+        print('Summarizing UQ {} results until convergence'.format(kind))
+        df, report = summarize_uq(kind, adaptive = True)
+
+        write_table(df, table_path(RESULTS, 
+                                   'summary_{}_results'.format(kind)))
+        write_table(report, table_path(RESULTS, 
+                                       'convergence_{}_results'.format(kind)))
+
+        print(report.to_string(index = False))
+
+    executionTime = (time.time() - start)
+
+    print('Execution time in minutes: ' + str(round(executionTime / 60, 2)))
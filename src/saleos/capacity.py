@@ -26,8 +26,10 @@ The Capacity model is based on approach and equations defined by:
       Limited UK, 2020.
 
 """
+import bisect
 import math
 import numpy as np
+from functools import lru_cache
 from itertools import tee
 from collections import Counter
 from collections import OrderedDict
@@ -86,7 +88,7 @@ def signal_distance(orbital_altitude_km, elevation_angle):
                        / radius_earth_km) ** 2)    
     second_term = (cos_value ** 2)
     third_term = np.sin(angle_radians)
-    slant_distance = round((radius_earth_km * ((np.sqrt(first_term 
+    slant_distance = np.round((radius_earth_km * ((np.sqrt(first_term 
                      - second_term)) - third_term)), 4)
 
     return slant_distance
@@ -115,8 +117,8 @@ def calc_sat_centric_angle(orbital_altitude_km, elevation_angle):
     first_term = (radius_earth_km / (radius_earth_km + orbital_altitude_km)) 
     second_term = np.cos(angle_radians)
     nadir = first_term * second_term
-    nadir_angle_rad = math.asin(nadir)
-    nadir_angle_deg = math.degrees(nadir_angle_rad)
+    nadir_angle_rad = np.arcsin(nadir)
+    nadir_angle_deg = np.degrees(nadir_angle_rad)
 
     return nadir_angle_deg
 
@@ -175,6 +177,186 @@ def calc_satellite_coverage(orbital_altitude_km, elevation_angle):
     return satellite_coverage
 
 
+# Largest number of altitude x elevation cells a geometry table is built for,
+# and the most cells per row of the call, so that a chunk mixing LEO and GEO
+# altitudes is not served by a table much larger than the chunk itself.
+MAX_GEOMETRY_CELLS = 10 ** 6
+GEOMETRY_CELLS_PER_ROW = 4
+
+
+class GeometryTable(object):
+    """
+    Satellite geometry precomputed for every integer altitude and elevation
+    angle of a bounded grid.
+
+    signal_distance, calc_sat_centric_angle, calc_earth_central_angle and
+    calc_satellite_coverage are evaluated once per grid cell, so arrays of
+    integer draws are answered with one indexed gather per quantity, giving
+    the same values as evaluating the functions directly.
+
+    Parameters
+    ----------
+    altitude_range : tuple of int
+        Lowest and highest orbital altitude in km.
+    elevation_range : tuple of int
+        Lowest and highest elevation angle in degrees.
+
+    """
+    def __init__(self, altitude_range, elevation_range):
+
+        self.altitude_min, self.altitude_max = map(int, altitude_range)
+        self.elevation_min, self.elevation_max = map(int, elevation_range)
+        self.elevation_count = self.elevation_max - self.elevation_min + 1
+
+        altitude, elevation = np.meshgrid(
+            np.arange(self.altitude_min, self.altitude_max + 1, dtype = float),
+            np.arange(self.elevation_min, self.elevation_max + 1,
+                      dtype = float), indexing = 'ij')
+        altitude = altitude.ravel()
+        elevation = elevation.ravel()
+
+        self.values = {
+            'signal_distance': signal_distance(altitude, elevation),
+            'satellite_centric_angle': calc_sat_centric_angle(altitude,
+                                                              elevation),
+            'earth_central_angle': calc_earth_central_angle(altitude,
+                                                            elevation),
+            'satellite_coverage': calc_satellite_coverage(altitude,
+                                                          elevation),
+        }
+
+
+    def __call__(self, orbital_altitude_km, elevation_angle):
+        """
+        Return the geometry of arrays of integer altitudes and elevation
+        angles within the table.
+
+        Parameters
+        ----------
+        orbital_altitude_km : numpy array
+            Satellite orbital altitude.
+        elevation_angle : numpy array
+            minimum elevation angle of the satellite
+
+        Returns
+        -------
+        geometry : dict
+            Arrays keyed by 'signal_distance', 'satellite_centric_angle',
+            'earth_central_angle' and 'satellite_coverage'.
+
+        """
+        altitude = np.asarray(orbital_altitude_km, dtype = float)
+        elevation = np.asarray(elevation_angle, dtype = float)
+
+        index = ((altitude - self.altitude_min) * self.elevation_count
+                 + (elevation - self.elevation_min)).astype(np.intp)
+
+        geometry = {key: values[index] for key, values in self.values.items()}
+
+        return geometry
+
+
+def is_integral(values):
+    """
+    Check whether all values of an array are finite whole numbers.
+
+    """
+    values = np.asarray(values, dtype = float)
+
+    return bool(np.all(np.isfinite(values))
+                and np.array_equal(values, np.round(values)))
+
+
+@lru_cache(maxsize = 8)
+def compile_geometry(altitude_range, elevation_range):
+    """
+    Build and cache the geometry table of an altitude and elevation grid.
+
+    Parameters
+    ----------
+    altitude_range : tuple of int
+        Lowest and highest orbital altitude in km.
+    elevation_range : tuple of int
+        Lowest and highest elevation angle in degrees.
+
+    Returns
+    -------
+    table : GeometryTable
+        The geometry table.
+
+    """
+    table = GeometryTable(altitude_range, elevation_range)
+
+    return table
+
+
+def calc_geometry(orbital_altitude_km, elevation_angle):
+    """
+    This function calculates the slant range, the satellite centric and earth
+    central angles and the satellite coverage area of arrays of draws.
+
+    Integer altitudes and elevation angles are looked up in a geometry table
+    spanning their range, built on demand and cached, when the range has at 
+    most MAX_GEOMETRY_CELLS cells and GEOMETRY_CELLS_PER_ROW cells per row. 
+    Integer inputs of wider ranges are evaluated once per distinct altitude 
+    and elevation pair, and other inputs are evaluated directly.
+
+    Parameters
+    ----------
+    orbital_altitude_km : float or numpy array
+        Satellite orbital altitude.
+    elevation_angle : float or numpy array
+        minimum elevation angle of the satellite
+
+    Returns
+    -------
+    geometry : dict
+        Arrays keyed by 'signal_distance', 'satellite_centric_angle',
+        'earth_central_angle' and 'satellite_coverage'.
+
+    """
+    altitude = np.atleast_1d(np.asarray(orbital_altitude_km, dtype = float))
+    elevation = np.atleast_1d(np.asarray(elevation_angle, dtype = float))
+    altitude, elevation = np.broadcast_arrays(altitude, elevation)
+    shape = altitude.shape
+    inverse = None
+
+    if (altitude.size > 0 and is_integral(altitude)
+            and is_integral(elevation)):
+
+        altitude_range = (int(altitude.min()), int(altitude.max()))
+        elevation_range = (int(elevation.min()), int(elevation.max()))
+        cells = ((altitude_range[1] - altitude_range[0] + 1)
+                 * (elevation_range[1] - elevation_range[0] + 1))
+
+        if cells <= min(MAX_GEOMETRY_CELLS, 
+                        GEOMETRY_CELLS_PER_ROW * altitude.size):
+
+            table = compile_geometry(altitude_range, elevation_range)
+
+            return table(altitude, elevation)
+
+        index, inverse = unique_rows_index([altitude.ravel(), 
+                                            elevation.ravel()])
+        altitude = altitude.ravel()[index]
+        elevation = elevation.ravel()[index]
+
+    geometry = {
+        'signal_distance': signal_distance(altitude, elevation),
+        'satellite_centric_angle': calc_sat_centric_angle(altitude,
+                                                          elevation),
+        'earth_central_angle': calc_earth_central_angle(altitude, elevation),
+        'satellite_coverage': calc_satellite_coverage(altitude, elevation),
+    }
+
+    if inverse is not None:
+
+        geometry = {key: values[inverse].reshape(shape) 
+                    for key, values in geometry.items()}
+
+    return geometry
+
+
 def calc_free_path_loss(frequency, distance_km):
 
     """
@@ -233,7 +415,7 @@ def calc_antenna_gain(c, d, f, n):
     #Define signal wavelength
     lambda_wavelength = c / f
     #Calculate antenna_gain
-    antenna_gain = (math.log10((n * np.pi * d) / (lambda_wavelength ** 2))) * 10
+    antenna_gain = (np.log10((n * np.pi * d) / (lambda_wavelength ** 2))) * 10
 
     return antenna_gain
 
@@ -386,10 +568,14 @@ def calc_cnr(received_power, noise):
     return cnr
 
 
-def calc_spectral_efficiency(cnr, lut):
+def scan_spectral_efficiency(cnr, lut):
     """
-    Given a carrier-to-noise ratio, the function calculates the spectral 
-    efficiency based on [2].
+    Given a carrier-to-noise ratio, the function scans the lookup table in 
+    order to find the spectral efficiency based on [2].
+
+    This is the reference definition of the lookup. The first MODCOD whose CNR 
+    range contains the value is selected, and values above the last or below 
+    the first threshold are clamped to the last or first MODCOD.
 
     Parameters
     ----------
@@ -441,6 +627,124 @@ def calc_spectral_efficiency(cnr, lut):
             return spectral_efficiency
 
 
+class SpectralEfficiencyLookup(object):
+    """
+    Compiled CNR to spectral efficiency lookup table based on [2].
+
+    The CNR thresholds of the table are sorted into a contiguous array once, 
+    together with the spectral efficiency selected by scan_spectral_efficiency 
+    between each pair of neighbouring thresholds. Queries are then answered 
+    by binary search, with a single searchsorted for arrays of CNR values.
+
+    Parameters
+    ----------
+    lut : list of tuples
+        Lookup table for CNR to spectral efficiency.
+
+    """
+    def __init__(self, lut):
+
+        lut = [tuple(row) for row in lut]
+        thresholds = sorted(set(float(row[3]) for row in lut))
+
+        # The scanned result is constant between neighbouring thresholds, so 
+        # evaluating it once at each threshold (and once below the lowest) 
+        # captures the table exactly, including its clamping rules.
+        points = [thresholds[0] - 1] + thresholds
+        spectral_efficiencies = [scan_spectral_efficiency(point, lut) 
+                                 for point in points]
+
+        self.lut = lut
+        self.thresholds = np.array(thresholds, dtype = float)
+        self.spectral_efficiencies = np.array([np.nan if se is None else se 
+            for se in spectral_efficiencies], dtype = float)
+        self._threshold_list = thresholds
+        self._spectral_efficiency_list = spectral_efficiencies
+
+
+    def __call__(self, cnr):
+        """
+        Return the spectral efficiency for a CNR value or array of values.
+
+        Parameters
+        ----------
+        cnr : float or numpy array
+            Carrier-to-Noise Ratio (CNR) in dB.
+
+        Returns
+        -------
+        spectral_efficiency : float or numpy array
+            The number of bits per Hertz able to be transmitted.
+
+        """
+        if isinstance(cnr, (int, float)) or np.ndim(cnr) == 0:
+
+            if cnr != cnr:
+
+                return None
+
+            index = bisect.bisect_right(self._threshold_list, cnr)
+
+            return self._spectral_efficiency_list[index]
+
+        cnr = np.asarray(cnr, dtype = float)
+        index = np.searchsorted(self.thresholds, cnr, side = 'right')
+        spectral_efficiency = self.spectral_efficiencies[index]
+        spectral_efficiency[np.isnan(cnr)] = np.nan
+
+        return spectral_efficiency
+
+
+@lru_cache(maxsize = 8)
+def compile_lut(lut):
+    """
+    Compile and cache a CNR to spectral efficiency lookup table.
+
+    Parameters
+    ----------
+    lut : tuple of tuples
+        Lookup table for CNR to spectral efficiency.
+
+    Returns
+    -------
+    lookup : SpectralEfficiencyLookup
+        The compiled lookup table.
+
+    """
+    lookup = SpectralEfficiencyLookup(lut)
+
+    return lookup
+
+
+def calc_spectral_efficiency(cnr, lut):
+    """
+    Given a carrier-to-noise ratio, the function calculates the spectral 
+    efficiency based on [2].
+
+    Parameters
+    ----------
+    cnr : float or numpy array
+        Carrier-to-Noise Ratio (CNR) in dB.
+    lut : list of tuples or SpectralEfficiencyLookup
+        Lookup table for CNR to spectral efficiency. Plain tables are compiled 
+        and cached, which still converts the table on every call, so callers 
+        evaluating many batches should pass a compiled lookup.
+
+    Returns
+    -------
+    spectral_efficiency : float or numpy array
+        The number of bits per Hertz able to be transmitted.
+
+    """
+    if not isinstance(lut, SpectralEfficiencyLookup):
+
+        lut = compile_lut(tuple(map(tuple, lut)))
+
+    spectral_efficiency = lut(cnr)
+
+    return spectral_efficiency
+
+
 def calc_capacity(spectral_efficiency, dl_bandwidth):
     """
     Calculate the channel capacity in Mbps based on [1],[2].
@@ -652,4 +956,299 @@ def subscribers_per_area(number_of_satellites, percent_coverage, subscribers,
     subscribers_per_sat = subscribers / sats_over_land
     subscribers_sqkm = subscribers_per_sat / satellite_coverage_area_km
 
-    return subscribers_sqkm
\ No newline at end of file
+    return subscribers_sqkm
+
+
+def round_array(values, decimals):
+    """
+    This function rounds an array to a given number of decimals exactly as 
+    the built-in round does for floats.
+
+    np.round scales by a power of ten before rounding, which can resolve 
+    values lying on a half-way point differently to round. Those values are 
+    re-rounded with round so that array and scalar results agree.
+
+    Parameters
+    ----------
+    values : numpy array
+        Values to round.
+    decimals : int
+        Number of decimals to round to.
+
+    Returns
+    -------
+    rounded_values : numpy array
+        Rounded values.
+
+    """
+    values = np.asarray(values, dtype = float)
+    rounded_values = np.round(values, decimals)
+
+    scaled = values * 10.0 ** decimals
+    near_half = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+
+    if near_half.any():
+
+        ties, inverse = np.unique(values[near_half], return_inverse = True)
+        rounded_ties = np.array([round(float(value), decimals) 
+                                 for value in ties])
+        rounded_values[near_half] = rounded_ties[inverse]
+
+    return rounded_values
+
+
+def calc_link_budget(uq, lut, decimals = 4, distinct = None):
+    """
+    This function evaluates the full link budget for a batch of UQ draws in a 
+    single vectorized pass, from the slant range through to the constellation 
+    capacity.
+
+    The same equations as the scalar functions in this module are used, and 
+    intermediate quantities are rounded in the same places as the per-draw UQ 
+    runner so that results match the scalar path.
+
+    When distinct is given, the geometry, the path loss and the spectral 
+    efficiency lookup are each evaluated once per distinct tuple of their own
+    inputs and broadcast back to the draws. Results are unchanged.
+
+    Parameters
+    ----------
+    uq : DataFrame or dict
+        Columns of UQ capacity inputs, named as in uq_parameters_capacity.csv.
+    lut : list of tuples or SpectralEfficiencyLookup
+        Lookup table for CNR to spectral efficiency.
+    decimals : int
+        Number of decimals intermediate quantities are rounded to. Use None to 
+        keep full precision.
+    distinct : dict
+        If given, the sub-stages are deduplicated and the number of distinct 
+        input tuples of 'geometry', 'path_loss' and 'spectral_efficiency' is 
+        stored in it.
+
+    Returns
+    -------
+    link_budget : dict
+        Dictionary of arrays containing every link budget quantity, keyed by 
+        the interim capacity results column names.
+
+    """
+    def rounded(values):
+
+        if decimals is None:
+
+            return values
+
+        return round_array(values, decimals)
+
+    def evaluate(name, function, *columns):
+
+        if distinct is None:
+
+            return function(*columns)
+
+        index, inverse = unique_rows_index(columns)
+        distinct[name] = len(index)
+
+        values = function(*[column[index] for column in columns])
+
+        if isinstance(values, dict):
+
+            return {key: value[inverse] for key, value in values.items()}
+
+        return values[inverse]
+
+    def column(key):
+
+        return np.asarray(uq[key], dtype = float)
+
+    altitude_km = column('altitude_km')
+    elevation_angle = column('elevation_angle')
+    dl_frequency_hz = column('dl_frequency_hz')
+    dl_bandwidth_hz = column('dl_bandwidth_hz')
+    number_of_channels = column('number_of_channels')
+    polarization = column('polarization')
+    number_of_beams = column('number_of_beams')
+    number_of_satellites = column('number_of_satellites')
+
+    satellite_coverage_area_km = calc_geographic_metrics(
+        number_of_satellites, column('total_area_earth_km_sq'))
+
+    geometry = evaluate('geometry', calc_geometry, altitude_km, 
+                        elevation_angle)
+
+    slant_distance = rounded(geometry['signal_distance'])
+
+    satellite_centric_angle = geometry['satellite_centric_angle']
+
+    earth_central_angle = geometry['earth_central_angle']
+
+    sat_coverage_area = geometry['satellite_coverage']
+
+    path_loss = rounded(evaluate('path_loss', calc_free_path_loss, 
+                                 dl_frequency_hz, slant_distance))
+
+    losses = rounded(calc_losses(column('earth_atmospheric_losses_db'), 
+                                 column('all_other_losses_db')))
+
+    antenna_gain = rounded(calc_antenna_gain(column('speed_of_light'), 
+        column('antenna_diameter_m'), dl_frequency_hz, 
+        column('antenna_efficiency')))
+
+    eirp = rounded(calc_eirpd(column('power_dbw'), antenna_gain))
+
+    noise = np.full(len(altitude_km), rounded(calc_noise()))
+
+    received_power = rounded(calc_received_power(eirp, path_loss, 
+                             column('receiver_gain_db'), losses))
+
+    cnr = rounded(calc_cnr(received_power, noise))
+
+    spectral_efficiency = evaluate('spectral_efficiency', 
+        lambda cnr: calc_spectral_efficiency(cnr, lut), cnr)
+
+    channel_capacity = rounded(calc_capacity(spectral_efficiency, 
+                                             dl_bandwidth_hz))
+
+    sat_capacity = rounded(single_satellite_capacity(dl_bandwidth_hz, 
+        spectral_efficiency, number_of_channels, polarization, 
+        number_of_beams))
+
+    constellation_capacity = rounded(calc_constellation_capacity(
+        channel_capacity, number_of_channels, polarization, number_of_beams, 
+        number_of_satellites, column('percent_coverage')))
+
+    link_budget = {
+        'satellite_centric_angle': satellite_centric_angle,
+        'earth_central_angle': earth_central_angle,
+        'signal_path_km': slant_distance,
+        'coverage_area_per_sat_sqkm': rounded(sat_coverage_area),
+        'satellite_coverage_area_km': rounded(satellite_coverage_area_km),
+        'path_loss_db': path_loss,
+        'losses_db': losses,
+        'antenna_gain_db': antenna_gain,
+        'eirp_db': eirp,
+        'noise_db': noise,
+        'received_power_db': received_power,
+        'cnr_db': cnr,
+        'spectral_efficiency_bphz': spectral_efficiency,
+        'channel_capacity_mbps': channel_capacity,
+        'capacity_per_single_satellite_mbps': sat_capacity,
+        'constellation_capacity_mbps': constellation_capacity,
+    }
+
+    return link_budget
+
+
+def calc_unique_link_budget(uq, lut, decimals = 4):
+    """
+    This function evaluates the link budget with its sub-stages deduplicated.
+
+    Whole draws rarely repeat, as the antenna diameter and the frequency are 
+    drawn from wide ranges. The geometry however only depends on the 
+    altitude and elevation angle, the path loss on the frequency and slant 
+    range, and the spectral efficiency on the rounded CNR, so each of these 
+    is evaluated once per distinct tuple of its own inputs. Results are the 
+    same as calc_link_budget. Finding the distinct tuples costs a sort of the
+    batch per sub-stage, so this only pays off when the inputs of a sub-stage
+    do repeat.
+
+    Parameters
+    ----------
+    uq : DataFrame or dict
+        Columns of UQ capacity inputs, named as in uq_parameters_capacity.csv.
+    lut : list of tuples or SpectralEfficiencyLookup
+        Lookup table for CNR to spectral efficiency.
+    decimals : int
+        Number of decimals intermediate quantities are rounded to. Use None to 
+        keep full precision.
+
+    Returns
+    -------
+    link_budget : dict
+        Dictionary of arrays containing every link budget quantity, as 
+        returned by calc_link_budget.
+    distinct : dict
+        Number of distinct input tuples evaluated by 'geometry', 'path_loss' 
+        and 'spectral_efficiency'.
+
+    """
+    distinct = {}
+
+    link_budget = calc_link_budget(uq, lut, decimals, distinct)
+
+    return link_budget, distinct
+
+
+def unique_rows_index(columns):
+    """
+    This function finds the distinct rows of a table given as columns.
+
+    Constant columns are ignored. When the other columns hold whole numbers 
+    of a small enough range, every row is packed into a single integer key, 
+    otherwise the rows are sorted column by column. Rows with missing values 
+    are always distinct.
+
+    Parameters
+    ----------
+    columns : list of numpy arrays
+        Columns of equal length.
+
+    Returns
+    -------
+    index : numpy array
+        Position of one row of each distinct tuple.
+    inverse : numpy array
+        Distinct tuple of every row, as a position in index.
+
+    """
+    columns = [np.asarray(column, dtype = float) for column in columns]
+    rows = len(columns[0]) if columns else 0
+
+    if rows == 0:
+
+        return np.zeros(0, dtype = np.intp), np.zeros(0, dtype = np.intp)
+
+    varying = [column for column in columns 
+               if not np.all(column == column[0])]
+
+    if not varying:
+
+        return np.zeros(1, dtype = np.intp), np.zeros(rows, dtype = np.intp)
+
+    lows = [column.min() for column in varying]
+    spans = [column.max() - low + 1 for column, low in zip(varying, lows)]
+
+    if (all(is_integral(column) for column in varying) 
+            and np.prod(spans) < 2.0 ** 62):
+
+        key = np.zeros(rows, dtype = np.int64)
+        stride = 1
+
+        for column, low, span in zip(varying, lows, spans):
+
+            key += (column - low).astype(np.int64) * stride
+            stride *= int(span)
+
+        order = np.argsort(key)
+        sorted_key = key[order]
+
+        first = np.ones(rows, dtype = bool)
+        first[1:] = sorted_key[1:] != sorted_key[:-1]
+
+    else:
+
+        order = np.lexsort(varying[::-1])
+
+        first = np.zeros(rows, dtype = bool)
+        first[0] = True
+
+        for column in varying:
+
+            sorted_column = column[order]
+            first[1:] |= sorted_column[1:] != sorted_column[:-1]
+
+    index = order[first]
+    inverse = np.empty(rows, dtype = np.intp)
+    inverse[order] = np.cumsum(first) - 1
+
+    return index, inverse
@@ -12,6 +12,10 @@ from itertools import tee
 from collections import Counter
 from collections import OrderedDict
 
+# Yearly flows available from cashflow_matrix.
+CASHFLOWS = ['capex', 'opex', 'cashflow', 'discounted_opex', 
+             'discounted_cashflow']
+
 
 def opex_cost(regulation_fees, ground_station_energy, staff_costs,
               subscriber_acquisition, maintenance, discount_rate, 
@@ -114,6 +118,480 @@ def cost_model(satellite_manufacturing, satellite_launch_cost,
     return total_cost_ownership
 
 
+def discount_divisors(discount_rate, years):
+    """
+    This function calculates the discounting divisor (1 + r) ^ t for every 
+    discount rate and year.
+
+    Each distinct discount rate is evaluated once as a Python float, as in the
+    scalar cost functions called with Python numbers, and the rows are then 
+    gathered for every draw.
+
+    Parameters
+    ----------
+    discount_rate : float or numpy array
+        discount rate.
+    years : iterable of int
+        years to discount. Python and numpy integer years are kept as given, 
+        as numpy integer powers are not always identical to Python's.
+
+    Returns
+    -------
+    divisors : numpy array
+        (draws x years) array of discounting divisors.
+
+    """
+    discount_rate = np.atleast_1d(np.asarray(discount_rate, dtype = float))
+    rates, inverse = np.unique(discount_rate, return_inverse = True)
+    years = list(years)
+
+    rate_divisors = np.array([[((float(rate) / 100) + 1) ** year 
+        for year in years] for rate in rates], dtype = float)
+    rate_divisors = rate_divisors.reshape(len(rates), len(years))
+
+    divisors = rate_divisors[inverse]
+
+    return divisors
+
+
+def opex_cost_batch(regulation_fees, ground_station_energy, staff_costs,
+                    subscriber_acquisition, maintenance, discount_rate, 
+                    assessment_period):
+    """
+    This function calculates operating expenditures for arrays of draws.
+
+    Each year is divided by the discounting divisor and added in the same 
+    order as in opex_cost, so the results agree with opex_cost to 
+    floating-point rounding. A numpy float discount rate is raised to its 
+    powers by numpy in opex_cost, which can differ in the last digit.
+
+    Parameters
+    ----------
+    regulation_fees : numpy array
+        Orbital fees cost.
+    ground_station_energy : numpy array
+        ground station cost.
+    staff_costs : numpy array
+        staff costs.
+    subscriber_acquisition : numpy array
+        customer marketing and promotion cost.
+    maintenance : numpy array
+        maintenance cost.
+    discount_rate : float or numpy array
+        discount rate.
+    assessment_period : int or numpy array
+        assessment period equivalent 
+        to the satellite lifespan.
+
+    Returns
+    -------
+    annual_opex : numpy array
+            The operating expenditure costs annually.
+
+    """
+    opex_costs = np.asarray(regulation_fees + ground_station_energy 
+                            + staff_costs + subscriber_acquisition 
+                            + maintenance, dtype = float)
+
+    opex_costs, discount_rate, assessment_period = np.broadcast_arrays(
+        opex_costs, discount_rate, np.asarray(assessment_period, dtype = int))
+
+    years = range(0, int(assessment_period.max(initial = 0)))
+    divisors = discount_divisors(discount_rate.ravel(), years)
+
+    annual_opex = np.zeros(opex_costs.size)
+
+    for time in years:
+
+        yearly_opex = opex_costs.ravel() / divisors[:, time]
+        annual_opex = annual_opex + np.where(
+            time < assessment_period.ravel(), yearly_opex, 0)
+
+    annual_opex = annual_opex.reshape(opex_costs.shape)
+
+    return annual_opex
+
+
+def cost_model_batch(satellite_manufacturing, satellite_launch_cost, 
+    ground_station_cost, regulation_fees, fiber_infrastructure_cost, 
+    ground_station_energy, subscriber_acquisition, staff_costs,
+    maintenance, discount_rate, assessment_period):
+    """
+    Calculate the total cost of ownership(TCO) in US$ for arrays of draws.
+
+    As in cost_model, the first year of opex is undiscounted and the 
+    following years are discounted, so the results agree with cost_model to
+    floating-point rounding.
+
+    Parameters
+    ----------
+    satellite_manufacturing : numpy array
+        satellite manufacturing cost.
+    satellite_launch_cost : numpy array
+        cost of launching satellites.
+    ground_station_cost : numpy array
+        cost of constructing a ground station.
+    regulation_fees : numpy array
+        Orbital fees cost.
+    fiber_infrastructure_cost : numpy array
+        cost of connecting the ground stations to fiber backbone.
+    ground_station_energy : numpy array
+        ground station cost.
+    subscriber_acquisition : numpy array
+        customer marketing and promotion cost.
+    staff_costs : numpy array
+        staff costs.
+    maintenance : numpy array
+        maintenance cost.
+    discount_rate : float or numpy array
+        discount rate.
+    assessment_period : int or numpy array
+        assessment period equivalent to the satellite lifespan.
+
+    Returns
+    -------
+    total_cost_ownership : numpy array
+            The total cost of ownership.
+
+    """
+    capex = np.asarray(satellite_manufacturing + satellite_launch_cost 
+                       + ground_station_cost + fiber_infrastructure_cost, 
+                       dtype = float)
+
+    opex_costs = np.asarray(regulation_fees + ground_station_energy 
+                            + staff_costs + subscriber_acquisition 
+                            + maintenance, dtype = float)
+
+    capex, opex_costs, discount_rate, assessment_period = np.broadcast_arrays(
+        capex, opex_costs, discount_rate, 
+        np.asarray(assessment_period, dtype = int))
+
+    years = np.arange(1, int(assessment_period.max(initial = 0)))
+    divisors = discount_divisors(discount_rate.ravel(), years)
+
+    discounted_opex = np.zeros(opex_costs.size)
+
+    for column, time in enumerate(years):
+
+        yearly_opex = opex_costs.ravel() / divisors[:, column]
+        discounted_opex = discounted_opex + np.where(
+            time < assessment_period.ravel(), yearly_opex, 0)
+
+    total_cost_ownership = (capex.ravel() + discounted_opex 
+                            + opex_costs.ravel())
+    total_cost_ownership = total_cost_ownership.reshape(capex.shape)
+
+    return total_cost_ownership
+
+
+def discount_factors(discount_rates, assessment_periods):
+    """
+    This function calculates the discount factor of every year for every 
+    combination of discount rate and assessment period.
+
+    The factor of year t is 1 / (1 + r) ^ t for the years within the 
+    assessment period and zero after it, so the first year is undiscounted 
+    as in cost_model.
+
+    Parameters
+    ----------
+    discount_rates : float or numpy array
+        discount rates to sweep.
+    assessment_periods : int or numpy array
+        assessment periods to sweep.
+
+    Returns
+    -------
+    factors : numpy array
+        (years x rates x periods) array of discount factors, with as many 
+        years as the longest assessment period.
+
+    """
+    discount_rates = np.atleast_1d(np.asarray(discount_rates, dtype = float))
+    assessment_periods = np.atleast_1d(np.asarray(assessment_periods, 
+                                                  dtype = int))
+
+    years = np.arange(0, int(assessment_periods.max(initial = 0)))
+    divisors = discount_divisors(discount_rates, years)
+
+    within = years[:, None] < assessment_periods[None, :]
+    factors = (1 / divisors.T)[:, :, None] * within[:, None, :]
+
+    return factors
+
+
+def cost_sweep(satellite_manufacturing, satellite_launch_cost, 
+    ground_station_cost, regulation_fees, fiber_infrastructure_cost, 
+    ground_station_energy, subscriber_acquisition, staff_costs,
+    maintenance, discount_rates, assessment_periods, subscribers = None):
+    """
+    Calculate the opex, the total cost of ownership(TCO) and the monthly cost
+    per user in US$ for every draw, discount rate and assessment period.
+
+    The discount factors are calculated once, and summed over the years into
+    one discounted annuity per rate and period. The discounted opex of every 
+    combination is then the matrix product of the annual opex of the draws 
+    with the annuities. Results agree with opex_cost and cost_model to 
+    rounding.
+
+    Parameters
+    ----------
+    satellite_manufacturing : numpy array
+        satellite manufacturing cost.
+    satellite_launch_cost : numpy array
+        cost of launching satellites.
+    ground_station_cost : numpy array
+        cost of constructing a ground station.
+    regulation_fees : numpy array
+        Orbital fees cost.
+    fiber_infrastructure_cost : numpy array
+        cost of connecting the ground stations to fiber backbone.
+    ground_station_energy : numpy array
+        ground station cost.
+    subscriber_acquisition : numpy array
+        customer marketing and promotion cost.
+    staff_costs : numpy array
+        staff costs.
+    maintenance : numpy array
+        maintenance cost.
+    discount_rates : float or numpy array
+        discount rates to sweep.
+    assessment_periods : int or numpy array
+        assessment periods to sweep.
+    subscribers : numpy array
+        number of subscribers of every draw. If given, the monthly cost per
+        user is also calculated.
+
+    Returns
+    -------
+    sweep : dict
+        'opex', 'total_cost_ownership' and, with subscribers, 
+        'user_monthly_cost' as (draws x rates x periods) arrays.
+
+    """
+    capex = np.asarray(satellite_manufacturing + satellite_launch_cost 
+                       + ground_station_cost + fiber_infrastructure_cost, 
+                       dtype = float)
+
+    opex_costs = np.asarray(regulation_fees + ground_station_energy 
+                            + staff_costs + subscriber_acquisition 
+                            + maintenance, dtype = float)
+
+    capex, opex_costs = np.broadcast_arrays(np.atleast_1d(capex), 
+                                            np.atleast_1d(opex_costs))
+    capex = capex.ravel()
+    opex_costs = opex_costs.ravel()
+
+    factors = discount_factors(discount_rates, assessment_periods)
+    years, rates, periods = factors.shape
+
+    annuities = factors.sum(axis = 0).reshape(1, rates * periods)
+
+    opex = np.matmul(opex_costs[:, None], annuities)
+    opex = opex.reshape(len(opex_costs), rates, periods)
+
+    total_cost_ownership = opex + capex[:, None, None]
+
+    sweep = {
+        'opex': opex,
+        'total_cost_ownership': total_cost_ownership,
+    }
+
+    if subscribers is not None:
+
+        subscribers = np.broadcast_to(np.asarray(subscribers, 
+            dtype = float).ravel(), capex.shape)
+
+        sweep['user_monthly_cost'] = user_monthly_cost(
+            total_cost_ownership / subscribers[:, None, None], 
+            np.atleast_1d(np.asarray(assessment_periods, dtype = int)))
+
+    return sweep
+
+
+def cashflow_matrix(satellite_manufacturing, satellite_launch_cost, 
+    ground_station_cost, regulation_fees, fiber_infrastructure_cost, 
+    ground_station_energy, subscriber_acquisition, staff_costs,
+    maintenance, discount_rate, assessment_period, 
+    flows = ('capex', 'opex', 'discounted_cashflow')):
+    """
+    Calculate the yearly cashflows in US$ of every draw.
+
+    Capex is spent in the first year and opex in every year of the 
+    assessment period. As in cost_model, the first year is undiscounted and 
+    year t is divided by (1 + r) ^ t, so the discounted cashflows of a draw 
+    sum to its total cost of ownership(TCO). Only the requested flows are 
+    calculated, each as one (draws x years) array.
+
+    Parameters
+    ----------
+    satellite_manufacturing : numpy array
+        satellite manufacturing cost.
+    satellite_launch_cost : numpy array
+        cost of launching satellites.
+    ground_station_cost : numpy array
+        cost of constructing a ground station.
+    regulation_fees : numpy array
+        Orbital fees cost.
+    fiber_infrastructure_cost : numpy array
+        cost of connecting the ground stations to fiber backbone.
+    ground_station_energy : numpy array
+        ground station cost.
+    subscriber_acquisition : numpy array
+        customer marketing and promotion cost.
+    staff_costs : numpy array
+        staff costs.
+    maintenance : numpy array
+        maintenance cost.
+    discount_rate : float or numpy array
+        discount rate.
+    assessment_period : int or numpy array
+        assessment period equivalent to the satellite lifespan.
+    flows : iterable of str
+        Flows to calculate, among 'capex', 'opex', 'cashflow' (capex plus
+        opex), 'discounted_opex' and 'discounted_cashflow'.
+
+    Returns
+    -------
+    cashflows : dict
+        (draws x years) array of every requested flow, with as many years 
+        as the longest assessment period and zeros after the period of each
+        draw.
+
+    """
+    flows = list(flows)
+    unknown = set(flows) - set(CASHFLOWS)
+
+    if unknown:
+
+        raise ValueError('Unrecognized cashflows {}'.format(sorted(unknown)))
+
+    capex = np.asarray(satellite_manufacturing + satellite_launch_cost 
+                       + ground_station_cost + fiber_infrastructure_cost, 
+                       dtype = float)
+
+    opex_costs = np.asarray(regulation_fees + ground_station_energy 
+                            + staff_costs + subscriber_acquisition 
+                            + maintenance, dtype = float)
+
+    capex, opex_costs, discount_rate, assessment_period = np.broadcast_arrays(
+        np.atleast_1d(capex), opex_costs, discount_rate, 
+        np.asarray(assessment_period, dtype = int))
+
+    capex = capex.ravel()
+    opex_costs = opex_costs.ravel()
+    assessment_period = assessment_period.ravel()
+
+    # The first year is always costed, as cost_model always adds the opex 
+    # of the first year.
+    years = np.arange(0, max(int(assessment_period.max(initial = 0)), 1))
+    within = cashflow_years(assessment_period, len(years))
+
+    cashflows = {}
+
+    if 'opex' in flows or 'cashflow' in flows:
+
+        opex = np.where(within, opex_costs[:, None], 0.0)
+
+        if 'opex' in flows:
+
+            cashflows['opex'] = opex
+
+        if 'cashflow' in flows:
+
+            cashflow = opex.copy() if 'opex' in flows else opex
+            cashflow[:, 0] += capex
+            cashflows['cashflow'] = cashflow
+
+    if 'discounted_opex' in flows or 'discounted_cashflow' in flows:
+
+        discounted = discount_divisors(discount_rate.ravel(), years)
+        np.divide(opex_costs[:, None], discounted, out = discounted)
+        discounted[~within] = 0
+
+        if 'discounted_opex' in flows:
+
+            cashflows['discounted_opex'] = discounted
+
+        if 'discounted_cashflow' in flows:
+
+            discounted_cashflow = (discounted.copy() if 'discounted_opex' 
+                                   in flows else discounted)
+            discounted_cashflow[:, 0] += capex
+            cashflows['discounted_cashflow'] = discounted_cashflow
+
+    if 'capex' in flows:
+
+        capex_flow = np.zeros((len(capex), len(years)))
+        capex_flow[:, 0] = capex
+        cashflows['capex'] = capex_flow
+
+    cashflows = {flow: cashflows[flow] for flow in flows}
+
+    return cashflows
+
+
+def cashflow_years(assessment_period, years):
+    """
+    This function flags the years within the assessment period of every 
+    draw, always including the first year.
+
+    Parameters
+    ----------
+    assessment_period : numpy array
+        assessment period of every draw.
+    years : int
+        number of years of the cashflow matrix.
+
+    Returns
+    -------
+    within : numpy array
+        (draws x years) boolean array.
+
+    """
+    assessment_period = np.maximum(np.asarray(assessment_period, 
+                                              dtype = int).ravel(), 1)
+
+    within = np.arange(years)[None, :] < assessment_period[:, None]
+
+    return within
+
+
+def cashflow_table(cashflows, assessment_period):
+    """
+    This function turns the cashflow matrices into a long table, with one 
+    row per draw and year of its assessment period.
+
+    Parameters
+    ----------
+    cashflows : dict
+        (draws x years) arrays from cashflow_matrix.
+    assessment_period : int or numpy array
+        assessment period of every draw.
+
+    Returns
+    -------
+    table : dict
+        'draw' and 'year' arrays, and one array per flow, of equal length.
+
+    """
+    shape = next(iter(cashflows.values())).shape
+
+    assessment_period = np.broadcast_to(np.asarray(assessment_period, 
+        dtype = int).ravel(), shape[:1])
+
+    within = cashflow_years(assessment_period, shape[1])
+    draw, year = np.nonzero(within)
+
+    table = {'draw': draw, 'year': year}
+
+    for flow, values in cashflows.items():
+
+        table[flow] = values[within]
+
+    return table
+
+
 def user_monthly_cost(tco_per_user, lifespan):
     """
     Calculate average monthly cost per user:
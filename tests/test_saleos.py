@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 from saleos.capacity import (
     calc_geographic_metrics,
     signal_distance,
@@ -16,9 +17,26 @@ from saleos.capacity import (
     single_satellite_capacity,
     calc_constellation_capacity,
     capacity_subscriber,
-    monthly_traffic
+    monthly_traffic,
+    calc_spectral_efficiency,
+    scan_spectral_efficiency,
+    SpectralEfficiencyLookup,
+    calc_link_budget,
+    calc_geometry,
+    compile_geometry,
+    calc_unique_link_budget,
+    round_array
+)
+from saleos.cost import (
+    cost_model,
+    opex_cost,
+    cost_model_batch,
+    opex_cost_batch,
+    cost_sweep,
+    user_monthly_cost,
+    cashflow_matrix,
+    cashflow_table
 )
-from saleos.cost import cost_model
 
 
 def test_calc_geographic_metrics():
@@ -240,6 +258,185 @@ def test_monthly_traffic():
     assert round(monthly_traffic(capacity_mbps)) == 20
 
 
+def test_spectral_efficiency_lookup():
+    """
+    Unit test for looking up 
+    spectral efficiency from a 
+    compiled lookup table.
+
+    """
+    lut = [('QPSK 2/9', 0.434841, -2.85, -2.45),
+           ('QPSK 9/20', 0.889135, 0.22, 0.69),
+           ('8PSK 13/18', 2.145136, 7.49, 8.42),
+           ('16APSK 1/2-L', 1.972253, 5.97, 8.4),
+           ('16APSK 8/15-L', 2.104850, 6.55, 9.0)]
+    lookup = SpectralEfficiencyLookup(lut)
+    cnr = [-10, -2.45, 0.69, 8.41, 8.42, 8.9, 9.0, 25]
+
+    assert list(lookup(cnr)) == [
+        scan_spectral_efficiency(value, lut) for value in cnr]
+    assert lookup(-10) == 0.434841
+    assert lookup(25) == 2.104850
+    assert calc_spectral_efficiency(8.41, lut) == 0.889135
+
+
+def test_calc_geometry():
+    """
+    Unit test for looking up the satellite 
+    geometry against the direct functions.
+
+    """
+    altitude = np.array([539, 545, 551, 545, 35786])
+    elevation = np.array([25, 40, 33, 25, 5])
+
+    for altitude_km, elevation_angle in [(altitude[:4], elevation[:4]), 
+                                         (altitude, elevation), 
+                                         (altitude + 0.5, elevation)]:
+
+        geometry = calc_geometry(altitude_km, elevation_angle)
+
+        assert np.array_equal(geometry['signal_distance'], 
+                              signal_distance(altitude_km, elevation_angle))
+        assert np.array_equal(geometry['satellite_centric_angle'], 
+            calc_sat_centric_angle(altitude_km, elevation_angle))
+        assert np.array_equal(geometry['earth_central_angle'], 
+            calc_earth_central_angle(altitude_km, elevation_angle))
+        assert np.array_equal(geometry['satellite_coverage'], 
+            calc_satellite_coverage(altitude_km, elevation_angle))
+
+    # A chunk mixing LEO and GEO altitudes is evaluated per distinct pair 
+    # instead of building a table of its whole altitude range.
+    compile_geometry.cache_clear()
+
+    geometry = calc_geometry(np.tile(altitude, 100), np.tile(elevation, 100))
+
+    assert compile_geometry.cache_info().currsize == 0
+    assert np.array_equal(geometry['signal_distance'], 
+        signal_distance(np.tile(altitude, 100), np.tile(elevation, 100)))
+
+    geometry = calc_geometry(np.tile(altitude[:4], 100), 
+                             np.tile(elevation[:4], 100))
+
+    assert compile_geometry.cache_info().currsize == 1
+    assert np.array_equal(geometry['satellite_coverage'], 
+        calc_satellite_coverage(np.tile(altitude[:4], 100), 
+                                np.tile(elevation[:4], 100)))
+
+
+def test_round_array():
+    """
+    Unit test for rounding 
+    arrays as the built-in 
+    round does.
+
+    """
+    values = [2.675, 0.125, 1.005, -3.14159, 7.5, 1e-9]
+
+    assert round_array(values, 2).tolist() == [round(value, 2) 
+                                               for value in values]
+    assert round_array(values, 0).tolist() == [round(value, 0) 
+                                               for value in values]
+
+
+def test_calc_link_budget():
+    """
+    Unit test for calculating 
+    the vectorized link budget 
+    against the scalar functions.
+
+    """
+    lut = [('QPSK 2/9', 0.434841, -2.85, -2.45),
+           ('QPSK 9/20', 0.889135, 0.22, 0.69),
+           ('8APSK 5/9-L', 1.647211, 4.73, 5.95)]
+    uq = {
+        'number_of_satellites': [4425, 648],
+        'total_area_earth_km_sq': [510000000, 510000000],
+        'altitude_km': [545, 1200],
+        'elevation_angle': [25, 45],
+        'dl_frequency_hz': [10700000000, 12700000000],
+        'dl_bandwidth_hz': [250000000, 125000000],
+        'power_dbw': [30, 32],
+        'receiver_gain_db': [30, 38],
+        'earth_atmospheric_losses_db': [10, 1],
+        'all_other_losses_db': [0.53, 0.53],
+        'antenna_diameter_m': [0.6, 0.65],
+        'antenna_efficiency': [0.6, 0.6],
+        'speed_of_light': [3.0 * 10 ** 8, 3.0 * 10 ** 8],
+        'number_of_channels': [6, 3],
+        'polarization': [1, 1],
+        'number_of_beams': [8, 16],
+        'percent_coverage': [67, 67]
+    }
+    link_budget = calc_link_budget(uq, lut)
+
+    for i in range(2):
+
+        distance = signal_distance(uq['altitude_km'][i], 
+                                   uq['elevation_angle'][i])
+        path_loss = round(calc_free_path_loss(uq['dl_frequency_hz'][i], 
+                          distance), 4)
+        antenna_gain = round(calc_antenna_gain(uq['speed_of_light'][i], 
+            uq['antenna_diameter_m'][i], uq['dl_frequency_hz'][i], 
+            uq['antenna_efficiency'][i]), 4)
+        eirp = round(calc_eirpd(uq['power_dbw'][i], antenna_gain), 4)
+        losses = round(calc_losses(uq['earth_atmospheric_losses_db'][i], 
+                       uq['all_other_losses_db'][i]), 4)
+        received_power = round(calc_received_power(eirp, path_loss, 
+                               uq['receiver_gain_db'][i], losses), 4)
+        cnr = round(calc_cnr(received_power, round(calc_noise(), 4)), 4)
+
+        assert link_budget['signal_path_km'][i] == distance
+        assert link_budget['path_loss_db'][i] == path_loss
+        assert link_budget['cnr_db'][i] == cnr
+        assert link_budget['spectral_efficiency_bphz'][i] == (
+            calc_spectral_efficiency(cnr, lut))
+        assert round(link_budget['coverage_area_per_sat_sqkm'][i]) == round(
+            calc_satellite_coverage(uq['altitude_km'][i], 
+                                    uq['elevation_angle'][i]))
+
+
+def test_calc_unique_link_budget():
+    """
+    Unit test for evaluating the link 
+    budget sub-stages once per distinct 
+    input tuple.
+
+    """
+    lut = [('QPSK 2/9', 0.434841, -2.85, -2.45),
+           ('QPSK 9/20', 0.889135, 0.22, 0.69),
+           ('8APSK 5/9-L', 1.647211, 4.73, 5.95)]
+    uq = {
+        'number_of_satellites': [4425, 648, 4425, 4425],
+        'total_area_earth_km_sq': [510000000] * 4,
+        'altitude_km': [545, 1200, 545, 546],
+        'elevation_angle': [25, 45, 25, 25],
+        'dl_frequency_hz': [10700000000, 12700000000, 10700000000, 
+                            10700000000],
+        'dl_bandwidth_hz': [250000000, 125000000, 250000000, 250000000],
+        'power_dbw': [30, 32, 30, 30],
+        'receiver_gain_db': [30, 38, 30, 30],
+        'earth_atmospheric_losses_db': [10, 1, 10, 10],
+        'all_other_losses_db': [0.53] * 4,
+        'antenna_diameter_m': [0.6, 0.65, 0.6, 0.6],
+        'antenna_efficiency': [0.6] * 4,
+        'speed_of_light': [3.0 * 10 ** 8] * 4,
+        'number_of_channels': [6, 3, 6, 6],
+        'polarization': [1] * 4,
+        'number_of_beams': [8, 16, 8, 8],
+        'percent_coverage': [67] * 4
+    }
+    link_budget = calc_link_budget(uq, lut)
+    unique_link_budget, distinct = calc_unique_link_budget(uq, lut)
+
+    assert distinct['geometry'] == 3
+    assert distinct['path_loss'] == 3
+    assert distinct['spectral_efficiency'] <= 3
+
+    for key, values in link_budget.items():
+
+        assert np.array_equal(unique_link_budget[key], values)
+
+
 def test_cost():
     """
     Unit test for calculating 
@@ -265,4 +462,153 @@ def test_cost():
     ground_station_cost, spectrum_cost, regulation_fees, 
     fiber_infrastructure_cost, ground_station_energy, 
     subscriber_acquisition, staff_costs, research_development, 
-    maintenance, discount_rate, assessment_period)) == 1057867791
\ No newline at end of file
+    maintenance, discount_rate, assessment_period)) == 1057867791
+
+
+def test_cost_model_batch():
+    """
+    Unit test for calculating 
+    the total cost of ownership 
+    for arrays of draws.
+
+    """
+    satellite_manufacturing = np.array([150000, 20000000])
+    satellite_launch_cost = np.array([260000, 80000000])
+    ground_station_cost = np.array([400000, 450000])
+    regulation_fees = np.array([11215, 107580])
+    fiber_infrastructure_cost = np.array([31250, 62500])
+    ground_station_energy = np.array([600, 800])
+    subscriber_acquisition = np.array([22900000, 3400000])
+    staff_costs = np.array([100000, 250000])
+    maintenance = np.array([8340000, 550000])
+    discount_rate = np.array([7, 7])
+    assessment_period = np.array([5, 15])
+
+    tco = cost_model_batch(satellite_manufacturing, satellite_launch_cost, 
+        ground_station_cost, regulation_fees, fiber_infrastructure_cost, 
+        ground_station_energy, subscriber_acquisition, staff_costs, 
+        maintenance, discount_rate, assessment_period)
+    
+    opex = opex_cost_batch(regulation_fees, ground_station_energy, 
+        staff_costs, subscriber_acquisition, maintenance, discount_rate, 
+        assessment_period)
+
+    for i in range(2):
+
+        assert tco[i] == cost_model(int(satellite_manufacturing[i]), 
+            int(satellite_launch_cost[i]), int(ground_station_cost[i]), 
+            int(regulation_fees[i]), int(fiber_infrastructure_cost[i]), 
+            int(ground_station_energy[i]), int(subscriber_acquisition[i]), 
+            int(staff_costs[i]), int(maintenance[i]), int(discount_rate[i]), 
+            int(assessment_period[i]))
+
+        assert opex[i] == opex_cost(int(regulation_fees[i]), 
+            int(ground_station_energy[i]), int(staff_costs[i]), 
+            int(subscriber_acquisition[i]), int(maintenance[i]), 
+            int(discount_rate[i]), int(assessment_period[i]))
+
+    discount_rate = np.array([5.3, 11.9])
+
+    tco = cost_model_batch(satellite_manufacturing, satellite_launch_cost, 
+        ground_station_cost, regulation_fees, fiber_infrastructure_cost, 
+        ground_station_energy, subscriber_acquisition, staff_costs, 
+        maintenance, discount_rate, assessment_period)
+
+    for i in range(2):
+
+        assert tco[i] == pytest.approx(cost_model(satellite_manufacturing[i], 
+            satellite_launch_cost[i], ground_station_cost[i], 
+            regulation_fees[i], fiber_infrastructure_cost[i], 
+            ground_station_energy[i], subscriber_acquisition[i], 
+            staff_costs[i], maintenance[i], discount_rate[i], 
+            assessment_period[i]), rel = 1e-12)
+
+
+def test_cost_sweep():
+    """
+    Unit test for calculating 
+    the costs of every draw,
+    discount rate and assessment 
+    period.
+
+    """
+    costs = [np.array([150000, 20000000]), np.array([260000, 80000000]),
+        np.array([400000, 450000]), np.array([11215, 107580]), 
+        np.array([31250, 62500]), np.array([600, 800]), 
+        np.array([22900000, 3400000]), np.array([100000, 250000]), 
+        np.array([8340000, 550000])]
+    discount_rates = [3, 7, 12.5]
+    assessment_periods = [1, 5, 15]
+    subscribers = np.array([1000, 25000])
+
+    sweep = cost_sweep(*costs, discount_rates, assessment_periods, 
+                       subscribers)
+
+    assert sweep['total_cost_ownership'].shape == (2, 3, 3)
+
+    for i in range(2):
+
+        values = [int(cost[i]) for cost in costs]
+
+        for j, discount_rate in enumerate(discount_rates):
+
+            for k, assessment_period in enumerate(assessment_periods):
+
+                tco = cost_model(*values, discount_rate, assessment_period)
+                opex = opex_cost(values[3], values[5], values[7], 
+                    values[6], values[8], discount_rate, assessment_period)
+
+                assert sweep['total_cost_ownership'][i, j, k] == (
+                    pytest.approx(tco, rel = 1e-12))
+                assert sweep['opex'][i, j, k] == pytest.approx(opex, 
+                                                               rel = 1e-12)
+                assert sweep['user_monthly_cost'][i, j, k] == pytest.approx(
+                    user_monthly_cost(tco / subscribers[i], 
+                                      assessment_period), rel = 1e-12)
+
+
+def test_cashflow_matrix():
+    """
+    Unit test for calculating 
+    the yearly cashflows of
+    arrays of draws.
+
+    """
+    costs = [np.array([150000, 20000000]), np.array([260000, 80000000]),
+        np.array([400000, 450000]), np.array([11215, 107580]), 
+        np.array([31250, 62500]), np.array([600, 800]), 
+        np.array([22900000, 3400000]), np.array([100000, 250000]), 
+        np.array([8340000, 550000])]
+    discount_rate = np.array([7, 7])
+    assessment_period = np.array([5, 15])
+
+    cashflows = cashflow_matrix(*costs, discount_rate, assessment_period, 
+        ['capex', 'opex', 'discounted_opex', 'discounted_cashflow'])
+
+    assert cashflows['capex'].shape == (2, 15)
+    assert (cashflows['opex'][0, 5:] == 0).all()
+
+    tco = cost_model_batch(*costs, discount_rate, assessment_period)
+    opex = opex_cost_batch(costs[3], costs[5], costs[7], costs[6], costs[8],
+                           discount_rate, assessment_period)
+
+    assert cashflows['discounted_cashflow'].sum(axis = 1) == pytest.approx(
+        tco, rel = 1e-12)
+    assert cashflows['discounted_opex'].sum(axis = 1) == pytest.approx(
+        opex, rel = 1e-12)
+
+    capex = costs[0] + costs[1] + costs[2] + costs[4]
+    annual_opex = costs[3] + costs[5] + costs[6] + costs[7] + costs[8]
+
+    assert (cashflows['capex'].sum(axis = 1) == capex).all()
+    assert (cashflows['opex'].sum(axis = 1) 
+            == annual_opex * assessment_period).all()
+
+    table = cashflow_table(cashflows, assessment_period)
+
+    assert len(table['year']) == 20
+    assert table['discounted_cashflow'].sum() == pytest.approx(tco.sum(), 
+                                                              rel = 1e-12)
+
+    with pytest.raises(ValueError):
+        cashflow_matrix(*costs, discount_rate, assessment_period, ['npv'])
@@ -0,0 +1,507 @@
+import os
+import sys
+import random
+import pytest
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from emissions import (EMISSION_INDICATORS, TOTAL_INDICATORS, RocketFactors,
+                       calc_launch_emissions, read_rocket_factors)
+from inputs import parameters
+from instrument import measure, run_measured
+from outputs import ResultStore, ResultWriter, read_table, table_rows
+from preprocess import multiorbit_sat_capacity, multiorbit_sat_capacity_batch
+from pipeline import run_stages, stage, stage_dependencies
+from per_user_results import (GEO_decile_satellites, LEO_decile_satellite,
+                              decile_connected_satellites)
+from summary import QuantileSketch, RunningMoments, summarize_adaptive
+
+# Folder of the files written by the test stages, set by each test before 
+# the stage runner starts its worker processes.
+STAGE_FOLDER = {}
+
+
+def test_multiorbit_sat_capacity():
+    """
+    Unit test for generating
+    the capacity inputs of one
+    iteration without a generator.
+
+    """
+    random.seed(0)
+
+    for key in ['starlink', 'oneweb', 'kuiper', 'geo']:
+
+        constellation_params = parameters[key]
+        output = multiorbit_sat_capacity(3, constellation_params)
+
+        assert len(output) == 1
+
+        row = output[0]
+
+        assert row['iteration'] == 3
+        assert (constellation_params['antenna_diameter_m_low']
+                <= row['antenna_diameter_m']
+                <= constellation_params['antenna_diameter_m_high'])
+
+        batch = multiorbit_sat_capacity_batch(np.arange(2),
+            constellation_params, np.random.default_rng(0))
+
+        assert list(row) == list(batch.columns)
+
+
+def test_decile_connected_satellites():
+    """
+    Unit test for calculating
+    the connected satellites
+    of every decile area.
+
+    """
+    constellation = ['Starlink', 'OneWeb', 'Kuiper', 'GEO']
+    decile_area = [1000, 20000, 300000, 4000000]
+
+    connected_sats = decile_connected_satellites(constellation, decile_area)
+
+    assert connected_sats[0] == pytest.approx(
+        LEO_decile_satellite(1000) * 4425 / 3236)
+    assert connected_sats[1] == LEO_decile_satellite(20000)
+    assert connected_sats[2] == LEO_decile_satellite(300000)
+    assert connected_sats[3] == GEO_decile_satellites(4000000)
+
+    connected_sats = decile_connected_satellites(['geo_generic', 'starlink', 
+        'oneweb', 'GEO'], [4000000] * 4)
+
+    assert connected_sats[0] == GEO_decile_satellites(4000000)
+    assert connected_sats[1] == pytest.approx(
+        LEO_decile_satellite(4000000) * 4425 / 3236)
+    assert connected_sats[2] == LEO_decile_satellite(4000000)
+    assert connected_sats[3] == GEO_decile_satellites(4000000)
+
+    with pytest.raises(ValueError):
+        decile_connected_satellites(['Iridium'], [1000])
+
+
+def test_running_moments_merge():
+    """
+    Unit test for merging
+    the running moments of
+    separate chunks.
+
+    """
+    values = np.random.default_rng(0).lognormal(3, 1, 10000)
+    values[::7] *= -1
+
+    single = RunningMoments()
+    single.update(values)
+
+    merged = RunningMoments()
+
+    for chunk in np.array_split(values, 13):
+
+        moments = RunningMoments()
+        moments.update(chunk)
+        merged.merge(moments)
+
+    assert merged.count == single.count == len(values)
+    assert merged.mean == pytest.approx(single.mean, rel = 1e-12)
+    assert merged.m2 == pytest.approx(single.m2, rel = 1e-12)
+    assert merged.minimum == single.minimum == values.min()
+    assert merged.maximum == single.maximum == values.max()
+
+    assert merged.mean == pytest.approx(np.mean(values), rel = 1e-12)
+    assert merged.std ** 2 == pytest.approx(np.var(values, ddof = 1), 
+                                            rel = 1e-12)
+
+
+def test_quantile_sketch_merge():
+    """
+    Unit test for merging
+    the quantile sketches of
+    separate chunks.
+
+    """
+    values = np.random.default_rng(1).lognormal(3, 1, 10000)
+    values[::7] *= -1
+    values[::50] = 0
+
+    single = QuantileSketch()
+    single.update(values)
+
+    merged = QuantileSketch()
+
+    for chunk in np.array_split(values, 13):
+
+        sketch = QuantileSketch()
+        sketch.update(chunk)
+        merged.merge(sketch)
+
+    assert merged.count == single.count
+    assert merged.zero_count == single.zero_count
+    assert merged.positive == single.positive
+    assert merged.negative == single.negative
+
+    for q in [0, 0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 1]:
+
+        assert merged.quantile(q) == single.quantile(q)
+
+        # The sketch estimates the order statistic of rank q (n - 1), 
+        # rounded down, without interpolating between values.
+        exact = np.quantile(values, q, method = 'lower')
+
+        assert abs(merged.quantile(q) - exact) <= (
+            merged.relative_accuracy * abs(exact))
+
+    with pytest.raises(ValueError):
+        merged.merge(QuantileSketch(0.01))
+
+
+def test_result_store_round_trip(tmp_path):
+    """
+    Unit test for appending
+    chunks to a result store
+    and reading them back.
+
+    """
+    path = str(tmp_path / 'results.memmap')
+
+    first = pd.DataFrame({'constellation': ['Starlink', 'GEO'], 
+                          'number_of_satellites': [4425, 3]})
+    second = pd.DataFrame({'constellation': ['OneWeb', 'Starlink'], 
+                           'number_of_satellites': [648.5, 0.25]})
+
+    store = ResultStore(path, 'w')
+    store.append(first)
+    store.append(second)
+
+    with pytest.raises(ValueError):
+        store.append(pd.DataFrame({'constellation': ['Kuiper'], 
+                                   'number_of_satellites': ['many']}))
+
+    expected = pd.concat([first, second], ignore_index = True)
+    df = ResultStore(path).read()
+
+    assert len(df) == 4
+    assert df['number_of_satellites'].dtype == np.float64
+    pd.testing.assert_frame_equal(df, expected)
+
+    df = ResultStore(path).read(['number_of_satellites', 'constellation'], 
+                                1, 3)
+
+    assert list(df.columns) == ['number_of_satellites', 'constellation']
+    assert list(df['constellation']) == ['GEO', 'OneWeb']
+    assert list(df['number_of_satellites']) == [3, 648.5]
+
+    chunks = list(read_table(path, chunksize = 3))
+
+    assert [len(chunk) for chunk in chunks] == [3, 1]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index = True), 
+                                  expected)
+
+
+def stage_file(name):
+
+    return os.path.join(STAGE_FOLDER['path'], name)
+
+
+def write_first():
+
+    df = pd.read_csv(stage_file('raw.csv'))
+    df.to_csv(stage_file('first.csv'), index = False)
+
+
+def write_second():
+
+    df = pd.read_csv(stage_file('first.csv'))
+    df['value'] = df['value'] * 2
+    df.to_csv(stage_file('second.csv'), index = False)
+
+
+def write_third():
+
+    df = pd.read_csv(stage_file('second.csv'))
+    df.tail(1).to_csv(stage_file('third.csv'), index = False)
+
+
+def test_stage_dependencies(tmp_path, monkeypatch):
+    """
+    Unit test for ordering
+    the pipeline stages by
+    their inputs and outputs.
+
+    """
+    monkeypatch.setitem(STAGE_FOLDER, 'path', str(tmp_path))
+    pd.DataFrame({'value': [1, 2, 3]}).to_csv(stage_file('raw.csv'), 
+                                              index = False)
+
+    third = stage('third', write_third, [stage_file('second.csv')], 
+                  [stage_file('third.csv')])
+    second = stage('second', write_second, [stage_file('first.csv')], 
+                   [stage_file('second.csv')])
+    first = stage('first', write_first, [stage_file('raw.csv')], 
+                  [stage_file('first.csv')])
+
+    dependencies = stage_dependencies([third, second, first])
+
+    assert dependencies == {'first': set(), 'second': {'first'}, 
+                            'third': {'second'}}
+
+    metrics = run_stages([third, second, first], max_workers = 1)
+
+    assert list(metrics) == ['first', 'second', 'third']
+    assert metrics['second']['rows_in'] == 3
+    assert metrics['third']['rows_out'] == 1
+    assert list(pd.read_csv(stage_file('third.csv'))['value']) == [6]
+
+    # An input which no stage writes and which does not exist.
+    missing = stage('missing', write_second, [stage_file('absent.csv')], 
+                    [stage_file('other.csv')])
+
+    with pytest.raises(ValueError):
+        stage_dependencies([first, missing])
+
+    cycle = stage('cycle', write_first, [stage_file('third.csv')], 
+                  [stage_file('raw.csv')])
+
+    with pytest.raises(ValueError):
+        stage_dependencies([first, second, third, cycle])
+
+
+def test_stage_cache(tmp_path, monkeypatch):
+    """
+    Unit test for skipping
+    unchanged stages and
+    re-running changed ones.
+
+    """
+    monkeypatch.setitem(STAGE_FOLDER, 'path', str(tmp_path))
+    pd.DataFrame({'value': [1, 2, 3]}).to_csv(stage_file('raw.csv'), 
+                                              index = False)
+    cache = stage_file('stage_cache.json')
+
+    def stages(seed):
+
+        return [
+            stage('first', write_first, [stage_file('raw.csv')], 
+                  [stage_file('first.csv')]),
+            stage('second', write_second, [stage_file('first.csv')], 
+                  [stage_file('second.csv')], params = {'seed': seed}),
+        ]
+
+    metrics = run_stages(stages(1), max_workers = 1, cache = cache)
+
+    assert metrics['first'] is not None
+    assert metrics['second'] is not None
+
+    # Unchanged keys and outputs.
+    metrics = run_stages(stages(1), max_workers = 1, cache = cache)
+
+    assert metrics == {'first': None, 'second': None}
+
+    # Changed parameters of the second stage only.
+    metrics = run_stages(stages(2), max_workers = 1, cache = cache)
+
+    assert metrics['first'] is None
+    assert metrics['second'] is not None
+
+    # A changed input re-runs its stage, and the stage below it through the
+    # changed output.
+    pd.DataFrame({'value': [4, 5]}).to_csv(stage_file('raw.csv'), 
+                                           index = False)
+    metrics = run_stages(stages(2), max_workers = 1, cache = cache)
+
+    assert metrics['first'] is not None
+    assert metrics['second'] is not None
+    assert list(pd.read_csv(stage_file('second.csv'))['value']) == [8, 10]
+
+    # A deleted output re-runs its stage.
+    os.remove(stage_file('second.csv'))
+    metrics = run_stages(stages(2), max_workers = 1, cache = cache)
+
+    assert metrics['first'] is None
+    assert metrics['second'] is not None
+
+
+@pytest.mark.parametrize('extension', ['.csv', '.parquet'])
+def test_result_writer_round_trip(tmp_path, extension):
+    """
+    Unit test for writing
+    result rows and batches
+    and reading them back.
+
+    """
+    if extension == '.parquet':
+        pytest.importorskip('pyarrow')
+
+    path = str(tmp_path / 'results' / ('interim_results' + extension))
+
+    rows = [{'constellation': 'Starlink', 'iteration': index, 
+             'capacity_mbps': index * 0.5} for index in range(5)]
+    batch = pd.DataFrame({'constellation': ['GEO', 'OneWeb'], 
+                          'iteration': [5, 6], 
+                          'capacity_mbps': [2.5, 3.0]})
+
+    with ResultWriter(path, batch_size = 2) as writer:
+
+        for row in rows:
+            writer.write(row)
+
+        writer.write_batch(batch[['iteration', 'capacity_mbps', 
+                                  'constellation']])
+
+    assert writer.rows_written == 7
+    assert table_rows(path) == 7
+
+    expected = pd.concat([pd.DataFrame(rows), batch], ignore_index = True)
+
+    pd.testing.assert_frame_equal(read_table(path), expected)
+    pd.testing.assert_frame_equal(
+        read_table(path, columns = ['capacity_mbps', 'constellation']), 
+        expected[['capacity_mbps', 'constellation']])
+
+    chunks = list(read_table(path, chunksize = 4))
+
+    assert [len(chunk) for chunk in chunks] == [4, 3]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index = True), 
+                                  expected)
+
+    with pytest.raises(ValueError):
+        ResultWriter(str(tmp_path / 'results.txt'))
+
+
+def test_summarize_adaptive():
+    """
+    Unit test for stopping
+    the draws once the mean
+    reaches the target precision.
+
+    """
+    settings = {'relative_precision': 0.05, 'batch_size': 100, 
+                'min_draws': 100}
+
+    _, report = summarize_adaptive('capacity', 'starlink', **settings)
+
+    draws = report['draws'].iloc[0]
+
+    assert report['converged'].all()
+    assert (report['relative_half_width'] <= 0.05).all()
+    assert draws % 100 == 0 and draws > 100
+
+    # The same stream stopped one batch earlier has not converged yet.
+    _, report = summarize_adaptive('capacity', 'starlink', 
+                                   max_draws = draws - 100, **settings)
+
+    assert not report['converged'].any()
+    assert (report['draws'] == draws - 100).all()
+    assert (report['relative_half_width'] > 0.05).any()
+
+    # An unreachable target stops at the draw limit.
+    _, report = summarize_adaptive('capacity', 'starlink', 
+        relative_precision = 1e-6, batch_size = 100, min_draws = 100, 
+        max_draws = 250)
+
+    assert not report['converged'].any()
+    assert (report['draws'] == 250).all()
+
+
+def test_rocket_factors():
+    """
+    Unit test for looking up
+    the launch emission factors
+    of each rocket.
+
+    """
+    path = os.path.join(os.path.dirname(__file__), '..', 'data', 'raw', 
+                        'rocket_life_cycle_factors.csv')
+    table = pd.read_csv(path)
+    factors = read_rocket_factors(path)
+
+    assert factors.rockets == ['falcon9', 'soyuz', 'unknown_hyc', 
+                               'unknown_hyg']
+    assert factors.factors.shape == (4, 7, 7)
+
+    values = factors.lookup(['soyuz', 'falcon9', 'ariane'], 
+                            ['launch_event', 'launcher_ait', 'launch_event'])
+
+    for row, (rocket, category) in enumerate([('soyuz', 'launch_event'), 
+                                              ('falcon9', 'launcher_ait')]):
+
+        expected = table[(table['rocket'] == rocket) & 
+                         (table['impact_category'] == category)]
+        expected = expected.set_index('indicator')['value']
+
+        assert list(values[row]) == list(expected[EMISSION_INDICATORS])
+
+    assert np.isnan(values[2]).all()
+
+    totals = factors.totals()
+    expected = table.groupby(['rocket', 'indicator'])['value'].sum()
+
+    for code, rocket in enumerate(factors.rockets):
+
+        assert totals[code] == pytest.approx(
+            expected[rocket][EMISSION_INDICATORS].to_numpy(), rel = 1e-12)
+
+    # Launch totals equal the sum of the launch emissions of every category.
+    launches = pd.DataFrame({'rocket': ['falcon9', 'soyuz'], 
+                             'no_of_launches': [3, 5]})
+    total = calc_launch_emissions(launches, factors, totals = True)
+
+    categories = launches.merge(pd.DataFrame(
+        {'impact_category': factors.categories}), how = 'cross')
+    components = calc_launch_emissions(categories, factors)
+    components = components.groupby('rocket', sort = False)[
+        EMISSION_INDICATORS].sum()
+
+    assert total[TOTAL_INDICATORS].to_numpy() == pytest.approx(
+        components.to_numpy(), rel = 1e-12)
+
+    with pytest.raises(ValueError):
+        RocketFactors(['falcon9'], factors = np.zeros((2, 7, 7)))
+
+
+def allocate_stage():
+
+    with measure('allocate', rows_in = 10) as rows:
+
+        values = np.ones(10 ** 6)
+        rows['rows_out'] = 5
+
+    with measure('allocate', rows_in = 10):
+
+        values = values.sum()
+
+
+def test_measure():
+    """
+    Unit test for measuring
+    the wall time and memory
+    of a stage and its calls.
+
+    """
+    metrics = run_measured(allocate_stage)
+    group = metrics['groups']['allocate']
+
+    assert group['calls'] == 2
+    assert group['rows_in'] == 20
+    assert group['rows_out'] == 5
+    assert group['wall_seconds'] > 0
+    assert group['cpu_seconds'] >= 0
+    assert group['rows_per_second'] == pytest.approx(
+        20 / group['wall_seconds'])
+    assert metrics['wall_seconds'] >= group['wall_seconds']
+
+    # The high-water mark is None on Windows without psutil.
+    assert metrics['max_rss_mb'] is None or metrics['max_rss_mb'] > 0
+
+    # Without tracing only the process high-water mark is recorded.
+    assert metrics['peak_traced_mb'] is None
+    assert group['peak_traced_mb'] is None
+
+    metrics = run_measured(allocate_stage, trace_memory = True)
+    group = metrics['groups']['allocate']
+
+    # The array of 10 ** 6 float64 values takes 7.6 MB.
+    assert group['peak_traced_mb'] >= 7.6
+    assert metrics['peak_traced_mb'] >= group['peak_traced_mb']